@@ -32,7 +32,19 @@
 #/
 #/ =======================================================================================
 
-import sys
+import os, sys, getopt
+import numpy as np
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'src' ) )
+import obj_index
+import TLogger
+import convert_obj_to_mesh2
+logger = TLogger.getInstance()
+
+UNSUPPORTED = { obj_index.KIND_VT : 'Texture vertices found',
+                obj_index.KIND_P  : 'Point found',
+                obj_index.KIND_L  : 'Line found',
+                obj_index.KIND_G  : 'Group found' }
 
 #/ =======================================================================================
 def parseVertex( mask ):
@@ -61,210 +73,332 @@ def parseVertex( mask ):
 
     return (pnt,nrm,tex)
 
+#/ =======================================================================================
+def parseVectors( data, starts, ends, lines, skip ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Convert v or vn records in bulk. Return ( rows, None ), or ( None, i ) where i
+    is the first line that does not parse.
+    """
+    #/ -----------------------------------------------------------------------------------
+    rows = obj_index.ParseNumbers( data, starts, ends, lines, skip, 3, np.float64 )
+    if ( None is not rows ):
+        return rows.tolist(), None
+
+    rows = []
+    for i in lines.tolist():
+        try:
+            V = bytes( data[starts[i]:ends[i]] ).split()
+            rows.append( ( float(V[1]), float(V[2]), float(V[3]), ) )
+        except ValueError:
+            return None, i
+    return rows, None
+
+#/ =======================================================================================
+def faceLayout( token ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Return ( numbers per vertex, column of nrm, column of tex ) for a face vertex
+    token such as b'7//3', or None if the bulk conversion does not handle it.
+    """
+    #/ -----------------------------------------------------------------------------------
+    x = token.split(b'/')
+    if ( 1 == len(x) ):
+        return ( 1, None, None )
+    if ( 2 == len(x) and 0 < len(x[1]) ):
+        return ( 2, None, 1 )
+    if ( 3 == len(x) ):
+        return ( 2, 1, None ) if ( 0 == len(x[1]) ) else ( 3, 2, 1 )
+    return None
+
+#/ =======================================================================================
+def parseFaces( data, buf, starts, ends, lines ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Convert f records into an (n, 3, 2) array of triangles (quads are split in two)
+    holding the vertex and normal index of each corner, -1 for a missing normal.
+    Faces that all share the layout of the first vertex are converted in bulk,
+    anything else goes through parseVertex one line at a time. Return ( face, None )
+    or ( None, ( i, reason ) ) for the first line that fails.
+    """
+    #/ -----------------------------------------------------------------------------------
+    if ( 0 == len(lines) ):
+        return np.zeros( ( 0, 3, 2 ), dtype=np.int64 ), None
+
+    #/ ----- tokens and slashes on every face line --------------------------------------
+
+    ws    = ( 32 == buf ) | ( 9 == buf ) | ( 13 == buf ) | ( 10 == buf )
+    begin = np.flatnonzero( ~ws & np.concatenate( ( [True], ws[:-1] ) ) )
+    slash = np.flatnonzero( 47 == buf )
+    dbl   = np.flatnonzero( ( 47 == buf[:-1] ) & ( 47 == buf[1:] ) )
+
+    def perLine( pos ):
+        return np.bincount( np.searchsorted( starts, pos, side='right' ) - 1,
+                            minlength=len(starts) )[lines]
+
+    ntok = perLine( begin ) - 1
+    nsl  = perLine( slash )
+    ndbl = perLine( dbl )
+
+    first  = bytes( data[starts[lines[0]]:ends[lines[0]]] ).split()
+    layout = faceLayout( first[1] ) if ( 1 < len(first) ) else None
+
+    if ( None != layout ):
+        per, col_nrm, col_tex = layout
+        sep  = first[1].count(b'/')
+        ok   = ( ( 3 == ntok ) | ( 4 == ntok ) ) & ( nsl == sep * ntok )
+        if ( None == col_tex and None != col_nrm ):
+            ok &= ( ndbl == ntok )
+        tri  = lines[ 3 == ntok ]
+        quad = lines[ 4 == ntok ]
+        T = obj_index.ParseNumbers( data, starts, ends, tri,  1, 3 * per, np.int64, True )
+        Q = obj_index.ParseNumbers( data, starts, ends, quad, 1, 4 * per, np.int64, True )
+        if ( ok.all() and None is not T and None is not Q and
+             ( 0 < T ).all() and ( 0 < Q ).all() ):
+            #/ ----- triangles and split quads in file order ------------------------------
+            count = np.where( 3 == ntok, 1, 2 )
+            at    = np.cumsum( count ) - count
+            F     = np.empty( ( int( count.sum() ), 3, per ), dtype=np.int64 )
+            Q     = Q.reshape( -1, 4, per )
+            F[ at[ 3 == ntok ] ]     = T.reshape( -1, 3, per )
+            F[ at[ 4 == ntok ] ]     = Q[:,[0,1,2]]
+            F[ at[ 4 == ntok ] + 1 ] = Q[:,[2,3,0]]
+
+            face = np.full( ( len(F), 3, 2 ), -1, dtype=np.int64 )
+            face[:,:,0] = F[:,:,0]
+            if ( None != col_nrm ):
+                face[:,:,1] = F[:,:,col_nrm]
+            return face, None
+
+    #/ ----- one line at a time ---------------------------------------------------------
+
+    face = []
+    for i in lines.tolist():
+        V = bytes( data[starts[i]:ends[i]] ).decode( 'utf-8', 'replace' ).split()[1:]
+        try:
+            if ( 3 == len(V) ):
+                A = parseVertex( V[0] )
+                B = parseVertex( V[1] )
+                C = parseVertex( V[2] )
+                face.append( (A,B,C) )
+            elif ( 4 == len(V) ):
+                A = parseVertex( V[0] )
+                B = parseVertex( V[1] )
+                C = parseVertex( V[2] )
+                D = parseVertex( V[3] )
+                face.append( (A,B,C) )
+                face.append( (C,D,A) )
+            else:
+                return None, ( i, 'count' )
+        except ValueError:
+            return None, ( i, 'parse' )
+
+    return np.array( [ [ ( v[0], -1 if ( None == v[1] ) else v[1] ) for v in f ]
+                       for f in face ], dtype=np.int64 ).reshape( -1, 3, 2 ), None
+
+#/ =======================================================================================
+def parseBlock( data, line, master_vert, master_norm, face, objFile ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Parse one block of whole lines that starts at line number line. Return 0, or 1
+    after reporting the first error in the block.
+    """
+    #/ -----------------------------------------------------------------------------------
+    buf = np.frombuffer( data, dtype=np.uint8 )
+    starts, ends, kind = obj_index.LineTable( buf )
+
+    #/ ----- only the lines in front of the first unsupported tag are parsed ------------
+
+    bad   = np.flatnonzero( np.isin( kind, list( UNSUPPORTED.keys() ) ) )
+    limit = int( bad[0] ) if ( 0 < len(bad) ) else len(kind)
+
+    def select( k ):
+        return np.flatnonzero( k == kind[:limit] )
+
+    V, v_err = parseVectors( data, starts, ends, select( obj_index.KIND_V ),  1 )
+    N, n_err = parseVectors( data, starts, ends, select( obj_index.KIND_VN ), 2 )
+    F, f_err = parseFaces( data, buf, starts, ends, select( obj_index.KIND_F ) )
+
+    errors = []
+    if ( None != v_err ):
+        errors.append( ( v_err, '\nParse error (vertex) in line %d of %s\n\n' ) )
+    if ( None != n_err ):
+        errors.append( ( n_err, '\nParse error (normal) in line %d of %s\n\n' ) )
+    if ( None != f_err ):
+        if ( 'count' == f_err[1] ):
+            errors.append( ( f_err[0], '\nUnsupported: Face found at line %d of %s with ' +
+                                       'other than 3 of 4 vertices\n\n' ) )
+        else:
+            errors.append( ( f_err[0], '\nParse error (3-face) in line %d of %s\n\n' ) )
+    if ( limit < len(kind) ):
+        errors.append( ( limit, '\nUnsupported: ' + UNSUPPORTED[ int( kind[limit] ) ] +
+                                ' at line %d of %s\n\n' ) )
+
+    if ( 0 < len(errors) ):
+        i, fmt = min( errors )
+        sys.stderr.write( fmt % ( line + i, objFile, ) )
+        return 1
+
+    master_vert.extend( V )
+    master_norm.extend( N )
+    face.append( F )
+    return 0
+
 #/ =======================================================================================
 def parseWavefrontObject( objFile ):
     #/ -----------------------------------------------------------------------------------
+    """
+    The OBJ file is memory mapped and indexed by obj_index, then each object is parsed
+    from its own byte range, in blocks, with the v, vn and f records of a block
+    converted in bulk. The faces of an object are an (n, 3, 2) array of master
+    vertex and normal indices (see parseFaces).
+    """
+    #/ -----------------------------------------------------------------------------------
 
     try:
-        fp = open( objFile, 'r' )
+        index = obj_index.ObjIndex( objFile )
     except IOError:
         sys.stderr.write( '\nCannot open %s for reading\n\n' % ( objFile ) )
-        return None
+        return (None, None, None)
 
     sys.stderr.write( '\nParsing %s\n\n' % ( objFile, ) )
     data = []
 
-    obj  = None
     master_vert = [(0.0,0.0,0.0),]
     master_norm = [(0.0,0.0,0.0),]
-    face = []
 
-    line = 0
-    for raw in fp:
-        line += 1
-        code = raw[0:2]
-
-        #/ ----- new object --------------------------------------------------------------
-        if ( 'o ' == code ):
-            if ( None != obj ):
-                data.append( obj )
-            oname = raw.split()[1].strip().replace('.','_')
-            sys.stdout.write( '  Object: %s\n' % (oname,) )
-            face = []
-            obj = { 'name':oname, 'face':face }
-
-        #/ ----- normals -----------------------------------------------------------------
-        if ( 'vn' == code ):
-            try:
-                N = raw.split()
-                x = float(N[1])
-                y = float(N[2])
-                z = float(N[3])
-                master_norm.append( (x,y,z,) )
-            except ValueError:
-                sys.stderr.write( '\nParse error (normal) in line %d of %s\n\n' %
-                                  ( line, objFile, ) )
-                fp.close()
-                return (None, None, None)
-
-        #/ ----- vertices ----------------------------------------------------------------
-        if ( 'v ' == code ):
-            try:
-                V = raw.split()
-                x = float(V[1])
-                y = float(V[2])
-                z = float(V[3])
-                master_vert.append( (x,y,z,) )
-            except ValueError:
-                sys.stderr.write( '\nParse error (vertex) in line %d of %s\n\n' %
-                                  ( line, objFile, ) )
-                fp.close()
-                return (None, None, None)
-
-        #/ ----- face --------------------------------------------------------------------
-        if ( 'f ' == code ):
-            V = raw.split()[1:]
-            #/ ----- three point face ----------------------------------------------------
-            if ( 3 == len(V) ):
-                try:
-                    A = parseVertex( V[0] )
-                    B = parseVertex( V[1] )
-                    C = parseVertex( V[2] )
-                    face.append( (A,B,C) )
-                except ValueError:
-                    sys.stderr.write( '\nParse error (3-face) in line %d of %s\n\n' %
-                                      ( line, objFile, ) )
-                    fp.close()
-                    return (None, None, None)
-
-            #/ ----- four point face -----------------------------------------------------
-            elif ( 4 == len(V) ):
-                try:
-                    A = parseVertex( V[0] )
-                    B = parseVertex( V[1] )
-                    C = parseVertex( V[2] )
-                    D = parseVertex( V[3] )
-                    face.append( (A,B,C) )
-                    face.append( (C,D,A) )
-                except ValueError:
-                    sys.stderr.write( '\nParse error (3-face) in line %d of %s\n\n' %
-                                      ( line, objFile, ) )
-                    fp.close()
+    try:
+        for entry in [ index.preamble ] + index.objects:
+            face = [ np.zeros( ( 0, 3, 2 ), dtype=np.int64 ) ]
+            if ( None != entry.name ):
+                oname = entry.name.replace('.','_')
+                sys.stdout.write( '  Object: %s\n' % (oname,) )
+
+            line = entry.line
+            for lo, hi in index.blocks( entry.start, entry.end ):
+                view = index.view( lo, hi )
+                if ( 0 != parseBlock( view, line, master_vert, master_norm, face, objFile ) ):
                     return (None, None, None)
+                line += int( np.count_nonzero( 10 == np.frombuffer( view, dtype=np.uint8 ) ) )
 
-            #/ ----- unsupported face ----------------------------------------------------
-            else:
-                sys.stderr.write( '\nUnsupported: Face found at line %d of %s with ' +
-                                  'other than 3 of 4 vertices\n\n' % ( line, objFile, ) )
-                return (None, None, None)
-
-        #/ ----- unsupported tags --------------------------------------------------------
-        if ( 'vt' == code ):
-            sys.stderr.write( '\nUnsupported: Texture vertices found at ' +
-                              'line %d of %s\n\n' % ( line, objFile, ) )
-            return (None, None, None)
-
-        if ( 'p ' == code ):
-            sys.stderr.write( '\nUnsupported: Point found at line %d ' +
-                              'of %s\n\n' % ( line, objFile, ) )
-            return (None, None, None)
-
-        if ( 'l ' == code ):
-            sys.stderr.write( '\nUnsupported: Line found at line %d ' +
-                              'of %s\n\n' % ( line, objFile, ) )
-            return (None, None, None)
-
-        if ( 'g ' == code ):
-            sys.stderr.write( '\nUnsupported: Group found at line %d ' +
-                              'of %s\n\n' % ( line, objFile, ) )
-            return (None, None, None)
-
-    if ( None != obj ):
-        data.append( obj )
-
-    fp.close()
+            if ( None != entry.name ):
+                data.append( { 'name':oname, 'face':np.concatenate( face ) } )
+    finally:
+        index.close()
 
     return (data,master_vert,master_norm)
 
 #/ =======================================================================================
-def buildMap( face, col ):
+def buildMaps( data, col ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Compact column col (0 vertex, 1 normal) of the faces of every object into dense
+    per object indices, for all objects in one numpy.unique. An index is numbered by
+    its first use in its object, corners A, B, C of each face in turn. Return one
+    ( index, rev ) per object: index is the (n, 3) array of dense indices and
+    rev[i] the master index of dense index i.
+    """
     #/ -----------------------------------------------------------------------------------
-    map = {}
-    idx = 0
+    faces = [ obj['face'][:,:,col].reshape( -1 ) for obj in data ]
+    count = np.array( [ len(f) for f in faces ], dtype=np.int64 )
 
-    for f in face:
-        A  = f[0]
-        B  = f[1]
-        C  = f[2]
+    G     = np.concatenate( faces + [ np.zeros( 0, dtype=np.int64 ) ] )
+    owner = np.repeat( np.arange( len(faces), dtype=np.int64 ), count )
+    span  = ( int( G.max() ) + 2 ) if ( 0 < len(G) ) else 1   #/ -1 marks no normal
 
-        av = A[col]
-        bv = B[col]
-        cv = C[col]
+    _, first, inverse = np.unique( owner * span + G + 1,
+                                   return_index=True, return_inverse=True )
 
-        if ( not map.has_key(av) ):
-            map[av] = idx
-            idx += 1
+    #/ ----- number the groups by first use, object by object ----------------------------
 
-        if ( not map.has_key(bv) ):
-            map[bv] = idx
-            idx += 1
+    order = np.argsort( first, kind='stable' )
+    rank  = np.empty( len(first), dtype=np.int64 )
+    rank[order] = np.arange( len(first) )
 
-        if ( not map.has_key(cv) ):
-            map[cv] = idx
-            idx += 1
+    per   = np.bincount( owner[ first[order] ], minlength=len(faces) )
+    base  = np.cumsum( per ) - per
+    dense = rank[ inverse.reshape( -1 ) ] - base[ owner ]
+    rev   = G[ first[order] ]
 
-        rev = len(map)*[-1]
-        for k in map:
-            i = map[k]
-            rev[i] = k
+    maps = []
+    lo   = 0
+    for k in range( len(faces) ):
+        hi = lo + int( count[k] )
+        maps.append( ( dense[lo:hi].reshape( -1, 3 ), rev[ base[k]:base[k]+per[k] ] ) )
+        lo = hi
 
-    return map, rev
+    return maps
 
 #/ =======================================================================================
-def createMesh2( fp, name, face, vert, norm ):
+def buildMap( face, col ):
+    #/ -----------------------------------------------------------------------------------
+    """ buildMaps for the faces of a single object """
+    #/ -----------------------------------------------------------------------------------
+    return buildMaps( [ { 'face':face } ], col )[0]
+
+#/ =======================================================================================
+def writeRows( fp, fmt, rows ):
+    #/ -----------------------------------------------------------------------------------
+    """ Write the rows of a 2D array, one fmt per row, in large blocks """
+    #/ -----------------------------------------------------------------------------------
+    for lo in range( 0, len(rows), 65536 ):
+        block = rows[lo:lo+65536]
+        fp.write( ( fmt * len(block) ) % tuple( block.reshape( -1 ).tolist() ) )
+
+#/ =======================================================================================
+def writeVectors( fp, section, rows, decimals=None, max_error=None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Write a vector section. With decimals or max_error the vectors are rounded and
+    written without trailing zeros, as convert_obj_to_mesh2 writes them.
+    """
+    #/ -----------------------------------------------------------------------------------
+    rows     = np.asarray( rows, dtype=np.float64 ).reshape( -1, 3 )
+    decimals = convert_obj_to_mesh2.Decimals( rows, decimals, max_error )
+
+    fmt = '        <%.6f, %.6f, %.6f>,\n'
+    if ( None != decimals ):
+        fmt  = convert_obj_to_mesh2.CompactFormat( '        <%f, %f, %f>,\n', rows, decimals )
+        rows = np.round( rows, decimals ) + 0.0   #/ no -0
+
+    fp.write( '    %s {\n        %d,\n' % ( section, len(rows), ) )
+    writeRows( fp, fmt, rows )
+    fp.write( '    }\n' );
+
+#/ =======================================================================================
+def createMesh2( fp, name, face, vert, norm, decimals=None, max_error=None, vmap=None, nmap=None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Write one object. vmap and nmap are its buildMaps entries, made here if not
+    given. Faces without normals leave out the normal sections.
+    """
     #/ -----------------------------------------------------------------------------------
     sys.stderr.write( '  Building %s\n' % (name,) )
 
-    vmap, vrev = buildMap( face, 0 )
-    nmap, nrev = buildMap( face, 1 )
+    if ( None == vmap ):
+        vmap = buildMap( face, 0 )
+    if ( None == nmap ):
+        nmap = buildMap( face, 1 )
+
+    normals = bool( ( 0 <= face[:,:,1] ).all() )
 
     fp.write( '#declare %s =\nmesh2 {\n' % (name,) )
 
-    n = len(vmap)
-    fp.write( '    vertex_vectors {\n        %d,\n' % (n,) )
-    for idx in vrev:
-        x = vert[idx][0]
-        y = vert[idx][1]
-        z = vert[idx][2]
-        fp.write( '        <%.6f, %.6f, %.6f>,\n' % (x,y,z,) )
-    fp.write( '    }\n' );
+    writeVectors( fp, 'vertex_vectors', np.asarray( vert )[ vmap[1] ], decimals, max_error )
 
-    n = len(nmap)
-    fp.write( '    normal_vectors {\n        %d,\n' % (n,) )
-    for idx in nrev:
-        x = norm[idx][0]
-        y = norm[idx][1]
-        z = norm[idx][2]
-        fp.write( '        <%.6f, %.6f, %.6f>,\n' % (x,y,z,) )
-    fp.write( '    }\n' );
+    if ( normals ):
+        writeVectors( fp, 'normal_vectors', np.asarray( norm )[ nmap[1] ], decimals, max_error )
 
     fp.write( '    texture_list {\n        1 texture{}\n    }' )
 
     fp.write( '    face_indices {\n        %d,\n' % (len(face),) )
-    for f in face:
-        a = vmap[f[0][0]]
-        b = vmap[f[1][0]]
-        c = vmap[f[2][0]]
-        fp.write( '        <%d, %d, %d>,\n' % (a,b,c,) )
+    writeRows( fp, '        <%d, %d, %d>,\n', vmap[0] )
     fp.write( '    }\n' );
 
-    fp.write( '    normal_indices {\n        %d,\n' % (len(face),) )
-    for f in face:
-        a = nmap[f[0][1]]
-        b = nmap[f[1][1]]
-        c = nmap[f[2][1]]
-        fp.write( '        <%d, %d, %d>,\n' % (a,b,c,) )
-    fp.write( '    }\n' );
+    if ( normals ):
+        fp.write( '    normal_indices {\n        %d,\n' % (len(face),) )
+        writeRows( fp, '        <%d, %d, %d>,\n', nmap[0] )
+        fp.write( '    }\n' );
 
     fp.write( '    radiosity {\n        importance 0.5\n    }\n' )
 
@@ -272,14 +406,21 @@ def createMesh2( fp, name, face, vert, norm ):
 
 
 #/ =======================================================================================
-def buildPovRayMesh( povFile, data, vert, norm ):
+def buildPovRayMesh( povFile, data, vert, norm, decimals=None, max_error=None ):
     #/ -----------------------------------------------------------------------------------
     sys.stderr.write( '\nBuilding %s\n' % ( povFile, ) )
 
+    vert  = np.asarray( vert, dtype=np.float64 )
+    norm  = np.asarray( norm, dtype=np.float64 )
+    vmaps = buildMaps( data, 0 )
+    nmaps = buildMaps( data, 1 )
+
     fp = open( povFile, 'w' )
 
-    for obj in data:
-        createMesh2( fp, obj['name'], obj['face'], vert, norm )
+    for obj, vmap, nmap in zip( data, vmaps, nmaps ):
+        createMesh2( fp, obj['name'], obj['face'], vert, norm, decimals, max_error, vmap, nmap )
+
+    fp.close()
 
     sys.stderr.write( '\n' )
     return 1
@@ -290,31 +431,14 @@ def buildTestRaw( rawFile, data, vert, norm ):
     #/ -----------------------------------------------------------------------------------
     sys.stderr.write( '\nBuilding %s\n' % ( rawFile, ) )
 
+    vert = np.asarray( vert, dtype=np.float64 )
+
     fp = open( rawFile, 'w' )
 
     for obj in data:
         sys.stderr.write( '  Building %s\n' % (obj['name'],) )
-        face = obj['face']
-
-        for f in face:
-            A = f[0]
-            B = f[1]
-            C = f[2]
-
-            xa = vert[A[0]][0]
-            ya = vert[A[0]][1]
-            za = vert[A[0]][2]
-
-            xb = vert[B[0]][0]
-            yb = vert[B[0]][1]
-            zb = vert[B[0]][2]
-
-            xc = vert[C[0]][0]
-            yc = vert[C[0]][1]
-            zc = vert[C[0]][2]
-
-            fp.write( '%.6f %.6f %.6f %.6f %.6f %.6f %.6f %.6f %.6f\n' %
-                      ( xa, ya, za, xb, yb, zb, xc, yc, zc, ) )
+        writeRows( fp, '%.6f %.6f %.6f %.6f %.6f %.6f %.6f %.6f %.6f\n',
+                   vert[ obj['face'][:,:,0] ].reshape( -1, 9 ) )
 
     fp.close()
     sys.stderr.write( '\n' )
@@ -322,16 +446,30 @@ def buildTestRaw( rawFile, data, vert, norm ):
 
 
 #/ =======================================================================================
-def process( objFile, povFile ):
+def process( objFile, povFile, decimals=None, max_error=None ):
     #/ -----------------------------------------------------------------------------------
 
-    (data, vert, norm) = parseWavefrontObject( objFile )
-    if ( None == data ):
-        return 1
+    with logger.span( 'process' ):
+        with logger.span( 'parse' ):
+            (data, vert, norm) = parseWavefrontObject( objFile )
+        if ( None == data ):
+            return 1
+
+        logger.count( 'bytes_read', os.path.getsize( objFile ) )
+        logger.count( 'objects',    len(data) )
+        logger.count( 'vertices',   len(vert) - 1 )
+        logger.count( 'normals',    len(norm) - 1 )
+        logger.count( 'faces',      sum( len( obj['face'] ) for obj in data ) )
+
+        with logger.span( 'raw' ):
+            buildTestRaw( 'test.raw', data, vert, norm )
+
+        with logger.span( 'write' ):
+            rv = buildPovRayMesh( povFile, data, vert, norm, decimals, max_error )
 
-    buildTestRaw( 'test.raw', data, vert, norm )
+        logger.count( 'bytes_written', os.path.getsize( povFile ) )
 
-    return buildPovRayMesh( povFile, data, vert, norm )
+    return rv
 
 
 #/ =======================================================================================
@@ -341,10 +479,16 @@ def usage( pn, msg=None ):
         sys.stderr.write( '\n%s\n' % (msg,) )
 
     sys.stderr.write( """
-USAGE: %s input.obj output.pov
+USAGE: %s [options] input.obj output.pov
   input.obj  - path to a Wavefront OBJ file
   output.inc - path to an output PovRay include file
 
+  -p, --precision N   write vectors with N decimals, without trailing zeros
+  -e, --max-error E   pick the decimals so the error stays below E times the
+                      bounding box diagonal of each vector section
+  -m, --metrics FILE  write the phase times and counters of the run as JSON
+      --profile FILE  write cProfile stats of the conversion to FILE
+
     Blender OBJ export needs to be set up with Y-Forward Z-Up
 
 
@@ -363,10 +507,34 @@ def main( argc, argv ):
     sys.stderr.write( '\nOBJ2POV * Convert Wavefront OBJ to PovRay Mesh2 * 2019' )
     sys.stderr.write( '\n------------------------------------------------------\n' )
 
-    if ( 3 != argc ):
+    decimals  = None
+    max_error = None
+    metrics   = None
+    try:
+        opts, args = getopt.getopt( argv[1:], 'p:e:m:',
+                                    [ 'precision=', 'max-error=', 'metrics=', 'profile=' ] )
+        for key, val in opts:
+            if ( key in ( '-p', '--precision' ) ):
+                decimals = convert_obj_to_mesh2.PrecisionOption( key, val )
+            elif ( key in ( '-e', '--max-error' ) ):
+                max_error = convert_obj_to_mesh2.PrecisionOption( key, val )
+            elif ( key in ( '-m', '--metrics' ) ):
+                metrics = val
+            elif ( '--profile' == key ):
+                logger.setProfile( val )
+    except getopt.GetoptError as e:
+        return usage( argv[0], str(e) )
+    logger.resetMetrics()
+
+    if ( 2 != len(args) ):
         return usage( argv[0], 'missing arguments' )
 
-    return process( argv[1], argv[2] )
+    rv = process( args[0], args[1], decimals, max_error )
+
+    if ( None != metrics ):
+        logger.writeSummary( metrics )
+
+    return rv
 
 
 #/ =======================================================================================
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                  M A K E _ O B J                                  **
+#/ =======================================================================================
+#/ **                                                                                   **
+#/ **  Copyright (c) 2021, Stephen W. Soliday                                           **
+#/ **                      stephen.soliday@trncmp.org                                   **
+#/ **                      http://research.trncmp.org                                   **
+#/ **                                                                                   **
+#/ **  -------------------------------------------------------------------------------  **
+#/ **                                                                                   **
+#/ **  This program is free software: you can redistribute it and/or modify it under    **
+#/ **  the terms of the GNU General Public License as published by the Free Software    **
+#/ **  Foundation, either version 3 of the License, or (at your option)                 **
+#/ **  any later version.                                                               **
+#/ **                                                                                   **
+#/ **  This program is distributed in the hope that it will be useful, but WITHOUT      **
+#/ **  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS    **
+#/ **  FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.   **
+#/ **                                                                                   **
+#/ **  You should have received a copy of the GNU General Public License along with     **
+#/ **  this program. If not, see <http://www.gnu.org/licenses/>.                        **
+#/ **                                                                                   **
+#/ ----- Modification History ------------------------------------------------------------
+#/
+#/ @brief   Synthetic Wavefront OBJ/MTL generator for the benchmarks.
+#/
+#/ @details Builds subdivided spheres, height field grids and scenes of many small
+#/          spheres at a requested triangle count. The output depends only on the
+#/          arguments, so the same case is byte identical between runs and commits.
+#/          Records are formatted in large blocks, so 10M+ triangle files are
+#/          written in seconds.
+#/
+#/ @author  Stephen W. Soliday
+#/ @date    2021-Feb-07
+#/
+#/ =======================================================================================
+
+import sys, os
+import numpy as np
+
+SHAPES   = ( 'sphere', 'grid', 'scene' )
+VARIANTS = { 'full'    : ( True,  True,  4 ),    #/ vt, vn, usemtl materials
+             'normals' : ( False, True,  1 ),
+             'bare'    : ( False, False, 0 ) }
+
+BLOCK = 65536   #/ records formatted per write
+
+
+#/ =======================================================================================
+def Surface( nu, nv, sphere ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    A (nu+1) x (nv+1) parameter grid as a sphere or a height field. Return the
+    vertices, UVs, normals and the 2 * nu * nv triangles (zero based).
+    """
+    #/ -----------------------------------------------------------------------------------
+    u, v = np.meshgrid( np.linspace( 0.0, 1.0, nu + 1 ), np.linspace( 0.0, 1.0, nv + 1 ),
+                        indexing='ij' )
+    u = u.ravel()
+    v = v.ravel()
+
+    if ( sphere ):
+        phi   = 2.0 * np.pi * u
+        theta = np.pi * v
+        N = np.column_stack( ( np.sin( theta ) * np.cos( phi ),
+                               np.sin( theta ) * np.sin( phi ),
+                               np.cos( theta ) ) )
+        V = N.copy()
+    else:
+        h = 0.1 * np.sin( 6.0 * np.pi * u ) * np.cos( 4.0 * np.pi * v )
+        V = np.column_stack( ( 2.0 * u - 1.0, 2.0 * v - 1.0, h ) )
+        d = np.column_stack( ( -0.6 * np.pi * np.cos( 6.0 * np.pi * u ) * np.cos( 4.0 * np.pi * v ),
+                               0.4 * np.pi * np.sin( 6.0 * np.pi * u ) * np.sin( 4.0 * np.pi * v ),
+                               np.ones( len(u) ) ) )
+        N = d / np.sqrt( ( d * d ).sum( axis=1 ) )[:,None]
+
+    T = np.column_stack( ( u, v ) )
+
+    i, j = np.meshgrid( np.arange( nu ), np.arange( nv ), indexing='ij' )
+    a = ( i * ( nv + 1 ) + j ).ravel()
+    b = a + nv + 1
+    F = np.empty( ( 2 * len(a), 3 ), dtype=np.int64 )
+    F[0::2] = np.column_stack( ( a, b, b + 1 ) )
+    F[1::2] = np.column_stack( ( a, b + 1, a + 1 ) )
+
+    return V, T, N, F
+
+
+#/ =======================================================================================
+def Objects( shape, triangles ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Return [ ( name, V, T, N, F ) ] for about the requested number of triangles.
+    """
+    #/ -----------------------------------------------------------------------------------
+    if ( 'scene' == shape ):
+        count = max( 1, int( triangles ) // 2048 )
+        each  = max( 2, int( triangles ) // count )
+    else:
+        count = 1
+        each  = max( 2, int( triangles ) )
+
+    nu = max( 1, int( np.sqrt( each / 4.0 ) ) * 2 )
+    nv = max( 1, each // ( 2 * nu ) )
+
+    side = int( np.ceil( np.sqrt( count ) ) )
+    obj  = []
+    for k in range( count ):
+        V, T, N, F = Surface( nu, nv, 'grid' != shape )
+        if ( 1 < count ):
+            V = V * 0.4 + np.array( [ k % side, k // side, 0.0 ] )
+        obj.append( ( '%s.%d' % ( shape.capitalize(), k, ), V, T, N, F ) )
+    return obj
+
+
+#/ =======================================================================================
+def WriteRows( fp, fmt, rows ):
+    #/ -----------------------------------------------------------------------------------
+    for lo in range( 0, len(rows), BLOCK ):
+        block = rows[lo:lo+BLOCK]
+        fp.write( ( fmt * len(block) ) % tuple( block.ravel().tolist() ) )
+
+
+#/ =======================================================================================
+def WriteMtl( mtl_filename, materials ):
+    #/ -----------------------------------------------------------------------------------
+    fp = open( mtl_filename, 'w' )
+    fp.write( '# synthetic benchmark materials\n' )
+    for m in range( max( 1, materials ) ):
+        fp.write( 'newmtl Mat.%03d\nNs 250.0\nKa 1.000000 1.000000 1.000000\n'
+                  'Kd %.6f 0.500000 0.250000\nKs 0.500000 0.500000 0.500000\n'
+                  'Ke 0.000000 0.000000 0.000000\nNi 1.450000\nd 1.000000\nillum 2\n\n' %
+                  ( m, ( m + 1.0 ) / ( materials + 1.0 ), ) )
+    fp.close()
+
+
+#/ =======================================================================================
+def MakeObj( obj_filename, shape, triangles, variant='full' ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Write a synthetic OBJ and its MTL. Return the number of triangles written.
+    """
+    #/ -----------------------------------------------------------------------------------
+    use_uv, use_normals, materials = VARIANTS[ variant ]
+
+    mtl_filename = os.path.splitext( obj_filename )[0] + '.mtl'
+    WriteMtl( mtl_filename, materials )
+
+    if ( use_uv and use_normals ):
+        vfmt = ' %d/%d/%d'
+    elif ( use_normals ):
+        vfmt = ' %d//%d'
+    elif ( use_uv ):
+        vfmt = ' %d/%d'
+    else:
+        vfmt = ' %d'
+    ffmt = 'f' + 3 * vfmt + '\n'
+
+    fp = open( obj_filename, 'w' )
+    fp.write( '# synthetic benchmark: %s %d %s\n' % ( shape, triangles, variant, ) )
+    fp.write( 'mtllib %s\n' % ( os.path.basename( mtl_filename ), ) )
+
+    base  = 1
+    total = 0
+    for name, V, T, N, F in Objects( shape, triangles ):
+        fp.write( 'o %s\n' % ( name, ) )
+        WriteRows( fp, 'v %.6f %.6f %.6f\n', V )
+        if ( use_uv ):
+            WriteRows( fp, 'vt %.6f %.6f\n', T )
+        if ( use_normals ):
+            WriteRows( fp, 'vn %.4f %.4f %.4f\n', N )
+
+        G = F + base
+        cols = [ G ]
+        if ( use_uv ):
+            cols.append( G )
+        if ( use_normals ):
+            cols.append( G )
+        rows = np.stack( cols, axis=2 ).reshape( len(G), -1 )
+
+        parts = np.array_split( np.arange( len(rows) ), max( 1, materials ) )
+        for m, part in enumerate( parts ):
+            if ( 0 < materials ):
+                fp.write( 'usemtl Mat.%03d\ns %s\n' % ( m, '1' if ( 0 == m % 2 ) else 'off', ) )
+            WriteRows( fp, ffmt, rows[ part ] )
+
+        base  += len(V)
+        total += len(F)
+
+    fp.close()
+
+    return total
+
+
+#/ =======================================================================================
+def main( argc, argv ):
+    #/ -----------------------------------------------------------------------------------
+    if ( 5 != argc or argv[2] not in SHAPES or argv[4] not in VARIANTS ):
+        sys.stderr.write( '\nUSAGE: %s output.obj %s triangles %s\n\n' %
+                          ( argv[0], '|'.join( SHAPES ), '|'.join( VARIANTS ), ) )
+        return 1
+
+    n = MakeObj( argv[1], argv[2], int( float( argv[3] ) ), argv[4] )
+    sys.stderr.write( '%s: %d triangles\n' % ( argv[1], n, ) )
+    return 0
+
+
+#/ =======================================================================================
+if ( '__main__' == __name__ ): sys.exit( main( len( sys.argv ), sys.argv ) )
+#/ =======================================================================================
+#/ **                                  M A K E _ O B J                                  **
+#/ =========================================================================== END FILE ==
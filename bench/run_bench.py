@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                 R U N _ B E N C H                                 **
+#/ =======================================================================================
+#/ **                                                                                   **
+#/ **  Copyright (c) 2021, Stephen W. Soliday                                           **
+#/ **                      stephen.soliday@trncmp.org                                   **
+#/ **                      http://research.trncmp.org                                   **
+#/ **                                                                                   **
+#/ **  -------------------------------------------------------------------------------  **
+#/ **                                                                                   **
+#/ **  This program is free software: you can redistribute it and/or modify it under    **
+#/ **  the terms of the GNU General Public License as published by the Free Software    **
+#/ **  Foundation, either version 3 of the License, or (at your option)                 **
+#/ **  any later version.                                                               **
+#/ **                                                                                   **
+#/ **  This program is distributed in the hope that it will be useful, but WITHOUT      **
+#/ **  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS    **
+#/ **  FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.   **
+#/ **                                                                                   **
+#/ **  You should have received a copy of the GNU General Public License along with     **
+#/ **  this program. If not, see <http://www.gnu.org/licenses/>.                        **
+#/ **                                                                                   **
+#/ ----- Modification History ------------------------------------------------------------
+#/
+#/ @brief   Benchmark of the OBJ to mesh2 converters.
+#/
+#/ @details Generates synthetic OBJ/MTL files with make_obj and runs each converter
+#/          on them phase by phase: ConvertObj2Mesh2 (parse, optimize, write) and
+#/          Obj2Pov_2019.process (parse, raw, write). Every case runs in its own
+#/          process so the peak RSS belongs to that case alone. The results, with
+#/          faces/s, MB/s and the commit they were measured on, go to a JSON file
+#/          so two commits can be compared.
+#/
+#/ @author  Stephen W. Soliday
+#/ @date    2021-Feb-07
+#/
+#/ =======================================================================================
+
+import sys, os, json, time, getopt, shutil, platform, resource, subprocess, tempfile
+import numpy as np
+
+BENCH_DIR = os.path.dirname( os.path.abspath( __file__ ) )
+REPO_DIR  = os.path.dirname( BENCH_DIR )
+
+sys.path.insert( 0, os.path.join( REPO_DIR, 'src' ) )
+sys.path.insert( 0, REPO_DIR )
+
+import make_obj
+
+BENCH_VERSION = 1
+SIZES         = ( 1000, 10000, 100000 )
+CONVERTERS    = ( 'mesh2', 'obj2pov' )
+
+#/ ----- inputs each converter reads; other variants are not run with it ----------------
+
+SUPPORTED = { 'mesh2'   : ( 'full', 'normals', 'bare' ),
+              'obj2pov' : ( 'normals', 'bare' ) }
+
+
+#/ =======================================================================================
+def PeakRSS():
+    #/ -----------------------------------------------------------------------------------
+    """
+    Peak resident set size of this process in MB.
+    """
+    #/ -----------------------------------------------------------------------------------
+    rss = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+    if ( 'darwin' == sys.platform ):
+        return rss / 1048576.0   #/ bytes
+    return rss / 1024.0          #/ kilobytes
+
+
+#/ =======================================================================================
+def TimeMesh2( obj_filename, out_dir, jobs, out_of_core ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    The phases of ConvertObj2Mesh2, timed one by one.
+    """
+    #/ -----------------------------------------------------------------------------------
+    import convert_obj_to_mesh2 as c
+
+    inc_filename = os.path.join( out_dir, 'bench.inc' )
+    materials    = {}
+    phases       = {}
+
+    scratch = tempfile.mkdtemp( prefix='mesh2-', dir=out_dir ) if ( out_of_core ) else None
+
+    t0 = time.perf_counter()
+    obj = c.ParseObjFile( obj_filename, materials, scratch=scratch )
+    t1 = time.perf_counter()
+    c.OptimizeMeshes( obj )
+    t2 = time.perf_counter()
+    c.WriteMesh2File( inc_filename, obj, materials, jobs=jobs )
+    t3 = time.perf_counter()
+
+    phases['parse']    = t1 - t0
+    phases['optimize'] = t2 - t1
+    phases['write']    = t3 - t2
+
+    return phases, os.path.getsize( inc_filename )
+
+
+#/ =======================================================================================
+def TimeObj2Pov( obj_filename, out_dir ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    The phases of Obj2Pov_2019.process, timed one by one.
+    """
+    #/ -----------------------------------------------------------------------------------
+    import Obj2Pov_2019 as p
+
+    inc_filename = os.path.join( out_dir, 'bench.inc' )
+    phases       = {}
+
+    t0 = time.perf_counter()
+    data, vert, norm = p.parseWavefrontObject( obj_filename )
+    if ( None == data ):
+        raise ValueError( 'parseWavefrontObject failed' )
+    t1 = time.perf_counter()
+    p.buildTestRaw( os.path.join( out_dir, 'test.raw' ), data, vert, norm )
+    t2 = time.perf_counter()
+    p.buildPovRayMesh( inc_filename, data, vert, norm )
+    t3 = time.perf_counter()
+
+    phases['parse'] = t1 - t0
+    phases['raw']   = t2 - t1
+    phases['write'] = t3 - t2
+
+    return phases, os.path.getsize( inc_filename )
+
+
+#/ =======================================================================================
+def RunCase( converter, obj_filename, out_dir, result_filename, jobs, out_of_core ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Body of the child process: convert one file and write the timings, with the
+    TLogger spans and counters of the run, as JSON.
+    """
+    #/ -----------------------------------------------------------------------------------
+    import TLogger
+    logger = TLogger.getInstance()
+    logger.resetMetrics()
+
+    base = PeakRSS()
+
+    if ( 'mesh2' == converter ):
+        phases, out_bytes = TimeMesh2( obj_filename, out_dir, jobs, out_of_core )
+    else:
+        phases, out_bytes = TimeObj2Pov( obj_filename, out_dir )
+
+    summary = logger.summary()
+
+    with open( result_filename, 'w' ) as fp:
+        json.dump( { 'phases'       : phases,
+                     'spans'        : summary['spans'],
+                     'counters'     : summary['counters'],
+                     'out_bytes'    : out_bytes,
+                     'peak_rss_mb'  : PeakRSS(),
+                     'start_rss_mb' : base }, fp )
+    return 0
+
+
+#/ =======================================================================================
+def Measure( converter, obj_filename, work_dir, jobs, out_of_core ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Run one case in a fresh interpreter. Return its result dict, or one holding
+    'error' with the last line the child wrote to stderr.
+    """
+    #/ -----------------------------------------------------------------------------------
+    out_dir = tempfile.mkdtemp( prefix='out-', dir=work_dir )
+    result  = os.path.join( out_dir, 'result.json' )
+
+    cmd = [ sys.executable, os.path.abspath( __file__ ), '--child', converter,
+            '-j', str( jobs ), obj_filename, out_dir, result ]
+    if ( out_of_core ):
+        cmd.insert( 3, '--out-of-core' )
+
+    proc = subprocess.run( cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE )
+
+    try:
+        with open( result ) as fp:
+            return json.load( fp )
+    except ( IOError, ValueError ):
+        lines = proc.stderr.decode( 'utf-8', 'replace' ).strip().splitlines()
+        return { 'error' : lines[-1] if ( lines ) else 'exit status %d' % ( proc.returncode, ) }
+    finally:
+        shutil.rmtree( out_dir, ignore_errors=True )
+
+
+#/ =======================================================================================
+def GitCommit():
+    #/ -----------------------------------------------------------------------------------
+    try:
+        out = subprocess.run( [ 'git', 'rev-parse', 'HEAD' ], cwd=REPO_DIR,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL )
+        commit = out.stdout.decode().strip()
+        out = subprocess.run( [ 'git', 'status', '--porcelain', '--untracked-files=no' ],
+                              cwd=REPO_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL )
+        return commit, 0 < len( out.stdout.strip() )
+    except OSError:
+        return None, None
+
+
+#/ =======================================================================================
+def Usage( pn, msg=None ):
+    #/ -----------------------------------------------------------------------------------
+    if ( None != msg ):
+        sys.stderr.write( '\n%s\n' % ( msg, ) )
+    sys.stderr.write( '''
+USAGE: %s [options]
+
+  -o, --output=file      JSON results (default bench-<commit>.json)
+  -s, --sizes=list       triangle counts, comma separated (default %s)
+      --shapes=list      of %s (default all)
+      --variants=list    of %s (default all)
+      --converters=list  of %s (default all)
+  -j, --jobs=n           worker processes for the mesh2 writer (default 1)
+      --out-of-core      parse the mesh2 geometry into scratch files
+  -r, --repeat=n         runs per case, the fastest is kept (default 1)
+  -w, --work=dir         directory for the generated files (default temp)
+  -k, --keep             keep the generated files
+
+''' % ( pn, ','.join( '%d' % ( n, ) for n in SIZES ), ','.join( make_obj.SHAPES ),
+        ','.join( make_obj.VARIANTS ), ','.join( CONVERTERS ), ) )
+    return 1
+
+
+#/ =======================================================================================
+def Choose( arg, allowed, name ):
+    #/ -----------------------------------------------------------------------------------
+    chosen = [ a for a in arg.split( ',' ) if ( a ) ]
+    for a in chosen:
+        if ( a not in allowed ):
+            raise ValueError( 'unknown %s: %s' % ( name, a, ) )
+    return chosen
+
+
+#/ =======================================================================================
+def main( argc, argv ):
+    #/ -----------------------------------------------------------------------------------
+    try:
+        opts, args = getopt.getopt( argv[1:], 'o:s:j:r:w:k',
+                                    [ 'output=', 'sizes=', 'shapes=', 'variants=',
+                                      'converters=', 'jobs=', 'out-of-core', 'repeat=',
+                                      'work=', 'keep', 'child=' ] )
+    except getopt.GetoptError as e:
+        return Usage( argv[0], str( e ) )
+
+    output      = None
+    sizes       = list( SIZES )
+    shapes      = list( make_obj.SHAPES )
+    variants    = list( make_obj.VARIANTS )
+    converters  = list( CONVERTERS )
+    jobs        = 1
+    out_of_core = False
+    repeat      = 1
+    work_dir    = None
+    keep        = False
+    child       = None
+
+    try:
+        for o, a in opts:
+            if ( o in ( '-o', '--output' ) ):
+                output = a
+            elif ( o in ( '-s', '--sizes' ) ):
+                sizes = [ int( float( n ) ) for n in a.split( ',' ) if ( n ) ]
+            elif ( '--shapes' == o ):
+                shapes = Choose( a, make_obj.SHAPES, 'shape' )
+            elif ( '--variants' == o ):
+                variants = Choose( a, make_obj.VARIANTS, 'variant' )
+            elif ( '--converters' == o ):
+                converters = Choose( a, CONVERTERS, 'converter' )
+            elif ( o in ( '-j', '--jobs' ) ):
+                jobs = max( 1, int( a ) )
+            elif ( '--out-of-core' == o ):
+                out_of_core = True
+            elif ( o in ( '-r', '--repeat' ) ):
+                repeat = max( 1, int( a ) )
+            elif ( o in ( '-w', '--work' ) ):
+                work_dir = a
+            elif ( o in ( '-k', '--keep' ) ):
+                keep = True
+            elif ( '--child' == o ):
+                child = Choose( a, CONVERTERS, 'converter' )[0]
+    except ValueError as e:
+        return Usage( argv[0], str( e ) )
+
+    if ( None != child ):
+        if ( 3 != len(args) ):
+            return Usage( argv[0], '--child needs obj, out dir and result file' )
+        return RunCase( child, args[0], args[1], args[2], jobs, out_of_core )
+
+    if ( 0 != len(args) ):
+        return Usage( argv[0], 'unexpected arguments: %s' % ( ' '.join( args ), ) )
+
+    commit, dirty = GitCommit()
+    if ( None == output ):
+        output = 'bench-%s.json' % ( commit[:10] if ( commit ) else 'unknown', )
+
+    made = ( None == work_dir )
+    if ( made ):
+        work_dir = tempfile.mkdtemp( prefix='mesh2-bench-' )
+    else:
+        os.makedirs( work_dir, exist_ok=True )
+
+    report = { 'version'  : BENCH_VERSION,
+               'commit'   : commit,
+               'dirty'    : dirty,
+               'date'     : time.strftime( '%Y-%m-%dT%H:%M:%S' ),
+               'host'     : { 'python'   : platform.python_version(),
+                              'numpy'    : np.__version__,
+                              'platform' : platform.platform(),
+                              'cpus'     : os.cpu_count() },
+               'options'  : { 'jobs' : jobs, 'out_of_core' : out_of_core, 'repeat' : repeat },
+               'cases'    : [] }
+
+    sys.stderr.write( '\n%-7s %-6s %-7s %10s %8s %9s %12s %8s %9s\n' %
+                      ( 'conv', 'shape', 'variant', 'faces', 'MB', 'seconds',
+                        'faces/s', 'MB/s', 'RSS MB', ) )
+
+    try:
+        for size in sizes:
+            for shape in shapes:
+                for variant in variants:
+                    name = '%s-%d-%s' % ( shape, size, variant, )
+                    obj_filename = os.path.join( work_dir, name + '.obj' )
+                    if ( not any( variant in SUPPORTED[c] for c in converters ) ):
+                        continue
+
+                    faces     = make_obj.MakeObj( obj_filename, shape, size, variant )
+                    obj_bytes = os.path.getsize( obj_filename )
+
+                    for conv in converters:
+                        if ( variant not in SUPPORTED[conv] ):
+                            continue
+
+                        case = { 'name'      : name,
+                                 'converter' : conv,
+                                 'shape'     : shape,
+                                 'size'      : size,
+                                 'variant'   : variant,
+                                 'faces'     : faces,
+                                 'obj_bytes' : obj_bytes }
+
+                        best = None
+                        for _ in range( repeat ):
+                            r = Measure( conv, obj_filename, work_dir, jobs, out_of_core )
+                            if ( 'error' in r ):
+                                best = r
+                                break
+                            if ( None == best or
+                                 sum( r['phases'].values() ) < sum( best['phases'].values() ) ):
+                                best = r
+
+                        case.update( best )
+                        if ( 'error' in case ):
+                            sys.stderr.write( '%-7s %-6s %-7s %10d %8.1f  ERROR: %s\n' %
+                                              ( conv, shape, variant, faces, obj_bytes / 1.0e6,
+                                                case['error'], ) )
+                        else:
+                            seconds = sum( case['phases'].values() )
+                            case['seconds']      = seconds
+                            case['faces_per_s']  = faces / max( seconds, 1.0e-9 )
+                            case['mb_per_s']     = obj_bytes / 1.0e6 / max( seconds, 1.0e-9 )
+                            sys.stderr.write( '%-7s %-6s %-7s %10d %8.1f %9.3f %12.0f %8.1f %9.1f\n' %
+                                              ( conv, shape, variant, faces, obj_bytes / 1.0e6,
+                                                seconds, case['faces_per_s'], case['mb_per_s'],
+                                                case['peak_rss_mb'], ) )
+
+                        report['cases'].append( case )
+
+                    if ( not keep ):
+                        os.remove( obj_filename )
+                        os.remove( os.path.splitext( obj_filename )[0] + '.mtl' )
+    finally:
+        if ( made and not keep ):
+            shutil.rmtree( work_dir, ignore_errors=True )
+
+    with open( output, 'w' ) as fp:
+        json.dump( report, fp, indent=2, sort_keys=True )
+        fp.write( '\n' )
+
+    sys.stderr.write( '\nResults: %s\n\n' % ( output, ) )
+    return 0
+
+
+#/ =======================================================================================
+if ( '__main__' == __name__ ): sys.exit( main( len( sys.argv ), sys.argv ) )
+#/ =======================================================================================
+#/ **                                 R U N _ B E N C H                                 **
+#/ =========================================================================== END FILE ==
@@ -27,8 +27,8 @@ Date:   2013-Jul-14
 """
 #/ =======================================================================================
 
-import sys
-import inspect, datetime
+import sys, os, time, json, queue, atexit, threading
+import datetime, cProfile
 
 UNSET    = 0
 CRITICAL = 1
@@ -37,6 +37,8 @@ WARNING  = 3
 INFO     = 4
 DEBUG    = 5
 
+TAG      = 'UCEWID'
+
 #/ =======================================================================================
 class AbortHandler:
     #/ -----------------------------------------------------------------------------------
@@ -67,17 +69,131 @@ def TimeStamp():
 
 #/ =======================================================================================
 def LOCATION( level = 1 ):
+    #/ -----------------------------------------------------------------------------------
+    """ 'file: function: line' of the frame level calls above this one """
     #/ -----------------------------------------------------------------------------------
     try:
-        sobj     = inspect.stack()
-        temp     = sobj[level]
-        filename = temp[1].split('/')[-1:][0]
-        lineno   = temp[2]
-        funcname = temp[3]
-        return "%s: %s: %d" % (filename, funcname, lineno)
-    except:
-        pass
-    return "?: ?: ?"
+        frame = sys._getframe( level )
+    except ValueError:
+        return "?: ?: ?"
+    return "%s: %s: %d" % ( os.path.basename( frame.f_code.co_filename ),
+                            frame.f_code.co_name, frame.f_lineno, )
+
+#/ =======================================================================================
+class Span:
+    #/ -----------------------------------------------------------------------------------
+    """
+    A named, timed region of a run. Use it through the logger:
+
+        with logger.span( 'parse' ):
+            ...
+
+    Spans opened inside another span are recorded under 'outer/inner'.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, impl, name ):
+        #/ -------------------------------------------------------------------------------
+        self.impl = impl
+        self.name = name
+
+    #/ ===================================================================================
+    def __enter__( self ):
+        #/ -------------------------------------------------------------------------------
+        self.impl.enterSpan( self.name )
+        return self
+
+    #/ ===================================================================================
+    def __exit__( self, exc_type, exc_value, traceback ):
+        #/ -------------------------------------------------------------------------------
+        self.impl.leaveSpan()
+        return False
+
+#/ =======================================================================================
+class LogWriter:
+    #/ -----------------------------------------------------------------------------------
+    """
+    Log file sink with a single open handle. write() only queues the line; a daemon
+    thread takes whatever has queued up and writes it in one call. flush() returns
+    once every line queued before it is in the file.
+    """
+    #/ -----------------------------------------------------------------------------------
+    BATCH = 4096   #/ most lines per write
+
+    def __init__( self, fspc ):
+        #/ -------------------------------------------------------------------------------
+        self.fspc   = fspc
+        self.pid    = os.getpid()
+        self.fp     = open( fspc, 'a' )
+        self.queue  = queue.Queue()
+        self.thread = threading.Thread( target=self.run, name='TLogger', daemon=True )
+        self.thread.start()
+
+    #/ ===================================================================================
+    def write( self, line ):
+        #/ -------------------------------------------------------------------------------
+        self.queue.put( line )
+
+    #/ ===================================================================================
+    def flush( self ):
+        #/ -------------------------------------------------------------------------------
+        done = threading.Event()
+        self.queue.put( done )
+        done.wait()
+
+    #/ ===================================================================================
+    def close( self ):
+        #/ -------------------------------------------------------------------------------
+        self.queue.put( None )
+        self.thread.join()
+        self.fp.close()
+
+    #/ ===================================================================================
+    def run( self ):
+        #/ -------------------------------------------------------------------------------
+        stop = False
+        while ( not stop ):
+            item   = self.queue.get()
+            lines  = []
+            events = []
+            while ( True ):
+                if ( None == item ):
+                    stop = True
+                elif ( isinstance( item, threading.Event ) ):
+                    events.append( item )
+                else:
+                    lines.append( item )
+                if ( stop or self.BATCH <= len(lines) ):
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if ( lines ):
+                try:
+                    self.fp.write( ''.join( lines ) )
+                    self.fp.flush()
+                except ( IOError, ValueError ):
+                    sys.stderr.write( "[%s] **W** Failed to write log file: %s\n" %
+                                      ( TimeStamp(), self.fspc, ) )
+            for done in events:
+                done.set()
+
+#/ =======================================================================================
+def WorkerInit( records, console_level, write_level, abort_level, logfile_name ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Initializer for worker processes (multiprocessing.Pool, ProcessPoolExecutor):
+    the worker's records go to the parent over the records queue. The arguments
+    come from getInstance().workerArgs() in the parent.
+    """
+    #/ -----------------------------------------------------------------------------------
+    logger = getInstance()
+    logger.console_level = console_level
+    logger.write_level   = write_level
+    logger.abort_level   = abort_level
+    logger.logfile_name  = logfile_name   #/ written by the parent
+    logger.forward( records )
 
 #/ =======================================================================================
 class getInstance:
@@ -97,6 +213,15 @@ class getInstance:
             self.abort_handler = AbortHandler( )
             self.flag = True
 
+            self.writer   = None   #/ LogWriter of logfile_name
+            self.records  = None   #/ queue to the parent, in a worker process
+            self.listener = None   #/ ( queue, thread ) receiving worker records
+            atexit.register( self.shutdown )
+
+            self.profile_name = None
+            self.profiler     = None
+            self.resetMetrics()
+
             self.code = { 0:UNSET,    'UNSET':    UNSET,
                           1:CRITICAL, 'CRITICAL': CRITICAL,
                           2:ERROR,    'ERROR':    ERROR,
@@ -119,80 +244,242 @@ class getInstance:
             self.flag = False
 
         #/ ===============================================================================
-        def message( self, level, str1, str2 = None ):
+        def enabled( self, level ):
             #/ ---------------------------------------------------------------------------
-            """ """
+            """ True if a record of this level would be displayed or written """
             #/ ---------------------------------------------------------------------------
-            tag = 'UCEWID'
+            return self.flag and ( ( level <= self.console_level ) or
+                                   ( ( level <= self.write_level ) and
+                                     ( None != self.logfile_name ) ) )
 
-            if ( self.flag ):
-                if ( None == str2 ):
-                    msg = "[%s] **%s** %s" % ( TimeStamp(), tag[level%6],
-                                               str1, )
+        #/ ===============================================================================
+        def emit( self, level, str1, args, location ):
+            #/ ---------------------------------------------------------------------------
+            """
+            Common body of message() and the level methods; args are %-formatted
+            into str1. The old two string form, info( 'Label', 'value' ), is kept:
+            a single str argument to a str1 without any '%' is shown as
+            "( str1 ) value". The levels are checked first; the text is formatted,
+            timestamped and given its call site (two frames up, the caller of the
+            public method) only if it is shown.
+            """
+            #/ ---------------------------------------------------------------------------
+            if ( not self.flag ):
+                return
+
+            console = ( level <= self.console_level )
+            write   = ( level <= self.write_level ) and ( None != self.logfile_name )
+
+            if ( console or write ):
+                if (( 1 == len(args) ) and ( isinstance( args[0], str ) ) and
+                    ( '%' not in str1 )):
+                    str1 = "( %s ) %s" % ( str1, args[0], )
+                elif ( args ):
+                    try:
+                        str1 = str1 % args
+                    except ( TypeError, ValueError ):
+                        #/ ----- show the mistake instead of losing the record -----------
+                        str1 = "%s  [bad log arguments: %r]" % ( str1, args, )
+
+                if ( location ):
+                    str1 = "( %s ) %s" % ( LOCATION( 3 ), str1, )
+
+                msg = "[%s] **%s** %s" % ( TimeStamp(), TAG[level%6], str1, )
+
+                if ( None != self.records ):
+                    self.records.put( ( level, msg ) )
                 else:
-                    msg = "[%s] **%s** ( %s ) %s" % ( TimeStamp(), tag[level%6],
-                                                      str1, str2, )
-                #/ ----- console display (stderr) ----------------------------------------
+                    self.record( level, msg )
+
+            #/ ----- abort the program if this level is reached --------------------------
+
+            if ( level <= self.abort_level ):
+                self.drain()
+                self.flush()
+                self.abort_handler.handle( level )
+
+        #/ ===============================================================================
+        def record( self, level, msg ):
+            #/ ---------------------------------------------------------------------------
+            """ Display and/or write a formatted record, here or from a worker """
+            #/ ---------------------------------------------------------------------------
+
+            #/ ----- console display (stderr) --------------------------------------------
+
+            if ( level <= self.console_level ):
+                sys.stderr.write( "%s\n" % ( msg, ) )
+
+            #/ ----- log to a file -------------------------------------------------------
+
+            if ( ( level <= self.write_level ) and ( None != self.logfile_name ) ):
+                writer = self.writer
+                if ( ( None == writer ) or ( os.getpid() != writer.pid ) ):
+                    #/ a forked child does not own its parent's writer thread
+                    try:
+                        writer = self.writer = LogWriter( self.logfile_name )
+                    except IOError:
+                        sys.stderr.write( "[%s] **W** Failed to open log file: %s\n" %
+                                          ( TimeStamp(), self.logfile_name, ) )
+                        return
+                writer.write( "%s\n" % ( msg, ) )
+
+        #/ ===============================================================================
+        def flush( self ):
+            #/ ---------------------------------------------------------------------------
+            """ Wait until every record so far is in the log file """
+            #/ ---------------------------------------------------------------------------
+            if ( ( None != self.writer ) and ( os.getpid() == self.writer.pid ) ):
+                self.writer.flush()
+
+        #/ ===============================================================================
+        def drain( self ):
+            #/ ---------------------------------------------------------------------------
+            """
+            In a worker, hand every record so far to the parent before an abort: the
+            records queue is closed and its feeder thread joined. Later records of
+            the worker are displayed and written by the worker itself.
+            """
+            #/ ---------------------------------------------------------------------------
+            records, self.records = self.records, None
+            if ( None != records ):
+                records.close()
+                records.join_thread()
 
-                if (level <= self.console_level):
-                    sys.stderr.write( "%s\n" % ( msg, ) )
+        #/ ===============================================================================
+        def closeLog( self ):
+            #/ ---------------------------------------------------------------------------
+            """ Flush and close the log file; the next record opens it again """
+            #/ ---------------------------------------------------------------------------
+            writer, self.writer = self.writer, None
+            if ( ( None != writer ) and ( os.getpid() == writer.pid ) ):
+                writer.close()
 
-                #/ ----- log to a file -------------------------------------------------------
+        #/ ===============================================================================
+        def forward( self, records ):
+            #/ ---------------------------------------------------------------------------
+            """ Send the records of this (worker) process to records, None to stop """
+            #/ ---------------------------------------------------------------------------
+            self.records = records
 
-                if ( self.logfile_name ):
-                    if ( level <= self.write_level ):
-                        try:
-                            open( self.logfile_name,'a' ).write( "%s\n" % ( msg, ) )
-                        except IOError:
-                            msg = "[%s] **W** Failed to open log file: %s" % ( TimeStamp(),
-                                                                               self.logfile_name )
+        #/ ===============================================================================
+        def listen( self ):
+            #/ ---------------------------------------------------------------------------
+            """
+            Return a multiprocessing queue that worker processes forward their records
+            to; a thread of this process displays and writes them.
+            """
+            #/ ---------------------------------------------------------------------------
+            if ( None == self.listener ):
+                import multiprocessing
+                records = multiprocessing.Queue()
+                stop    = threading.Event()
+                thread  = threading.Thread( target=self.receive, args=( records, stop ),
+                                            name='TLogger-listener', daemon=True )
+                thread.start()
+                self.listener = ( records, stop, thread )
+            return self.listener[0]
 
-	        #/ ----- abort the program if this level is reached --------------------------
+        #/ ===============================================================================
+        def receive( self, records, stop ):
+            #/ ---------------------------------------------------------------------------
+            """ Listener thread: record what the workers send until stop is set """
+            #/ ---------------------------------------------------------------------------
+            while ( not stop.is_set() ):
+                try:
+                    item = records.get( timeout=0.1 )
+                except queue.Empty:
+                    continue
+                self.record( *item )
+
+            #/ ----- whatever arrived before the stop -------------------------------------
+
+            while ( True ):
+                try:
+                    item = records.get_nowait()
+                except ( queue.Empty, OSError, EOFError ):
+                    return
+                self.record( *item )
 
-                if ( level <= self.abort_level ):
-                    self.abort_handler.handle( level )
+        #/ ===============================================================================
+        def workerArgs( self, console_level = None ):
+            #/ ---------------------------------------------------------------------------
+            """
+            initargs for WorkerInit, with this process as the receiving end. The
+            workers use console_level if given, else the level of this process.
+            """
+            #/ ---------------------------------------------------------------------------
+            if ( None == console_level ):
+                console_level = self.console_level
+            return ( self.listen(), console_level, self.write_level, self.abort_level,
+                     self.logfile_name )
+
+        #/ ===============================================================================
+        def shutdown( self ):
+            #/ ---------------------------------------------------------------------------
+            """ Stop the listener and close the log file (at exit) """
+            #/ ---------------------------------------------------------------------------
+            listener, self.listener = self.listener, None
+            if ( None != listener ):
+                listener[1].set()
+                listener[2].join()
+            self.closeLog()
 
         #/ ===============================================================================
-        def critical(self, str1, str2 = None ):
+        def message( self, level, str1, str2 = None, location = False ):
+            #/ ---------------------------------------------------------------------------
+            """
+            Display and/or write a record, as "( str1 ) str2" when str2 is given.
+            str1 is never %-formatted here; the level methods (info, ...) take
+            printf style arguments. With location=True the caller's file, function
+            and line are prefixed.
+            """
+            #/ ---------------------------------------------------------------------------
+            if ( None != str2 ):
+                self.emit( level, '( %s ) %s', ( str1, str2, ), location )
+            else:
+                self.emit( level, '%s', ( str1, ), location )
+
+        #/ ===============================================================================
+        def critical(self, str1, *args, location = False ):
             #/ ---------------------------------------------------------------------------
             """ Display critical message text with a date/time stamp """
             #/ ---------------------------------------------------------------------------
-            self.message( CRITICAL, str1, str2 )
+            self.emit( CRITICAL, str1, args, location )
 
         #/ ===============================================================================
-        def error(self, str1, str2 = None ):
+        def error(self, str1, *args, location = False ):
             #/ ---------------------------------------------------------------------------
             """ Display error message text with a date/time stamp """
             #/ ---------------------------------------------------------------------------
-            self.message( ERROR, str1, str2 )
+            self.emit( ERROR, str1, args, location )
 
         #/ ===============================================================================
-        def warning(self, str1, str2 = None ):
+        def warning(self, str1, *args, location = False ):
             #/ ---------------------------------------------------------------------------
             """ Display warning message text with a date/time stamp """
             #/ ---------------------------------------------------------------------------
-            self.message( WARNING, str1, str2 )
+            self.emit( WARNING, str1, args, location )
 
         #/ ===============================================================================
-        def warn(self, str1, str2 = None ):
+        def warn(self, str1, *args, location = False ):
             #/ ---------------------------------------------------------------------------
             """ Display warning message text with a date/time stamp """
             #/ ---------------------------------------------------------------------------
-            self.message( WARNING, str1, str2 )
+            self.emit( WARNING, str1, args, location )
 
         #/ ===============================================================================
-        def info(self, str1, str2 = None ):
+        def info(self, str1, *args, location = False ):
             #/ ---------------------------------------------------------------------------
             """ Display info message text with a date/time stamp """
             #/ ---------------------------------------------------------------------------
-            self.message( INFO, str1, str2 )
+            self.emit( INFO, str1, args, location )
 
         #/ ===============================================================================
-        def debug(self, str1, str2 = None ):
+        def debug(self, str1, *args, location = False ):
             #/ ---------------------------------------------------------------------------
             """ Display debug message text with a date/time stamp """
             #/ ---------------------------------------------------------------------------
-            self.message( DEBUG, str1, str2 )
+            self.emit( DEBUG, str1, args, location )
 
         #/ ===============================================================================
         def setAbortLevel(self, n):
@@ -229,10 +516,98 @@ class getInstance:
             #/ ---------------------------------------------------------------------------
             """ set the name of the log file """
             #/ ---------------------------------------------------------------------------
+            self.closeLog()
             self.logfile_name = fspc
             if ( UNSET < new_level ):
                 self.setWriteLevel( new_level )
 
+        #/ ===============================================================================
+        def resetMetrics(self):
+            #/ ---------------------------------------------------------------------------
+            """ Clear the spans and counters and start a new run """
+            #/ ---------------------------------------------------------------------------
+            self.spans      = {}
+            self.counters   = {}
+            self.open_spans = []
+            self.run_start  = time.time()
+            self.run_clock  = time.perf_counter()
+            if ( self.profile_name ):
+                self.profiler = cProfile.Profile()
+
+        #/ ===============================================================================
+        def span(self, name):
+            #/ ---------------------------------------------------------------------------
+            """ Return a context manager that times the named region """
+            #/ ---------------------------------------------------------------------------
+            return Span( self, name )
+
+        #/ ===============================================================================
+        def enterSpan(self, name):
+            #/ ---------------------------------------------------------------------------
+            """ Open a span, nested in the innermost open span """
+            #/ ---------------------------------------------------------------------------
+            if ( self.open_spans ):
+                name = '%s/%s' % ( self.open_spans[-1][0], name, )
+            elif ( self.profiler ):
+                self.profiler.enable()
+            self.open_spans.append( ( name, time.perf_counter() ) )
+
+        #/ ===============================================================================
+        def leaveSpan(self):
+            #/ ---------------------------------------------------------------------------
+            """ Close the innermost open span and add its time to the run """
+            #/ ---------------------------------------------------------------------------
+            name, start = self.open_spans.pop()
+            entry = self.spans.setdefault( name, [ 0, 0.0 ] )
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+            if ( self.profiler and not self.open_spans ):
+                self.profiler.disable()
+
+        #/ ===============================================================================
+        def count(self, name, n = 1):
+            #/ ---------------------------------------------------------------------------
+            """ Add n to the named counter """
+            #/ ---------------------------------------------------------------------------
+            self.counters[name] = self.counters.get( name, 0 ) + n
+
+        #/ ===============================================================================
+        def setProfile(self, fspc):
+            #/ ---------------------------------------------------------------------------
+            """ Profile the outermost spans with cProfile, None to stop profiling """
+            #/ ---------------------------------------------------------------------------
+            self.profile_name = fspc
+            self.profiler     = cProfile.Profile() if ( fspc ) else None
+
+        #/ ===============================================================================
+        def summary(self):
+            #/ ---------------------------------------------------------------------------
+            """ Return the spans and counters of this run as a dict """
+            #/ ---------------------------------------------------------------------------
+            return { 'start':    datetime.datetime.fromtimestamp( self.run_start ).isoformat(),
+                     'seconds':  time.perf_counter() - self.run_clock,
+                     'host':     os.uname()[1] if ( hasattr( os, 'uname' ) ) else None,
+                     'pid':      os.getpid(),
+                     'argv':     list( sys.argv ),
+                     'spans':    dict( ( k, { 'count': v[0], 'seconds': v[1] } )
+                                       for k, v in self.spans.items() ),
+                     'counters': dict( self.counters ),
+                     'profile':  self.profile_name }
+
+        #/ ===============================================================================
+        def writeSummary(self, fspc):
+            #/ ---------------------------------------------------------------------------
+            """ Write the summary as JSON (and the cProfile stats, if profiling) """
+            #/ ---------------------------------------------------------------------------
+            try:
+                with open( fspc, 'w' ) as fp:
+                    json.dump( self.summary(), fp, indent=2, sort_keys=True )
+                    fp.write( '\n' )
+                if ( self.profiler ):
+                    self.profiler.dump_stats( self.profile_name )
+            except IOError:
+                self.warning( 'Failed to write metrics: %s', fspc )
+
     #/ ===================================================================================
     # storage for the instance reference
     __instance = None
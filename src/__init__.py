@@ -121,6 +121,40 @@ class ExportOBJW(bpy.types.Operator, ExportHelper):
         default     = True,
     )
 
+    use_direct_export: BoolProperty(
+        name        = "Direct Export",
+        description = "Hand the meshes to the Mesh2 writer in memory instead of " +
+        "going through a temporary OBJ file",
+        default     = True,
+    )
+
+    use_instances: BoolProperty(
+        name        = "Instances",
+        description = "Declare each shared mesh once in local space and place every " +
+        "object with its matrix (Direct Export only)",
+        default     = False,
+    )
+
+    use_dedup: BoolProperty(
+        name        = "Merge Materials",
+        description = "Declare materials that render the same texture only once",
+        default     = False,
+    )
+
+    texture_library: StringProperty(
+        name        = "Texture Library",
+        description = "Merge the textures into this shared include instead of " +
+        "declaring them in every export (empty: off)",
+        default     = "",
+        subtype     = 'FILE_PATH',
+    )
+
+    use_metrics: BoolProperty(
+        name        = "Write Metrics",
+        description = "Write the phase times and counters of the export to *-metrics.json",
+        default     = False,
+    )
+
     #/ ----- keep these in include -------------------------------------------------------
 
     use_selection: BoolProperty(
@@ -175,7 +209,8 @@ class ExportOBJW(bpy.types.Operator, ExportHelper):
 
     use_animation: BoolProperty(
         name="Animation",
-        description="Write out a PovRay file for each frame",
+        description="Write out a PovRay file for each frame, sharing the mesh topology "
+        "between frames in a common include (Direct Export only)",
         default=False,
     )
 
@@ -251,8 +286,25 @@ class ExportOBJW(bpy.types.Operator, ExportHelper):
 
         logger.info( 'execute IO_MESH_POV::Mesh2 wrapper' )
 
+        from . import convert_obj_to_mesh2
+
+        logger.resetMetrics()
+
+        with logger.span( 'export' ):
+            rv = self.export(context)
+
+        if ( self.use_metrics ):
+            logger.writeSummary( convert_obj_to_mesh2.MetricsFileName( self.filepath ) )
+
+        return rv
+
+    #/ ===================================================================================
+    def export(self, context):
+        #/ -------------------------------------------------------------------------------
+
         from . import export_obj
         from . import convert_obj_to_mesh2
+        from . import mesh2_library
 
         from mathutils import Matrix
 
@@ -263,6 +315,10 @@ class ExportOBJW(bpy.types.Operator, ExportHelper):
                                             "filter_glob",
                                             "use_seaprate_files",
                                             "use_license",
+                                            "use_direct_export",
+                                            "use_dedup",
+                                            "texture_library",
+                                            "use_metrics",
                                             ))
 
         global_matrix = (Matrix.Scale(self.global_scale, 4) @
@@ -280,6 +336,47 @@ class ExportOBJW(bpy.types.Operator, ExportHelper):
 
         user_filepath = keywords['filepath']
 
+        include_textures      = self.use_materials
+        separate_texture_file = self.use_seaprate_files
+        put_license_in_header = self.use_license
+        merge_materials       = self.use_dedup
+
+        library = None
+        if ( self.texture_library ):
+            library = mesh2_library.TextureLibrary( bpy.path.abspath( self.texture_library ) )
+
+        #/ -------------------------------------------------------------------------------
+
+        if ( self.use_direct_export and self.use_animation ):
+            mesh2_writer = convert_obj_to_mesh2.AnimationWriter(
+                user_filepath,
+                use_textures      = include_textures,
+                make_texture_file = separate_texture_file,
+                include_license   = put_license_in_header,
+                dedup             = merge_materials,
+                library           = library )
+
+            rv = export_obj.save(context, mesh2_writer=mesh2_writer, **keywords)
+
+            mesh2_writer.report()
+
+            return rv
+
+        if ( self.use_direct_export ):
+            def mesh2_writer( inc_filename, collection ):
+                convert_obj_to_mesh2.WriteMesh2File(
+                    inc_filename, collection.objects, collection.materials,
+                    use_textures      = include_textures,
+                    make_texture_file = separate_texture_file,
+                    include_license   = put_license_in_header,
+                    dedup             = merge_materials,
+                    library           = library,
+                    instances         = collection.instances )
+
+            return export_obj.save(context, mesh2_writer=mesh2_writer, **keywords)
+
+        #/ -------------------------------------------------------------------------------
+
         user_path = os.sep.join(user_filepath.split(os.sep)[:-1])
 
         now = time.gmtime()
@@ -288,22 +385,20 @@ class ExportOBJW(bpy.types.Operator, ExportHelper):
             now.tm_year, now.tm_yday, now.tm_hour, now.tm_min, now.tm_sec, )
 
         keywords['filepath'] = temp_file
+        # Frames are only written by the direct export, see AnimationWriter.
+        keywords['use_animation'] = False
 
         rv = export_obj.save(context, **keywords)
 
         #/ -------------------------------------------------------------------------------
 
-        keywords = self.as_keywords()
-
-        include_textures      = keywords['use_materials']
-        separate_texture_file = keywords['use_seaprate_files']
-        put_license_in_header = keywords['use_license']
-
         convert_obj_to_mesh2.ConvertObj2Mesh2(
             temp_file, user_filepath,
             use_textures      = include_textures,
             make_texture_file = separate_texture_file,
-            include_license   = put_license_in_header )
+            include_license   = put_license_in_header,
+            dedup             = merge_materials,
+            library           = library )
 
         return rv
 
@@ -346,6 +441,11 @@ class OBJW_PT_export_include(bpy.types.Panel):
         layout.prop(operator, 'use_materials')
         layout.prop(operator, 'use_seaprate_files')
         layout.prop(operator, 'use_license')
+        layout.prop(operator, 'use_direct_export')
+        layout.prop(operator, 'use_instances')
+        layout.prop(operator, 'use_dedup')
+        layout.prop(operator, 'texture_library')
+        layout.prop(operator, 'use_metrics')
 
         #col = layout.column(heading="Objects as", align=True)
         #col.prop(operator, 'use_blen_objects')
@@ -354,7 +454,9 @@ class OBJW_PT_export_include(bpy.types.Panel):
 
         #layout.separator()
 
-        # layout.prop(operator, 'use_animation')
+        row = layout.row()
+        row.enabled = operator.use_direct_export
+        row.prop(operator, 'use_animation')
 
 
 #/ =======================================================================================
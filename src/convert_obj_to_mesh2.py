@@ -32,8 +32,14 @@
 #/
 #/ =======================================================================================
 
-import sys, os, time
-from . import TLogger
+import sys, os, io, time, warnings, tempfile, shutil, getopt, hashlib
+import concurrent.futures
+import numpy as np
+
+try:
+    from . import TLogger, obj_index, mesh2_cache, mesh2_optimize, mesh2_library
+except ImportError:
+    import TLogger, obj_index, mesh2_cache, mesh2_optimize, mesh2_library
 logger = TLogger.getInstance()
 
 #/ =======================================================================================
@@ -54,23 +60,355 @@ def RGB( rgb ):
     return [ float(rgb[0]), float(rgb[1]), float(rgb[2]) ]
 
 
+#/ =======================================================================================
+WRITE_BLOCK = 65536   #/ rows formatted per write call
+SIGNIFICANT = 15      #/ most significant digits of a compact vector (see CompactFormat)
+
+
+#/ =======================================================================================
+def Decimals( rows, decimals=None, max_error=None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Number of decimals for a vector section: decimals if given, else the fewest
+    that keep the rounding error below max_error times the diagonal of the bounding
+    box of rows. None (neither given) keeps the plain %f output. Raise ValueError for
+    negative decimals or a max_error that is not a positive number.
+    """
+    #/ -----------------------------------------------------------------------------------
+    if ( None != decimals ):
+        if ( 0 > int( decimals ) ):
+            raise ValueError( 'decimals must be 0 or more, not %r' % ( decimals, ) )
+        return int( decimals )
+    if ( None == max_error ):
+        return None
+    if ( not ( 0.0 < max_error < np.inf ) ):
+        raise ValueError( 'max_error must be a positive number, not %r' % ( max_error, ) )
+
+    size = 1.0
+    if ( 0 < len(rows) ):
+        box  = np.asarray( rows.max( axis=0 ) - rows.min( axis=0 ), dtype=np.float64 )
+        size = float( np.sqrt( ( box * box ).sum() ) ) or 1.0
+
+    return int( min( 12, max( 0, np.ceil( -np.log10( 2.0 * max_error * size ) ) ) ) )
+
+
+#/ =======================================================================================
+def CompactFormat( fmt, rows, decimals ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Replace the %f of fmt with a %g that prints rows rounded to decimals without
+    trailing zeros. The %g carries enough significant digits for the integer part
+    of the largest value, so it never switches to exponent form for large values,
+    but no more than SIGNIFICANT: past that a double shows its binary artifacts
+    (0.10000000000000001).
+    """
+    #/ -----------------------------------------------------------------------------------
+    top    = float( np.abs( rows ).max() ) if ( 0 < len(rows) ) else 0.0
+    digits = int( np.floor( np.log10( top ) ) ) + 1 if ( 1.0 <= top ) else 1
+
+    return fmt.replace( '%f', '%%.%dg' % ( min( SIGNIFICANT, digits + decimals ), ) )
+
+
+#/ =======================================================================================
+def PrecisionOption( key, val ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Value of a -p/--precision (decimals, 0 or more) or -e/--max-error (a positive
+    number) command line option. Raise getopt.GetoptError for anything else.
+    """
+    #/ -----------------------------------------------------------------------------------
+    try:
+        if ( key in ( '-p', '--precision' ) ):
+            value = int( val )
+            if ( 0 <= value ):
+                return value
+        else:
+            value = float( val )
+            if ( 0.0 < value < np.inf ):
+                return value
+    except ValueError:
+        pass
+
+    if ( key in ( '-p', '--precision' ) ):
+        raise getopt.GetoptError( 'option %s needs a whole number of decimals >= 0, '
+                                  'not %r' % ( key, val, ), key )
+    raise getopt.GetoptError( 'option %s needs a positive number, not %r' % ( key, val, ),
+                              key )
+
+
+#/ =======================================================================================
+def WriteSection( fp, section, fmt, rows, comments=False, decimals=None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Write one mesh2 list section. The row format is repeated over a block of rows and
+    filled from a single flat tuple, so each block costs one format and one write
+    instead of one per row. rows may be a tuple of arrays that are placed side by side
+    one block at a time, so disk backed columns are never loaded as a whole. With
+    decimals the values are rounded and written without trailing zeros.
+    """
+    #/ -----------------------------------------------------------------------------------
+    if ( not isinstance( rows, tuple ) ):
+        rows = ( rows, )
+
+    count = len(rows[0])
+
+    fp.write( '  %s {\n    %d,\n' % ( section, count, ) )
+
+    if ( None != decimals ):
+        fmt = CompactFormat( fmt, rows[0], decimals )
+
+    if ( comments ):
+        fmt = '    %s // %%d\n' % ( fmt, )
+    else:
+        fmt = '    %s\n' % ( fmt, )
+
+    for lo in range( 0, count, WRITE_BLOCK ):
+        block = [ col[lo:lo+WRITE_BLOCK] for col in rows ]
+        if ( None != decimals ):
+            block = [ np.round( col, decimals ) + 0.0 for col in block ]   #/ no -0
+        if ( comments ):
+            block.append( np.arange( lo, lo + len(block[0]) ) )
+        if ( 1 < len(block) ):
+            block = np.column_stack( block )
+        else:
+            block = block[0]
+        fp.write( ( fmt * len(block) ) % tuple( block.ravel().tolist() ) )
+
+    fp.write( '  }\n\n' )
+
+
+#/ =======================================================================================
+def WriteArray( fp, name, fmt, rows, decimals=None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Write rows as a PovRay array declaration, formatted in blocks like WriteSection.
+    """
+    #/ -----------------------------------------------------------------------------------
+    count = len(rows)
+
+    fp.write( '#declare %s = array[%d] {\n' % ( name, count, ) )
+
+    if ( None != decimals ):
+        fmt = CompactFormat( fmt, rows, decimals )
+
+    fmt = '    %s,\n' % ( fmt, )
+    for lo in range( 0, count, WRITE_BLOCK ):
+        block = rows[lo:lo+WRITE_BLOCK]
+        if ( None != decimals ):
+            block = np.round( block, decimals ) + 0.0
+        text  = ( fmt * len(block) ) % tuple( block.ravel().tolist() )
+        if ( lo + WRITE_BLOCK >= count ):
+            text = text[:-2] + '\n'   #/ no comma after the last element
+        fp.write( text )
+
+    fp.write( '}\n\n' )
+
+
+#/ =======================================================================================
+def SharedName( name, section ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Name of the array that holds a per frame section of a shared mesh2.
+    """
+    #/ -----------------------------------------------------------------------------------
+    return '%s_%s' % ( name, section, )
+
+
+#/ =======================================================================================
+def WriteShared( fp, section, count, name ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Write a mesh2 list section that is filled from the array name at parse time.
+    """
+    #/ -----------------------------------------------------------------------------------
+    fp.write( '  %s {\n    %d,\n' % ( section, count, ) )
+    if ( 0 < count ):
+        fp.write( '    #for ( I, 0, %d )\n      %s[I],\n    #end\n' % ( count - 1, name, ) )
+    fp.write( '  }\n\n' )
+
+
+#/ =======================================================================================
+def InstanceMatrix( m ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    POV-Ray matrix <...> of the 4x4 object to world matrix m (column vectors, as a
+    Blender matrix_world) for a mesh2 declared in local space. Mesh.write mirrors
+    x with scale <-1,1,1>, so the mirror is undone before m and done again after.
+    """
+    #/ -----------------------------------------------------------------------------------
+    S = np.diag( [ -1.0, 1.0, 1.0, 1.0 ] )
+    A = S @ np.asarray( m, dtype=np.float64 ) @ S
+
+    #/ ----- POV-Ray row i maps component i of a point, the last row is the offset ------
+
+    rows = np.vstack( ( A[:3,:3].T, A[:3,3] ) )
+    return 'matrix <%s>' % ( ','.join( '%.9g' % x for x in rows.ravel() ), )
+
+
+#/ =======================================================================================
+def WriteUnion( fp, union_name, obj, instances=None, transforms=False ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Write the union of an export: every object once, or with instances (a list of
+    ( mesh name, 4x4 matrix )) every occurrence as a transformed object. With
+    transforms the matrices are read from the transforms TransformName( union_name,
+    k ), which each animation frame declares.
+    """
+    #/ -----------------------------------------------------------------------------------
+    fp.write( '\n#declare %s = union {\n' % ( union_name, ) )
+
+    if ( None == instances ):
+        for o in obj:
+            fp.write( '  object { %s }\n' % ( o.name, ) )
+    elif ( transforms ):
+        for k, ( name, m ) in enumerate( instances ):
+            fp.write( '  object { %s transform { %s } }\n' % (
+                name, TransformName( union_name, k ), ) )
+    else:
+        for name, m in instances:
+            fp.write( '  object { %s %s }\n' % ( name, InstanceMatrix( m ), ) )
+
+    fp.write( '} // end union %s\n' % ( union_name, ) )
+
+
+#/ =======================================================================================
+def TransformName( union_name, k ):
+    #/ -----------------------------------------------------------------------------------
+    return SharedName( '%s_%d' % ( union_name, k, ), 'transform' )
+
+
+#/ =======================================================================================
+def _ReadOnly( a ):
+    #/ -----------------------------------------------------------------------------------
+    view = a.view()
+    view.flags.writeable = False
+    return view
+
+
 #/ =======================================================================================
 class Mesh:
     #/ -----------------------------------------------------------------------------------
-    def __init__( self, name ):
+    """
+    One mesh2 object held as contiguous typed columns:
+
+      vertex, normal   (N,3) float64 (or float32)
+      uv               (N,2) float64 (or float32)
+      face_vertex      (F,3) int32
+      face_uv          (F,3) int32
+      face_normal      (F,3) int32
+      face_material    (F,)  int32 index into self.materials
+
+    The properties return read-only numpy views, consumers get zero-copy access
+    through the buffer protocol. setGeometry() replaces the columns.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, name, dtype=np.float64 ):
         #/ -------------------------------------------------------------------------------
         #print( '*** New Mesh:', name )
         self.name     = NameOf(name)
-        self.vertex   = []
-        self.normal   = []
-        self.uv       = []
-        self.face     = []
+        self.dtype    = np.dtype( dtype )
         self.material = None
         self.smooth   = False
 
+        self._vertex        = np.zeros( (0,3), dtype=self.dtype )
+        self._normal        = np.zeros( (0,3), dtype=self.dtype )
+        self._uv            = np.zeros( (0,2), dtype=self.dtype )
+        self._face_vertex   = np.zeros( (0,3), dtype=np.int32 )
+        self._face_uv       = np.zeros( (0,3), dtype=np.int32 )
+        self._face_normal   = np.zeros( (0,3), dtype=np.int32 )
+        self._face_material = np.zeros( (0,),  dtype=np.int32 )
+
         self.materials       = []
         self.materials_index = -1
 
+    #/ ===================================================================================
+    def setGeometry( self, vertex=None, normal=None, uv=None,
+                     face_vertex=None, face_uv=None, face_normal=None,
+                     face_material=None ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Replace any of the columns. Inputs are anything numpy can turn into an array
+        of the right width; they are copied only if the type or layout differs.
+        """
+        #/ -------------------------------------------------------------------------------
+        def column( a, width, dtype ):
+            if ( not ( isinstance( a, np.memmap ) and a.dtype == dtype and
+                       a.flags.c_contiguous ) ):
+                a = np.ascontiguousarray( a, dtype=dtype )
+            if ( 0 == width ):
+                return a.reshape( -1 )
+            return a.reshape( -1, width )
+
+        if ( None is not vertex ):
+            self._vertex = column( vertex, 3, self.dtype )
+        if ( None is not normal ):
+            self._normal = column( normal, 3, self.dtype )
+        if ( None is not uv ):
+            self._uv = column( uv, 2, self.dtype )
+        if ( None is not face_vertex ):
+            self._face_vertex = column( face_vertex, 3, np.int32 )
+        if ( None is not face_uv ):
+            self._face_uv = column( face_uv, 3, np.int32 )
+        if ( None is not face_normal ):
+            self._face_normal = column( face_normal, 3, np.int32 )
+        if ( None is not face_material ):
+            self._face_material = column( face_material, 0, np.int32 )
+
+    #/ ===================================================================================
+    vertex        = property( lambda self: _ReadOnly( self._vertex ) )
+    normal        = property( lambda self: _ReadOnly( self._normal ) )
+    uv            = property( lambda self: _ReadOnly( self._uv ) )
+    face_vertex   = property( lambda self: _ReadOnly( self._face_vertex ) )
+    face_uv       = property( lambda self: _ReadOnly( self._face_uv ) )
+    face_normal   = property( lambda self: _ReadOnly( self._face_normal ) )
+    face_material = property( lambda self: _ReadOnly( self._face_material ) )
+
+    #/ ===================================================================================
+    def __getstate__( self ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Disk backed columns travel to worker processes as file references, the
+        worker maps the scratch file again instead of receiving a copy.
+        """
+        #/ -------------------------------------------------------------------------------
+        state = self.__dict__.copy()
+        for key, a in state.items():
+            if ( isinstance( a, np.memmap ) and None != a.filename ):
+                state[key] = ( 'memmap', a.filename, a.dtype.str, a.shape, a.offset )
+        return state
+
+    #/ ===================================================================================
+    def __setstate__( self, state ):
+        #/ -------------------------------------------------------------------------------
+        for key, a in state.items():
+            if ( isinstance( a, tuple ) and 5 == len(a) and 'memmap' == a[0] ):
+                state[key] = np.memmap( a[1], dtype=np.dtype( a[2] ), mode='r',
+                                        shape=a[3], offset=a[4] )
+        self.__dict__.update( state )
+
+    #/ ===================================================================================
+    def nbytes( self ):
+        #/ -------------------------------------------------------------------------------
+        return ( self._vertex.nbytes      + self._normal.nbytes      + self._uv.nbytes +
+                 self._face_vertex.nbytes + self._face_uv.nbytes     +
+                 self._face_normal.nbytes + self._face_material.nbytes )
+
+    #/ ===================================================================================
+    def key( self ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Content hash of the geometry, materials and smoothing; equal for meshes that
+        write the same mesh2 apart from the name.
+        """
+        #/ -------------------------------------------------------------------------------
+        h = hashlib.sha256( repr( ( self.smooth, self.materials,
+                                    self.dtype.str ) ).encode( 'utf-8' ) )
+        for col in ( self._vertex, self._normal, self._uv, self._face_vertex,
+                     self._face_uv, self._face_normal, self._face_material ):
+            h.update( np.ascontiguousarray( col ).tobytes() )
+            h.update( b'|' )
+        return h.hexdigest()
+
     #/ ===================================================================================
     def addMaterial( self, name ):
         #/ -------------------------------------------------------------------------------
@@ -80,7 +418,16 @@ class Mesh:
 
 
     #/ ===================================================================================
-    def write( self, fp, mat ):
+    def write( self, fp, mat, comments=False, shared=False, decimals=None, max_error=None ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Write the mesh2 declaration. Every section is formatted from the columns in
+        large blocks; comments=True appends a '// index' comment to each vector.
+        With shared=True the vertex and normal vectors are read from the arrays
+        SharedName( name, 'vertex' ) and SharedName( name, 'normal' ), which each
+        animation frame declares before it includes the mesh. decimals or max_error
+        select the compact vector format of each section (see Decimals).
+        """
         #/ -------------------------------------------------------------------------------
 
         has_image = False
@@ -89,7 +436,12 @@ class Mesh:
                 has_image = True
 
         if ( has_image ):
-            print( "one of the %d textures is an image" % ( len(self.materials), ) )
+            logger.debug( '    %s: one of the %d textures is an image',
+                          self.name, len(self.materials) )
+
+        #/ faces without uv or normal indices ('f v//n', 'f v/t') carry empty columns
+        has_uv     = ( len(self._face_uv)     == len(self._face_vertex) )
+        has_normal = ( len(self._face_normal) == len(self._face_vertex) )
 
         fp.write('// =======================================================================================\n' )
         fp.write( '#declare %s = mesh2 {\n' % ( self.name, ) )
@@ -97,30 +449,24 @@ class Mesh:
 
         #/ ----- write vectors -----------------------------------------------
 
-        fp.write( '  vertex_vectors {\n    %d,\n' % (len(self.vertex),) )
-        for i in range(len(self.vertex)):
-            x = self.vertex[i][0]
-            y = self.vertex[i][1]
-            z = self.vertex[i][2]
-            fp.write( '    <%f,%f,%f>, // %d\n' % ( x,y,z,i ) )
-        fp.write( '  }\n\n' )
-
-        if ( 0 < len(self.normal) ):
-            fp.write( '  normal_vectors {\n    %d,\n' % (len(self.normal),) )
-            for i in range(len(self.normal)):
-                nx = self.normal[i][0]
-                ny = self.normal[i][1]
-                nz = self.normal[i][2]
-                fp.write( '    <%f,%f,%f>, // %d\n' % ( nx,ny,nz,i ) )
-            fp.write( '  }\n\n' )
+        if ( shared ):
+            WriteShared( fp, 'vertex_vectors', len(self._vertex),
+                         SharedName( self.name, 'vertex' ) )
+        else:
+            WriteSection( fp, 'vertex_vectors', '<%f,%f,%f>,', self._vertex, comments,
+                          Decimals( self._vertex, decimals, max_error ) )
 
-        if ( 0 < len(self.normal) ):
-            fp.write( '  uv_vectors {\n    %d,\n' % (len(self.uv),) )
-            for i in range(len(self.uv)):
-                s = self.uv[i][0]
-                t = self.uv[i][1]
-                fp.write( '    <%f,%f>, // %d\n' % ( s,t,i ) )
-            fp.write( '  }\n\n' )
+        if ( 0 < len(self._normal) ):
+            if ( shared ):
+                WriteShared( fp, 'normal_vectors', len(self._normal),
+                             SharedName( self.name, 'normal' ) )
+            else:
+                WriteSection( fp, 'normal_vectors', '<%f,%f,%f>,', self._normal, comments,
+                              Decimals( self._normal, decimals, max_error ) )
+
+        if (( has_uv ) and (( 0 < len(self._normal) ) or ( 0 < len(self._face_uv) ))):
+            WriteSection( fp, 'uv_vectors', '<%f,%f>,', self._uv, comments,
+                          Decimals( self._uv, decimals, max_error ) )
 
         #/ ----- write lists -------------------------------------------------
 
@@ -132,46 +478,22 @@ class Mesh:
 
         #/ ----- write indices -----------------------------------------------
 
-
-        fp.write( '  face_indices {\n    %d,\n' % (len(self.face),) )
-
         if (( has_image ) or ( 1 == len(self.materials) )):
-            for i in range(len(self.face)):
-                v0 = self.face[i]['v'][0]
-                v1 = self.face[i]['v'][1]
-                v2 = self.face[i]['v'][2]
-                fp.write( '    <%d,%d,%d>,\n' % (v0, v1, v2) )
+            WriteSection( fp, 'face_indices', '<%d,%d,%d>,', self._face_vertex )
         else:
-            for i in range(len(self.face)):
-                v0 = self.face[i]['v'][0]
-                v1 = self.face[i]['v'][1]
-                v2 = self.face[i]['v'][2]
-                m  = self.face[i]['m']
-                fp.write( '    <%d,%d,%d>,%d\n' % (v0, v1, v2, m) )
-
-        fp.write( '  }\n\n' )
-
-        fp.write( '  normal_indices {\n    %d,\n' % (len(self.face),) )
-        for i in range(len(self.face)):
-            v0 = self.face[i]['n'][0]
-            v1 = self.face[i]['n'][1]
-            v2 = self.face[i]['n'][2]
-            fp.write( '    <%d,%d,%d>,\n' % (v0, v1, v2) )
-        fp.write( '  }\n\n' )
-
-        fp.write( '  uv_indices {\n    %d,\n' % (len(self.face),) )
-        for i in range(len(self.face)):
-            v0 = self.face[i]['t'][0]
-            v1 = self.face[i]['t'][1]
-            v2 = self.face[i]['t'][2]
-            fp.write( '    <%d,%d,%d>,\n' % (v0, v1, v2) )
-        fp.write( '  }\n\n' )
+            WriteSection( fp, 'face_indices', '<%d,%d,%d>,%d',
+                          ( self._face_vertex, self._face_material ) )
+
+        if ( has_normal ):
+            WriteSection( fp, 'normal_indices', '<%d,%d,%d>,', self._face_normal )
+        if ( has_uv ):
+            WriteSection( fp, 'uv_indices',     '<%d,%d,%d>,', self._face_uv )
 
         if ( has_image ):
             fp.write( '  uv_mapping' )
-            fp.write( '  texture { %s }\n' % ( self.materials[0] ) )
+            fp.write( '  texture { %s }\n' % ( mat[self.materials[0]].name ) )
         elif ( 1 == len(self.materials) ):
-            fp.write( '  texture { %s }\n' % ( self.materials[0] ) )
+            fp.write( '  texture { %s }\n' % ( mat[self.materials[0]].name ) )
 
         fp.write( 'scale <-1,1,1>\n' )
         fp.write( '} // end mesh2 %s\n\n' % (self.name,) )
@@ -214,6 +536,31 @@ class Material:
         #/ -------------------------------------------------------------------------------
         return ( None != self.uvimage )
 
+    #/ ===================================================================================
+    def body( self ):
+        #/ -------------------------------------------------------------------------------
+        """
+        The contents of the texture declaration: everything write() emits but the name.
+        """
+        #/ -------------------------------------------------------------------------------
+        if ( self.isImage() ):
+            img_ext = self.uvimage.split('.')[-1]
+            return ( '  pigment {\n' +
+                     '    image_map { %s "%s" }\n' % (img_ext, self.uvimage, ) +
+                     '  }\n' )
+
+        return ( '  pigment {\n' +
+                 '  color rgb <%f,%f,%f>\n' % (
+                     self.difuse[0], self.difuse[1], self.difuse[2], ) +
+                 '  }\n' )
+
+    #/ ===================================================================================
+    def key( self ):
+        #/ -------------------------------------------------------------------------------
+        """ Content hash of the texture; equal for materials that render the same. """
+        #/ -------------------------------------------------------------------------------
+        return hashlib.sha256( self.body().encode( 'utf-8' ) ).hexdigest()
+
     #/ ===================================================================================
     def write( self, fp, local=False ):
         #/ -------------------------------------------------------------------------------
@@ -224,28 +571,74 @@ class Material:
             fp.write( '#declare ' )
 
         fp.write( ' %s = texture {\n' % (self.name,) )
+        fp.write( self.body() )
+        fp.write( '} // end texture %s\n\n' % (self.name,) )
 
-        if ( self.isImage() ):
-            img_ext = self.uvimage.split('.')[-1]
-            fp.write('  pigment {\n')
-            fp.write('    image_map { %s "%s" }\n' % (img_ext, self.uvimage, ) )
-            fp.write('  }\n')
 
-        else:
-            fp.write( '  pigment {\n' )
-            fp.write( '  color rgb <%f,%f,%f>\n' % (
-                self.difuse[0], self.difuse[1], self.difuse[2], ) )
-            fp.write( '  }\n' )
+#/ =======================================================================================
+def DedupMaterials( materials ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Merge the materials that write the same texture (Material.key). Return a dict
+    with the keys of materials, each mapped to the first material of its group, so
+    the texture references of Mesh.write name the one declaration that is kept.
+    The materials themselves are not changed.
+    """
+    #/ -----------------------------------------------------------------------------------
+    canonical = {}
+    merged    = {}
+    for name, mat in materials.items():
+        merged[ name ] = canonical.setdefault( mat.key(), mat )
+
+    logger.count( 'materials_merged', len(materials) - len(canonical) )
+    return merged
 
-        fp.write( '} // end texture %s\n\n' % (self.name,) )
 
 #/ =======================================================================================
-def ParseMaterialFile( mtr_filename, mat_dict ):
+def UniqueMaterials( materials ):
+    #/ -----------------------------------------------------------------------------------
+    """ The distinct Material objects of a materials dict, in order. """
+    #/ -----------------------------------------------------------------------------------
+    seen   = set()
+    unique = []
+    for mat in materials.values():
+        if ( id(mat) not in seen ):
+            seen.add( id(mat) )
+            unique.append( mat )
+    return unique
+
+#/ =======================================================================================
+def ParseMaterialFile( mtr_filename, mat_dict, libraries=None ):
     #/ -----------------------------------------------------------------------------------
     #/ https://en.wikipedia.org/wiki/Wavefront_.obj_file
     #/ -----------------------------------------------------------------------------------
+    """
+    Parse an MTL file into mat_dict. libraries is an optional
+    mesh2_cache.MaterialCache; a file it holds is not read again while its mtime
+    and size stay the same.
+    """
+    #/ -----------------------------------------------------------------------------------
 
-    fp = open( mtr_filename, 'r' )
+    if ( None != libraries ):
+        mat_dict.update( libraries.load( mtr_filename, ParseMaterialFile ) )
+        return
+
+    with logger.span( 'mtl' ):
+        fp = open( mtr_filename, 'r' )
+
+        ParseMaterialLines( fp, mat_dict )
+
+        fp.close()
+
+
+#/ =======================================================================================
+def ParseMaterialLines( fp, mat_dict ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Parse MTL records from any iterable of text lines (an open file or a StringIO
+    filled by the Blender exporter) into mat_dict.
+    """
+    #/ -----------------------------------------------------------------------------------
 
     mat = None
 
@@ -354,20 +747,42 @@ def Separator(fp):
 
 
 #/ =======================================================================================
-def MakeTextureFile( inc_filename, materials, show=False ):
+def TextureFileName( inc_filename ):
     #/ -----------------------------------------------------------------------------------
+    basename = inc_filename.replace('.inc','').replace('.pov','')
+
+    return '%s-texture.inc' % (basename,)
 
+
+#/ =======================================================================================
+def CommonFileName( inc_filename ):
+    #/ -----------------------------------------------------------------------------------
     basename = inc_filename.replace('.inc','').replace('.pov','')
 
-    mat_filename = '%s-texture.inc' % (basename,)
+    return '%s-common.inc' % (basename,)
+
+
+#/ =======================================================================================
+def MetricsFileName( inc_filename ):
+    #/ -----------------------------------------------------------------------------------
+    basename = inc_filename.replace('.inc','').replace('.pov','')
+
+    return '%s-metrics.json' % (basename,)
+
+
+#/ =======================================================================================
+def MakeTextureFile( inc_filename, materials, show=False ):
+    #/ -----------------------------------------------------------------------------------
+
+    mat_filename = TextureFileName( inc_filename )
 
     fp = open( mat_filename, 'w' )
 
     PovRayHeader( fp, show=show )
 
     fp.write( '//\n' )
-    for mat in materials:
-        materials[mat].write(fp)
+    for mat in UniqueMaterials( materials ):
+        mat.write(fp)
 
     PovRayTrailer( fp )
 
@@ -377,183 +792,1029 @@ def MakeTextureFile( inc_filename, materials, show=False ):
 
 
 #/ =======================================================================================
-def ConvertObj2Mesh2( obj_filename, inc_filename,
-                      use_textures      = True,
-                      make_texture_file = False,
-                      include_license   = True ):
+class MeshCollection:
     #/ -----------------------------------------------------------------------------------
+    """
+    The objects and materials of one export. Filled either by ParseObjFile from a
+    Wavefront OBJ or directly in memory by export_obj.write_file. With instances
+    (a list, see WriteUnion) the objects are declared in local space and the
+    union places one object per instance; None places every object once.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, instancing=False ):
+        #/ -------------------------------------------------------------------------------
+        self.objects   = []
+        self.materials = {}
+        self.instances = [] if ( instancing ) else None
 
-    obj_root = os.sep.join(obj_filename.split(os.sep)[:-1])
 
+#/ =======================================================================================
+class MemoryStore:
+    #/ -----------------------------------------------------------------------------------
+    """
+    Keeps the rows ObjParser produces for each object as in-memory chunks.
+    """
     #/ -----------------------------------------------------------------------------------
+    def __init__( self ):
+        #/ -------------------------------------------------------------------------------
+        self.chunks = {}
+
+    #/ ===================================================================================
+    def append( self, obj, key, rows ):
+        #/ -------------------------------------------------------------------------------
+        self.chunks.setdefault( (obj, key), [] ).append( rows )
 
-    fp = open( obj_filename, 'r' )
+    #/ ===================================================================================
+    def join( self, obj, key, tail, dtype ):
+        #/ -------------------------------------------------------------------------------
+        parts = self.chunks.pop( (obj, key), [] )
+        if ( 0 == len(parts) ):
+            return np.zeros( (0,) + tail, dtype=dtype )
+        return np.concatenate( parts )
 
-    last_vertex  = 0
-    last_normal  = 0
-    last_uv      = 0
 
-    count_vertex = 0
-    count_normal = 0
-    count_uv     = 0
+#/ =======================================================================================
+class SpillStore:
+    #/ -----------------------------------------------------------------------------------
+    """
+    Appends the rows ObjParser produces for each object to raw scratch files and
+    hands them back as read-only numpy.memmap arrays, so the parsed geometry lives
+    on disk and is paged in only while it is written. Objects arrive one after the
+    other, only the files of the current object are kept open.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, scratch_dir ):
+        #/ -------------------------------------------------------------------------------
+        self.scratch_dir = scratch_dir
+        self.count       = {}
+        self.dtype       = {}
+        self.files       = {}
+        self.current     = None
+
+    #/ ===================================================================================
+    def _path( self, obj, key ):
+        #/ -------------------------------------------------------------------------------
+        return os.path.join( self.scratch_dir, 'obj%06d_%s.bin' % ( obj, key, ) )
+
+    #/ ===================================================================================
+    def close( self ):
+        #/ -------------------------------------------------------------------------------
+        for fh in self.files.values():
+            fh.close()
+        self.files = {}
 
-    obj = []
+    #/ ===================================================================================
+    def append( self, obj, key, rows ):
+        #/ -------------------------------------------------------------------------------
+        if ( obj != self.current ):
+            self.close()
+            self.current = obj
 
-    MaterialFiles = []
-    MF_count      = 0
+        fh = self.files.get( key )
+        if ( None == fh ):
+            fh = self.files[key] = open( self._path( obj, key ), 'ab' )
 
-    mesh = None
+        np.ascontiguousarray( rows ).tofile( fh )
+        self.count[ (obj, key) ] = self.count.get( (obj, key), 0 ) + len(rows)
+        self.dtype[ (obj, key) ] = rows.dtype
 
-    materials = {}
+    #/ ===================================================================================
+    def join( self, obj, key, tail, dtype ):
+        #/ -------------------------------------------------------------------------------
+        self.close()
+        count = self.count.get( (obj, key), 0 )
+        if ( 0 == count ):
+            return np.zeros( (0,) + tail, dtype=dtype )
+        return np.memmap( self._path( obj, key ), dtype=self.dtype[ (obj, key) ],
+                          mode='r', shape=(count,) + tail )
 
-    current_material = -1
 
+#/ =======================================================================================
+class ObjParser:
     #/ -----------------------------------------------------------------------------------
+    """
+    Bulk Wavefront OBJ parser. Every line of a buffer is classified on its leading
+    bytes, then all v, vt, vn and f records are converted to numpy arrays in one pass
+    per record type. Only the few control records (o, usemtl, s, mtllib) are handled
+    one at a time. feed() may be called repeatedly with buffers that end on a line
+    boundary; the object and material state carries over between calls. The rows
+    go to a MemoryStore, or to a SpillStore for out-of-core conversion. begin()
+    starts the parser at one object of an ObjIndex, so objects can be parsed on
+    their own and in any order. libraries is passed on to ParseMaterialFile.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, obj_root, materials, dtype=np.float64, store=None, libraries=None ):
+        #/ -------------------------------------------------------------------------------
+        self.obj_root  = obj_root
+        self.materials = materials
+        self.libraries = libraries
+        self.dtype     = dtype
+        self.store     = MemoryStore() if ( None == store ) else store
 
-    for raw in fp:
-        line = raw.strip().split()
-        if ( 0 < len(line) ):
-            key = line[0].strip()
-            if ( 'mtllib' == key ):
-                material_filename = '%s%s%s' % ( obj_root, os.sep, line[1].strip(), )
-                ParseMaterialFile( material_filename, materials )
-            elif ( 'o' == key ):
-                mesh = Mesh( line[1].strip() )
-                obj.append( mesh )
-                last_vertex  = count_vertex
-                last_normal  = count_normal
-                last_uv      = count_uv
-
-                #/print( '    last v:%d n:%d u:%d' % ( last_vertex, last_normal, last_uv,) )
-            elif ( 'v' == key ):
-                x = float( line[1] )
-                y = float( line[2] )
-                z = float( line[3] )
-                mesh.vertex.append( [x,y,z] )
-                count_vertex += 1
-                #print( 'vertex', [x,y,z] )
-            elif ( 'vt' == key ):
-                s = float( line[1] )
-                t = float( line[2] )
-                mesh.uv.append( [s,t] )
-                count_uv += 1
-                #print( 'uv', [s,t] )
-            elif ( 'vn' == key ):
-                nx = float( line[1] )
-                ny = float( line[2] )
-                nz = float( line[3] )
-                mesh.normal.append( [nx,ny,nz] )
-                count_normal += 1
-                #print( 'normal', [nx,ny,nz] )
-            elif ( 'usemtl' == key ):
-                current_material = mesh.addMaterial( line[1] )
-            elif ( 'f' == key ):
-                A = line[1].split('/')
-                B = line[2].split('/')
-                C = line[3].split('/')
-
-                v1 = int(A[0]) - last_vertex - 1
-                t1 = int(A[1]) - last_uv - 1
-                n1 = int(A[2]) - last_normal - 1
-
-                v2 = int(B[0]) - last_vertex - 1
-                t2 = int(B[1]) - last_uv - 1
-                n2 = int(B[2]) - last_normal - 1
-
-                v3 = int(C[0]) - last_vertex - 1
-                t3 = int(C[1]) - last_uv - 1
-                n3 = int(C[2]) - last_normal - 1
-
-                mesh.face.append( { 'v':[v1,v2,v3],
-                                    't':[t1,t2,t3],
-                                    'n':[n1,n2,n3],
-                                    'm': current_material } )
-            elif ('s' == key):
-                if ( 'off' == line[1].strip() ):
-                    mesh.smooth = False
-                else:
-                    mesh.smooth = True
+        self.objects = []
+        self.offsets = []   #/ per object: [ last_vertex, last_uv, last_normal ]
+
+        self.count_vertex = 0
+        self.count_normal = 0
+        self.count_uv     = 0
+
+        self.current_material = -1
+        self.number           = 0       #/ store key of the first object
+        self.absent           = False   #/ a face without uv or normal indices was read
+
+    #/ ===================================================================================
+    def begin( self, entry, number ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Take over the global record counts and the carried material of an ObjRange
+        and store the rows of its object under key number.
+        """
+        #/ -------------------------------------------------------------------------------
+        self.count_vertex     = entry.base[obj_index.KIND_V]
+        self.count_uv         = entry.base[obj_index.KIND_VT]
+        self.count_normal     = entry.base[obj_index.KIND_VN]
+        self.current_material = entry.material
+        self.number           = number
+
+    #/ ===================================================================================
+    def _control( self, line ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Apply one control record. Return the material index set by usemtl, else None.
+        """
+        #/ -------------------------------------------------------------------------------
+        line = line.strip().split()
+        if ( 0 == len(line) ):
+            return None
+
+        key = line[0]
+        if ( 'mtllib' == key ):
+            material_filename = '%s%s%s' % ( self.obj_root, os.sep, line[1].strip(), )
+            ParseMaterialFile( material_filename, self.materials, self.libraries )
+
+        elif ( 'o' == key ):
+            self.objects.append( Mesh( line[1].strip(), dtype=self.dtype ) )
+            self.offsets.append( [ self.count_vertex, self.count_uv, self.count_normal ] )
+
+        elif ( 'usemtl' == key ):
+            self.current_material = self._mesh( key ).addMaterial( line[1] )
+            return self.current_material
+
+        elif ( 's' == key ):
+            self._mesh( key ).smooth = ( 'off' != line[1].strip() )
+
+        return None
+
+    #/ ===================================================================================
+    def _mesh( self, key ):
+        #/ -------------------------------------------------------------------------------
+        if ( 0 == len(self.objects) ):
+            raise ValueError( "OBJ record '%s' found before the first object" % ( key, ) )
+        return self.objects[-1]
+
+    #/ ===================================================================================
+    def feed( self, data ):
+        #/ -------------------------------------------------------------------------------
+        buf = np.frombuffer( data, dtype=np.uint8 )
+        n   = len(buf)
+        if ( 0 == n ):
+            return
+
+        #/ ----- line boundaries and classification --------------------------------------
+
+        starts, ends, kind = obj_index.LineTable( buf )
+
+        is_v  = ( obj_index.KIND_V  == kind )
+        is_vt = ( obj_index.KIND_VT == kind )
+        is_vn = ( obj_index.KIND_VN == kind )
+        is_f  = ( obj_index.KIND_F  == kind )
+        is_c  = np.isin( kind, obj_index.CONTROL )
+
+        #/ ----- control records, in file order -----------------------------------------
+
+        first_object = len(self.objects)
+        start_material = self.current_material
+
+        n_v  = np.cumsum( is_v )
+        n_vt = np.cumsum( is_vt )
+        n_vn = np.cumsum( is_vn )
+
+        o_lines = []
+        u_lines = []
+        u_vals  = []
+
+        base_v  = self.count_vertex
+        base_vt = self.count_uv
+        base_vn = self.count_normal
+
+        for i in np.flatnonzero( is_c ).tolist():
+            #/ counts of the records that precede this line
+            self.count_vertex = base_v  + int( n_v[i]  )
+            self.count_uv     = base_vt + int( n_vt[i] )
+            self.count_normal = base_vn + int( n_vn[i] )
+
+            before = len(self.objects)
+            m = self._control( bytes( data[starts[i]:ends[i]] ).decode( 'utf-8', 'replace' ) )
+            if ( before < len(self.objects) ):
+                o_lines.append( i )
+            if ( None != m ):
+                u_lines.append( i )
+                u_vals.append( m )
+
+        self.count_vertex = base_v  + int( n_v[-1]  )
+        self.count_uv     = base_vt + int( n_vt[-1] )
+        self.count_normal = base_vn + int( n_vn[-1] )
+
+        o_lines = np.array( o_lines, dtype=np.int64 )
+
+        #/ ----- bulk conversion ---------------------------------------------------------
+
+        V  = self._numbers( data, starts, ends, is_v,  1, 3, np.float64 )
+        VT = self._numbers( data, starts, ends, is_vt, 2, 2, np.float64 )
+        VN = self._numbers( data, starts, ends, is_vn, 2, 3, np.float64 )
+        F  = self._numbers( data, starts, ends, is_f,  1, 9, np.int64 )
+
+        #/ ----- owning object of every record -------------------------------------------
+
+        def owner( mask ):
+            lines = np.flatnonzero( mask )
+            return lines, first_object - 1 + np.searchsorted( o_lines, lines, side='right' )
+
+        v_lines,  v_obj  = owner( is_v  )
+        vt_lines, vt_obj = owner( is_vt )
+        vn_lines, vn_obj = owner( is_vn )
+        f_lines,  f_obj  = owner( is_f  )
+
+        for lines, objs in ( (v_lines, v_obj), (vt_lines, vt_obj),
+                             (vn_lines, vn_obj), (f_lines, f_obj) ):
+            if ( 0 < len(objs) and 0 > objs[0] ):
+                raise ValueError( 'OBJ geometry found before the first object' )
+
+        #/ ----- faces: local indices and material ---------------------------------------
+
+        if ( 0 < len(F) ):
+            absent = ( 0 == F )   #/ OBJ indices start at 1, 0 marks an empty field
+            off = np.array( self.offsets, dtype=np.int64 )[f_obj] + 1
+            F[:,0::3] -= off[:,0:1]
+            F[:,1::3] -= off[:,1:2]
+            F[:,2::3] -= off[:,2:3]
+            if ( absent.any() ):
+                if ( absent[:,0::3].any() ):
+                    raise ValueError( 'OBJ face without a vertex index' )
+                F[absent]   = -1
+                self.absent = True
+
+            if ( 0 < len(u_lines) ):
+                last  = np.searchsorted( np.array( u_lines ), f_lines, side='right' ) - 1
+                M     = np.append( np.array( u_vals, dtype=np.int64 ), start_material )[last]
             else:
-                pass
+                M     = np.full( len(F), start_material, dtype=np.int64 )
+        else:
+            M = np.zeros( 0, dtype=np.int64 )
+
+        #/ ----- hand the rows to their objects -----------------------------------------
+
+        for key, rows, objs in ( ('v',  V.astype( self.dtype ),       v_obj),
+                                 ('t',  VT.astype( self.dtype ),      vt_obj),
+                                 ('n',  VN.astype( self.dtype ),      vn_obj),
+                                 ('fv', F[:,0::3].astype( np.int32 ), f_obj),
+                                 ('ft', F[:,1::3].astype( np.int32 ), f_obj),
+                                 ('fn', F[:,2::3].astype( np.int32 ), f_obj),
+                                 ('m',  M.astype( np.int32 ),         f_obj) ):
+            if ( 0 == len(rows) ):
+                continue
+            cuts = np.flatnonzero( np.diff( objs ) ) + 1
+            for lo, hi in zip( np.concatenate( ( [0], cuts ) ).tolist(),
+                               np.append( cuts, len(objs) ).tolist() ):
+                self.store.append( self.number + int( objs[lo] ), key, rows[lo:hi] )
 
-    fp.close()
+    #/ ===================================================================================
+    def _numbers( self, data, starts, ends, mask, skip, width, dtype ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Convert the payload of every line selected by mask into a (count, width) array.
+        Lines that do not hold exactly width plain numbers (quads, v/t/n gaps, extra
+        components) drop the whole record type to a per line conversion. There the
+        empty or missing fields of a face corner ('1//3', '1/2', '1') read as 0.
+        """
+        #/ -------------------------------------------------------------------------------
+        lines = np.flatnonzero( mask )
+        rows  = obj_index.ParseNumbers( data, starts, ends, lines, skip, width, dtype,
+                                        slashes=( 9 == width ) )
+        if ( None is not rows ):
+            return rows
+
+        #/ ----- irregular records ---------------------------------------------------------
+
+        rows = np.empty( (len(lines), width), dtype=dtype )
+        for i, (lo, hi) in enumerate( zip( ( starts[lines] + skip ).tolist(),
+                                           ends[lines].tolist() ) ):
+            tokens = bytes( data[lo:hi] ).split()
+            if ( 9 == width ):
+                rows[i] = [ int(x) if ( x ) else 0
+                            for t in tokens[0:3] for x in ( t.split(b'/') + [b'', b''] )[0:3] ]
+            else:
+                rows[i] = [ float(x) for x in tokens[0:width] ]
+        return rows
+
+    #/ ===================================================================================
+    def finish( self ):
+        #/ -------------------------------------------------------------------------------
+        join = self.store.join
+        for k, mesh in enumerate( self.objects, self.number ):
+            mesh.setGeometry( vertex        = join( k, 'v',  (3,), self.dtype ),
+                              uv            = join( k, 't',  (2,), self.dtype ),
+                              normal        = join( k, 'n',  (3,), self.dtype ),
+                              face_vertex   = join( k, 'fv', (3,), np.int32 ),
+                              face_uv       = join( k, 'ft', (3,), np.int32 ),
+                              face_normal   = join( k, 'fn', (3,), np.int32 ),
+                              face_material = join( k, 'm',  (),   np.int32 ) )
+            if ( self.absent ):
+                self._dropAbsent( mesh )
+
+        return self.objects
 
+    #/ ===================================================================================
+    def _dropAbsent( self, mesh ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Empty the uv or normal index column of a mesh whose faces have none of them.
+        mesh2 has no way to leave them out of some faces only; that is an error.
+        """
+        #/ -------------------------------------------------------------------------------
+        for column in ( 'face_uv', 'face_normal' ):
+            missing = ( 0 > getattr( mesh, column ) ).any( axis=1 )
+            if ( missing.all() ):
+                mesh.setGeometry( **{ column : np.zeros( (0,3), dtype=np.int32 ) } )
+            elif ( missing.any() ):
+                raise ValueError( "OBJ object '%s' has faces with and without %s indices" %
+                                  ( mesh.name, column[5:], ) )
+
+
+#/ =======================================================================================
+def ParseObjObject( index, k, obj_root, materials, dtype=np.float64, store=None,
+                    libraries=None ):
     #/ -----------------------------------------------------------------------------------
+    """
+    Parse object k of an ObjIndex into a Mesh, straight from the mapped file.
+    """
+    #/ -----------------------------------------------------------------------------------
+    entry  = index.objects[k]
+    parser = ObjParser( obj_root, materials, dtype=dtype, store=store, libraries=libraries )
+    parser.begin( entry, k )
 
-    short_name = inc_filename.split(os.sep)[-1].split('.')[0]
+    for lo, hi in index.blocks( entry.start, entry.end ):
+        parser.feed( index.view( lo, hi ) )
 
-    fp = open( inc_filename, 'w' )
+    return parser.finish()[0]
 
-    PovRayHeader( fp, show=include_license )
 
-    fp.write( '//\n// Objects:\n' )
-    for o in obj:
-        fp.write( '//    %s\n' % ( o.name, ) )
-    fp.write( '//\n' )
-    Separator(fp)
+#/ =======================================================================================
+def ParseObjFile( obj_filename, materials, dtype=np.float64, scratch=None, libraries=None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Parse a Wavefront OBJ file into a list of Mesh. The file is memory mapped and
+    indexed (obj_index.ObjIndex), the preamble is parsed for its mtllib records, then
+    every object is parsed from its own byte range in blocks of obj_index.READ_BLOCK
+    bytes. If scratch names a directory the geometry is spilled there (out-of-core)
+    and the meshes hold numpy.memmap columns backed by it. libraries is an optional
+    mesh2_cache.MaterialCache (see ParseMaterialFile).
+    """
+    #/ -----------------------------------------------------------------------------------
 
-    if ( make_texture_file ):
-        mname = MakeTextureFile( inc_filename, materials, show=include_license )
-        fp.write( '\n#include "%s"\n\n' % ( mname, ) )
+    obj_root = os.sep.join(obj_filename.split(os.sep)[:-1])
+
+    if ( None == scratch ):
+        store = None
     else:
-        fp.write( '\n' )
-        for mat in materials:
-            materials[mat].write(fp)
+        store = SpillStore( scratch )
 
-    for o in obj:
-        o.write(fp,materials)
+    with logger.span( 'parse' ):
+        index = obj_index.ObjIndex( obj_filename )
+        try:
+            parser = ObjParser( obj_root, materials, dtype=dtype, store=store,
+                                libraries=libraries )
+            for lo, hi in index.blocks( index.preamble.start, index.preamble.end ):
+                parser.feed( index.view( lo, hi ) )
 
-    Separator(fp)
+            obj = [ ParseObjObject( index, k, obj_root, materials, dtype=dtype, store=store,
+                                    libraries=libraries )
+                    for k in range( len(index.objects) ) ]
+        finally:
+            logger.count( 'bytes_read', index.size )
+            index.close()
 
-    fp.write( '\n#declare %s = union {\n' % ( short_name, ) )
-    for o in obj:
-        fp.write( '  object { %s }\n' % ( o.name, ) )
+    return obj
 
-    fp.write( '} // end union %s\n' % ( short_name, ) )
 
-    PovRayTrailer( fp )
+#/ =======================================================================================
+def FormatMesh( args ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Render one mesh2 declaration to a string, run in the worker processes.
+    """
+    #/ -----------------------------------------------------------------------------------
+    mesh, materials, options = args
 
-    fp.close()
+    buf = io.StringIO()
+    mesh.write( buf, materials, **options )
+
+    return buf.getvalue()
+
+
+#/ =======================================================================================
+def WriteMeshes( fp, obj, materials, jobs=1, **options ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Write the mesh2 declarations of all objects in their original order. With jobs
+    greater than one the objects are formatted in a pool of worker processes; the
+    output is identical to the serial run. options go to Mesh.write.
+    """
+    #/ -----------------------------------------------------------------------------------
+    if (( 1 >= jobs ) or ( 2 > len(obj) )):
+        for o in obj:
+            o.write( fp, materials, **options )
+        return
+
+    with concurrent.futures.ProcessPoolExecutor( max_workers = min( jobs, len(obj) ),
+                                                 initializer = TLogger.WorkerInit,
+                                                 initargs    = logger.workerArgs() ) as pool:
+        for text in pool.map( FormatMesh, [ ( o, materials, options ) for o in obj ] ):
+            fp.write( text )
+
+
+#/ =======================================================================================
+def WriteMesh2File( inc_filename, obj, materials,
+                    use_textures      = True,
+                    make_texture_file = False,
+                    include_license   = True,
+                    comments          = False,
+                    jobs              = 1,
+                    union_name        = None,
+                    decimals          = None,
+                    max_error         = None,
+                    dedup             = False,
+                    library           = None,
+                    instances         = None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Write the materials and the mesh2 objects of obj to inc_filename. With dedup
+    the materials that write the same texture are declared once (DedupMaterials).
+    library is an optional mesh2_library.TextureLibrary; the textures are merged
+    into it and included from it instead of being declared here. instances places
+    the objects in the union (see WriteUnion).
+    """
+    #/ -----------------------------------------------------------------------------------
 
-    logger.info( '    Temp file:    %s' % ( obj_filename, ) )
-    logger.info( '    PovRay file:  %s' % ( inc_filename, ) )
+    if ( dedup ):
+        materials = DedupMaterials( materials )
+
+    if ( None == union_name ):
+        short_name = inc_filename.split(os.sep)[-1].split('.')[0]
+    else:
+        short_name = union_name
+
+    with logger.span( 'write' ):
+        fp = open( inc_filename, 'w' )
+
+        PovRayHeader( fp, show=include_license )
+
+        fp.write( '//\n// Objects:\n' )
+        for o in obj:
+            fp.write( '//    %s\n' % ( o.name, ) )
+        fp.write( '//\n' )
+        Separator(fp)
+
+        if ( None != library ):
+            materials = library.merge( materials )
+            library.include( fp, inc_filename )
+        elif ( make_texture_file ):
+            mname = MakeTextureFile( inc_filename, materials, show=include_license )
+            fp.write( '\n#include "%s"\n\n' % ( mname, ) )
+        else:
+            fp.write( '\n' )
+            for mat in UniqueMaterials( materials ):
+                mat.write(fp)
+
+        WriteMeshes( fp, obj, materials, jobs=jobs,
+                     comments=comments, decimals=decimals, max_error=max_error )
+
+        Separator(fp)
+
+        WriteUnion( fp, short_name, obj, instances )
+
+        PovRayTrailer( fp )
+
+        fp.close()
+
+    for o in obj:
+        logger.count( 'objects' )
+        logger.count( 'vertices', len(o.vertex) )
+        logger.count( 'normals',  len(o.normal) )
+        logger.count( 'uvs',      len(o.uv) )
+        logger.count( 'faces',    len(o.face_vertex) )
+    if ( None != instances ):
+        logger.count( 'instances', len(instances) )
+
+    logger.count( 'bytes_written', os.path.getsize( inc_filename ) )
+    if (( make_texture_file ) and ( None == library )):
+        logger.count( 'bytes_written', os.path.getsize( TextureFileName( inc_filename ) ) )
+
+    logger.info( '    PovRay file:  %s', inc_filename )
 
     logger.info( '    Objects:' )
     for o in obj:
-        logger.info( '       %s' % ( o.name, ) )
+        logger.info( '       %s', o.name )
 
     return 0
 
 
+#/ =======================================================================================
+def OptimizeMeshes( obj, weld=None, reorder=False ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Run the optional mesh2_optimize stages over every object and log what they did.
+    weld is the welding epsilon, None to skip welding. reorder sorts the faces in
+    Morton order and renumbers the vectors by first use.
+    """
+    #/ -----------------------------------------------------------------------------------
+    if ( None != weld ):
+        before = np.zeros( 3, dtype=np.int64 )
+        after  = np.zeros( 3, dtype=np.int64 )
+        with logger.span( 'weld' ):
+            for o in obj:
+                b, a = mesh2_optimize.WeldMesh( o, weld )
+                before += b
+                after  += a
+
+        shrink = 100.0 * ( 1.0 - after.sum() / float( max( before.sum(), 1 ) ) )
+        logger.info( '    Welded:       vertices %d -> %d, normals %d -> %d, uvs %d -> %d'
+                     ' (%.1f%% fewer vectors)',
+                     before[0], after[0], before[1], after[1], before[2], after[2], shrink )
+
+    if ( reorder ):
+        faces = 0
+        with logger.span( 'reorder' ):
+            for o in obj:
+                faces += mesh2_optimize.ReorderMesh( o )
+        logger.info( '    Reordered:    %d faces in Morton order', faces )
+
 
 #/ =======================================================================================
-def main( argc, argv ):
+def ConvertObj2Mesh2( obj_filename, inc_filename,
+                      use_textures      = True,
+                      make_texture_file = False,
+                      include_license   = True,
+                      comments          = False,
+                      out_of_core       = False,
+                      scratch_dir       = None,
+                      jobs              = 1,
+                      cache             = None,
+                      weld              = None,
+                      reorder           = False,
+                      decimals          = None,
+                      max_error         = None,
+                      libraries         = None,
+                      dedup             = False,
+                      library           = None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Convert a Wavefront OBJ file into a PovRay include of mesh2 objects.
+    With out_of_core the parsed geometry is kept in numpy.memmap scratch files
+    (in scratch_dir, default the system temp directory) instead of in memory, so
+    the peak memory does not grow with the size of the input. jobs > 1 formats
+    the mesh2 objects in that many worker processes. cache is an optional
+    mesh2_cache.ConversionCache; on a hit the cached files are copied out and
+    nothing is parsed. weld is an epsilon: vertices, normals and UVs closer than
+    that are merged (0.0 merges exact duplicates only). reorder sorts the faces for
+    spatial locality and renumbers the vectors by first use. decimals (a fixed
+    count) or max_error (relative to the bounding box of each section) round the
+    vectors and drop trailing zeros. dedup declares each distinct texture once, under
+    the name of the first material that uses it. library is an optional
+    mesh2_library.TextureLibrary to merge the textures into; the cache is not
+    used with it, since a cached include names textures of the library it was
+    made with. libraries is an optional
+    mesh2_cache.MaterialCache kept by a caller that converts many files. The
+    phases are timed in TLogger spans nested in 'convert'.
+    """
+    #/ -----------------------------------------------------------------------------------
+
+    with logger.span( 'convert' ):
+        return _ConvertObj2Mesh2( obj_filename, inc_filename,
+                                  use_textures, make_texture_file, include_license,
+                                  comments, out_of_core, scratch_dir, jobs, cache,
+                                  weld, reorder, decimals, max_error, libraries, dedup,
+                                  library )
+
+
+#/ =======================================================================================
+def _ConvertObj2Mesh2( obj_filename, inc_filename,
+                       use_textures, make_texture_file, include_license,
+                       comments, out_of_core, scratch_dir, jobs, cache,
+                       weld, reorder, decimals, max_error, libraries, dedup,
+                       library ):
+    #/ -----------------------------------------------------------------------------------
+
+    if ( None != library ):
+        cache = None
+
+    texture_filename = TextureFileName( inc_filename ) if ( make_texture_file ) else None
+
+    if ( None != cache ):
+        with logger.span( 'cache' ):
+            key = cache.key( obj_filename, inc_filename,
+                             { 'use_textures'      : use_textures,
+                               'make_texture_file' : make_texture_file,
+                               'include_license'   : include_license,
+                               'comments'          : comments,
+                               'weld'              : weld,
+                               'reorder'           : reorder,
+                               'decimals'          : decimals,
+                               'max_error'         : max_error,
+                               'dedup'             : dedup } )
+            hit = cache.fetch( key, inc_filename, texture_filename )
+        if ( hit ):
+            logger.info( '    PovRay file:  %s (cached)', inc_filename )
+            return 0
+
+    materials = {}
+
+    scratch = None
+    if ( out_of_core ):
+        scratch = tempfile.mkdtemp( prefix='mesh2-', dir=scratch_dir )
+
+    try:
+        obj = ParseObjFile( obj_filename, materials, scratch=scratch, libraries=libraries )
+
+        logger.info( '    Temp file:    %s', obj_filename )
+
+        OptimizeMeshes( obj, weld=weld, reorder=reorder )
+
+        rv = WriteMesh2File( inc_filename, obj, materials,
+                             use_textures      = use_textures,
+                             make_texture_file = make_texture_file,
+                             include_license   = include_license,
+                             comments          = comments,
+                             jobs              = jobs,
+                             decimals          = decimals,
+                             max_error         = max_error,
+                             dedup             = dedup,
+                             library           = library )
+    finally:
+        if ( None != scratch ):
+            shutil.rmtree( scratch, ignore_errors=True )
+
+    if ( None != cache ):
+        cache.store( key, inc_filename, texture_filename )
+
+    return rv
+
+
+#/ =======================================================================================
+class AnimationWriter:
+    #/ -----------------------------------------------------------------------------------
+    """
+    Per frame writer for animation exports (a mesh2_writer of export_obj.save). The
+    first frame writes CommonFileName( inc_filename ) with the textures and every
+    mesh2 except its vertex and normal vectors. While the topology stays that of
+    the first frame a frame file holds only the vertex and normal arrays of each
+    object and includes the common file. The normals are put back in the order of
+    the first frame; a frame whose topology or normal grouping differs is written
+    in full. Every frame declares the same union, named after inc_filename. dedup
+    and library treat the materials of every frame as WriteMesh2File does. With
+    instances each frame declares the transform of every instance, and the union
+    in the common file places the instances with them.
+    """
     #/ -----------------------------------------------------------------------------------
-    if ( 3 > argc ):
-        sys.stderr.write("""
+    def __init__( self, inc_filename,
+                  use_textures      = True,
+                  make_texture_file = False,
+                  include_license   = True,
+                  comments          = False,
+                  decimals          = None,
+                  max_error         = None,
+                  dedup             = False,
+                  library           = None ):
+        #/ -------------------------------------------------------------------------------
+        self.inc_filename      = inc_filename
+        self.common_filename   = CommonFileName( inc_filename )
+        self.union_name        = inc_filename.split(os.sep)[-1].split('.')[0]
+        self.use_textures      = use_textures
+        self.make_texture_file = make_texture_file
+        self.include_license   = include_license
+        self.comments          = comments
+        self.decimals          = decimals
+        self.max_error         = max_error
+        self.dedup             = dedup
+        self.library           = library
+
+        self.signature = None
+        self.reference = None   #/ normal indices and count of the first frame
+        self.shared    = 0
+        self.full      = 0
+
+    #/ ===================================================================================
+    def _signature( self, obj, materials, instances ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Hash of everything the common file holds: all but vertex and normal vectors
+        and the instance transforms.
+        """
+        #/ -------------------------------------------------------------------------------
+        h = hashlib.sha256()
+        if ( None != instances ):
+            h.update( repr( [ name for name, m in instances ] ).encode( 'utf-8' ) )
+        for key in sorted( materials ):
+            h.update( repr( sorted( vars( materials[key] ).items() ) ).encode( 'utf-8' ) )
+        for o in obj:
+            h.update( repr( ( o.name, o.smooth, o.materials,
+                              len(o.vertex), 0 < len(o.normal) ) ).encode( 'utf-8' ) )
+            for col in ( o.uv, o.face_vertex, o.face_uv, o.face_material ):
+                h.update( np.ascontiguousarray( col ).tobytes() )
+                h.update( b'|' )
+        return h.digest()
+
+    #/ ===================================================================================
+    def _normals( self, obj ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Return the normals of each object ordered by the normal indices of the first
+        frame, or None if two corners that shared a normal then no longer do.
+        """
+        #/ -------------------------------------------------------------------------------
+        normals = []
+        for o, ( index, count ) in zip( obj, self.reference ):
+            if ( 0 == count ):
+                normals.append( o.normal )
+                continue
+            corner = o.normal[ o.face_normal ].reshape( -1, 3 )
+            table  = np.zeros( ( count, 3 ), dtype=corner.dtype )
+            table[ index.ravel() ] = corner
+            if ( 1.0e-6 < np.abs( table[ index.ravel() ] - corner ).max( initial=0.0 ) ):
+                return None
+            normals.append( table )
+        return normals
+
+    #/ ===================================================================================
+    def _writeCommon( self, obj, materials, instances ):
+        #/ -------------------------------------------------------------------------------
+        fp = open( self.common_filename, 'w' )
+
+        PovRayHeader( fp, show=self.include_license )
+
+        fp.write( '//\n// Shared mesh2 of the frames of %s\n// Objects:\n' %
+                  ( self.union_name, ) )
+        for o in obj:
+            fp.write( '//    %s\n' % ( o.name, ) )
+        fp.write( '//\n' )
+        Separator(fp)
+
+        if ( None != self.library ):
+            materials = self.library.merge( materials )
+            self.library.include( fp, self.inc_filename )
+        elif ( self.make_texture_file ):
+            mname = MakeTextureFile( self.inc_filename, materials, show=self.include_license )
+            fp.write( '\n#include "%s"\n\n' % ( mname, ) )
+        else:
+            fp.write( '\n' )
+            for mat in UniqueMaterials( materials ):
+                mat.write(fp)
+
+        WriteMeshes( fp, obj, materials, comments=self.comments, shared=True,
+                     decimals=self.decimals, max_error=self.max_error )
+
+        Separator(fp)
+
+        WriteUnion( fp, self.union_name, obj, instances, transforms=True )
+
+        PovRayTrailer( fp )
+
+        fp.close()
+
+        logger.count( 'bytes_written', os.path.getsize( self.common_filename ) )
+        logger.info( '    Common file:  %s', self.common_filename )
+
+    #/ ===================================================================================
+    def _writeFrame( self, inc_filename, obj, normals, instances ):
+        #/ -------------------------------------------------------------------------------
+        fp = open( inc_filename, 'w' )
+
+        PovRayHeader( fp, show=self.include_license )
+
+        fp.write( '//\n// Frame of %s, shared mesh2 in %s\n//\n' %
+                  ( self.union_name, self.common_filename.split(os.sep)[-1], ) )
+        Separator(fp)
+        fp.write( '\n' )
+
+        for o, normal in zip( obj, normals ):
+            if ( 0 < len(o.vertex) ):
+                WriteArray( fp, SharedName( o.name, 'vertex' ), '<%f,%f,%f>', o.vertex,
+                            Decimals( o.vertex, self.decimals, self.max_error ) )
+            if ( 0 < len(normal) ):
+                WriteArray( fp, SharedName( o.name, 'normal' ), '<%f,%f,%f>', normal,
+                            Decimals( normal, self.decimals, self.max_error ) )
+
+        if ( None != instances ):
+            for k, ( name, m ) in enumerate( instances ):
+                fp.write( '#declare %s = transform { %s }\n' % (
+                    TransformName( self.union_name, k ), InstanceMatrix( m ), ) )
+            fp.write( '\n' )
+
+        Separator(fp)
+
+        fp.write( '\n#include "%s"\n' % ( self.common_filename.split(os.sep)[-1], ) )
+
+        PovRayTrailer( fp )
+
+        fp.close()
+
+        logger.info( '    PovRay file:  %s', inc_filename )
+
+    #/ ===================================================================================
+    def __call__( self, inc_filename, collection ):
+        #/ -------------------------------------------------------------------------------
+        obj       = collection.objects
+        materials = collection.materials
+        instances = collection.instances
+        if ( self.dedup ):
+            materials = DedupMaterials( materials )
+
+        signature = self._signature( obj, materials, instances )
+
+        if ( None == self.signature ):
+            self.signature = signature
+            self.reference = [ ( np.array( o.face_normal ), len(o.normal) ) for o in obj ]
+            with logger.span( 'common' ):
+                self._writeCommon( obj, materials, instances )
+
+        normals = None
+        if ( signature == self.signature ):
+            normals = self._normals( obj )
+
+        if ( None == normals ):
+            logger.warning( '    Topology differs from the first frame: %s', inc_filename )
+            self.full += 1
+            return WriteMesh2File( inc_filename, obj, materials,
+                                   use_textures      = self.use_textures,
+                                   make_texture_file = self.make_texture_file,
+                                   include_license   = self.include_license,
+                                   comments          = self.comments,
+                                   union_name        = self.union_name,
+                                   decimals          = self.decimals,
+                                   max_error         = self.max_error,
+                                   library           = self.library,
+                                   instances         = instances )
+
+        self.shared += 1
+        with logger.span( 'frame' ):
+            self._writeFrame( inc_filename, obj, normals, instances )
+        logger.count( 'bytes_written', os.path.getsize( inc_filename ) )
+        return 0
+
+    #/ ===================================================================================
+    def report( self ):
+        #/ -------------------------------------------------------------------------------
+        logger.info( '    Animation:    %d shared frames, %d full frames',
+                     self.shared, self.full )
+
+
+#/ =======================================================================================
+def Usage( pn, msg=None ):
+    #/ -----------------------------------------------------------------------------------
+    if ( None != msg ):
+        sys.stderr.write( '\n%s\n' % (msg,) )
+
+    sys.stderr.write("""
 OBJ 2 Mesh2 * ver 1 * 2021.02
 
-USAGE: %s input.obj output.inc
+USAGE: %s [options] input.obj output.inc
    input.obj  - Wavefront OBJ format input file created by Blender
    output.inc - PovRay INC file containing a single Mesh2 object
 
-Example: %s table.ply table.inc
-
-Reads a PLY file created with the io_mesh_ply exporter in Blender 2.9+.
+   -j, --jobs N        format the mesh2 objects in N worker processes
+   -c, --comments      append a '// index' comment to every vector
+   -o, --out-of-core   keep the parsed geometry in scratch files, not in memory
+       --scratch DIR   directory for the out-of-core scratch files
+       --cache DIR     reuse conversions stored in the cache directory DIR
+       --cache-size MB evict least recently used entries beyond MB (default 1024)
+   -w, --weld EPS      merge vertices, normals and UVs closer than EPS (0 = exact)
+   -r, --reorder       sort faces in Morton order, renumber vectors by first use
+   -p, --precision N   write vectors with N decimals, without trailing zeros
+   -e, --max-error E   pick the decimals so the error stays below E times the
+                       bounding box diagonal of each vector section
+   -u, --dedup         declare materials that render the same texture only once
+   -t, --textures FILE merge the textures into the shared library include FILE
+   -m, --metrics FILE  write the phase times and counters of the run as JSON
+       --profile FILE  write cProfile stats of the conversion to FILE
+
+Example: %s -j 8 table.obj table.inc
+
+Reads an OBJ file created with the io_scene_obj exporter in Blender 2.9+.
 Write a Mesh2 object for use in PovRay 3.8+
 
-""" % (argv[0], argv[0],) )
-        return 1
+""" % (pn, pn,) )
+    return 1
+
 
-    obj_filename = argv[1]
-    inc_filename = argv[2]
+#/ =======================================================================================
+def main( argc, argv ):
+    #/ -----------------------------------------------------------------------------------
+    try:
+        opts, args = getopt.getopt( argv[1:], 'j:cow:rp:e:ut:m:',
+                                    [ 'jobs=', 'comments', 'out-of-core', 'scratch=',
+                                      'cache=', 'cache-size=', 'weld=',
+                                      'reorder', 'precision=', 'max-error=', 'dedup',
+                                      'textures=', 'metrics=', 'profile=' ] )
+    except getopt.GetoptError as e:
+        return Usage( argv[0], str(e) )
+
+    if ( 2 != len(args) ):
+        return Usage( argv[0] )
+
+    jobs        = 1
+    comments    = False
+    out_of_core = False
+    scratch_dir = None
+    cache_dir   = None
+    cache_size  = mesh2_cache.CACHE_SIZE
+    weld        = None
+    reorder     = False
+    decimals    = None
+    max_error   = None
+    dedup       = False
+    library     = None
+    metrics     = None
+    profile     = None
+
+    try:
+        for key, val in opts:
+            if ( key in ( '-j', '--jobs' ) ):
+                jobs = int( val )
+            elif ( key in ( '-c', '--comments' ) ):
+                comments = True
+            elif ( key in ( '-o', '--out-of-core' ) ):
+                out_of_core = True
+            elif ( '--scratch' == key ):
+                scratch_dir = val
+            elif ( '--cache' == key ):
+                cache_dir = val
+            elif ( '--cache-size' == key ):
+                cache_size = int( float( val ) * 1024 * 1024 )
+            elif ( key in ( '-w', '--weld' ) ):
+                weld = float( val )
+            elif ( key in ( '-r', '--reorder' ) ):
+                reorder = True
+            elif ( key in ( '-p', '--precision' ) ):
+                decimals = PrecisionOption( key, val )
+            elif ( key in ( '-e', '--max-error' ) ):
+                max_error = PrecisionOption( key, val )
+            elif ( key in ( '-u', '--dedup' ) ):
+                dedup = True
+            elif ( key in ( '-t', '--textures' ) ):
+                library = mesh2_library.TextureLibrary( val )
+            elif ( key in ( '-m', '--metrics' ) ):
+                metrics = val
+            elif ( '--profile' == key ):
+                profile = val
+    except getopt.GetoptError as e:
+        return Usage( argv[0], str(e) )
+
+    obj_filename = args[0]
+    inc_filename = args[1]
+
+    cache = None
+    if ( None != cache_dir ):
+        cache = mesh2_cache.ConversionCache( cache_dir, cache_size )
+
+    if ( None != profile ):
+        logger.setProfile( profile )
+    logger.resetMetrics()
 
     #/ -----------------------------------------------------------------------------------
 
-    return ConvertObj2Mesh2( obj_filename, inc_filename,
-                             use_textures      = True,
-                             make_texture_file = False,
-                             include_license   = True )
+    rv = ConvertObj2Mesh2( obj_filename, inc_filename,
+                           use_textures      = True,
+                           make_texture_file = False,
+                           include_license   = True,
+                           comments          = comments,
+                           out_of_core       = out_of_core,
+                           scratch_dir       = scratch_dir,
+                           jobs              = jobs,
+                           cache             = cache,
+                           weld              = weld,
+                           reorder           = reorder,
+                           decimals          = decimals,
+                           max_error         = max_error,
+                           dedup             = dedup,
+                           library           = library )
+
+    if ( None != cache ):
+        cache.report()
+
+    if ( None != metrics ):
+        logger.writeSummary( metrics )
+
+    return rv
 
 #/ =======================================================================================
 if ( '__main__' == __name__ ): sys.exit( main( len( sys.argv ), sys.argv ) )
@@ -18,7 +18,11 @@
 
 # <pep8 compliant>
 
+import io
 import os
+import contextlib
+
+import numpy as np
 
 import bpy
 from mathutils import Matrix, Vector, Color
@@ -29,6 +33,9 @@ from bpy_extras.wm_utils.progress_report import (
     ProgressReportSubstep,
 )
 
+from . import TLogger
+logger = TLogger.getInstance()
+
 
 def name_compat(name):
     if name is None:
@@ -46,11 +53,18 @@ def mesh_triangulate(me):
     bm.free()
 
 
-def write_mtl(scene, filepath, path_mode, copy_set, mtl_dict):
+def write_mtl(scene, filepath, path_mode, copy_set, mtl_dict, fp=None):
+    # When fp is given the MTL text goes there instead of to filepath,
+    # filepath is then only used to resolve relative image paths.
     source_dir = os.path.dirname(bpy.data.filepath)
     dest_dir = os.path.dirname(filepath)
 
-    with open(filepath, "w", encoding="utf8", newline="\n") as f:
+    if fp is None:
+        fp = open(filepath, "w", encoding="utf8", newline="\n")
+    else:
+        fp = contextlib.nullcontext(fp)
+
+    with fp as f:
         fw = f.write
 
         fw('# Blender MTL File: %r\n' % (os.path.basename(bpy.data.filepath) or "None"))
@@ -157,6 +171,60 @@ def write_mtl(scene, filepath, path_mode, copy_set, mtl_dict):
                 fw('illum 2\n')  # light normally
 
 
+def foreach_array(collection, attr, dtype, width=1):
+    # One foreach_get call for the whole collection, dtype must match the
+    # RNA property (float32, int32 or bool) to take the fast buffer path.
+    data = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attr, data)
+    if width > 1:
+        data = data.reshape(-1, width)
+    return data
+
+
+def round4(values):
+    # round(x, 4) of float32 values as integer ten-thousandths. x * 1e4 is exact
+    # in float64 for a float32 x, so rint rounds half to even just like round().
+    return np.rint(np.asarray(values, dtype=np.float64) * 1e4).astype(np.int64)
+
+
+def unique_rows(keys):
+    # Number the distinct rows of keys in order of first appearance, the way a
+    # dict filled row by row would. Returns the first row of each distinct key
+    # and the number of every row.
+    keys = np.ascontiguousarray(keys, dtype=np.int64)
+    packed = keys.view(np.dtype((np.void, keys.itemsize * keys.shape[1]))).ravel()
+    _, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[inverse.ravel()]
+
+
+def write_rows(fw, fmt, rows, block=65536):
+    # Format block rows per call instead of one fw() per row.
+    rows = np.asarray(rows)
+    for lo in range(0, len(rows), block):
+        chunk = rows[lo:lo + block]
+        fw((fmt * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+
+def write_faces(fw, token, sizes, cols, block=65536):
+    # Write 'f' records, sizes[i] corners each, cols holds one row per corner.
+    formats = {}
+    sizes = sizes.tolist()
+    values = cols.ravel().tolist()
+    width = cols.shape[1] if cols.ndim > 1 else 1
+    pos = 0
+    for lo in range(0, len(sizes), block):
+        chunk = sizes[lo:lo + block]
+        for n in chunk:
+            if n not in formats:
+                formats[n] = 'f' + token * n + '\n'
+        end = pos + sum(chunk) * width
+        fw(''.join([formats[n] for n in chunk]) % tuple(values[pos:end]))
+        pos = end
+
+
 def test_nurbs_compat(ob):
     if ob.type != 'CURVE':
         return False
@@ -253,21 +321,29 @@ def write_file(filepath, objects, depsgraph, scene,
                EXPORT_GLOBAL_MATRIX=None,
                EXPORT_PATH_MODE='AUTO',
                progress=ProgressReport(),
+               EXPORT_MESH2=None,
                ):
     """
     Basic write function. The context and options must be already set
     This can be accessed externaly
     eg.
     write( 'c:\\test\\foobar.obj', Blender.Object.GetSelected() ) # Using default options.
+
+    When EXPORT_MESH2 is a convert_obj_to_mesh2.MeshCollection the geometry and the
+    materials are handed to it in memory and nothing is written to filepath. If the
+    collection has instances, objects that share mesh data or geometry are handed
+    over once in local space and every object becomes an instance with its matrix.
     """
     if EXPORT_GLOBAL_MATRIX is None:
         EXPORT_GLOBAL_MATRIX = Matrix()
 
-    def veckey3d(v):
-        return round(v.x, 4), round(v.y, 4), round(v.z, 4)
+    to_mesh2 = EXPORT_MESH2 is not None
+    if to_mesh2:
+        from . import convert_obj_to_mesh2
 
-    def veckey2d(v):
-        return round(v[0], 4), round(v[1], 4)
+    instancing = to_mesh2 and EXPORT_MESH2.instances is not None
+    # ('data', mesh name, material names) or ('geometry', Mesh.key()): the mesh2 declared for it
+    instanced = {}
 
     def findVertexGroupName(face, vWeightMap):
         """
@@ -290,8 +366,18 @@ def write_file(filepath, objects, depsgraph, scene,
             return '(null)'
 
     with ProgressReportSubstep(progress, 2, "OBJ Export path: %r" % filepath, "OBJ Export Finished") as subprogress1:
-        with open(filepath, "w", encoding="utf8", newline="\n") as f:
-            fw = f.write
+        if to_mesh2:
+            obj_file = contextlib.nullcontext()
+        else:
+            obj_file = open(filepath, "w", encoding="utf8", newline="\n")
+
+        with obj_file as f:
+            if to_mesh2:
+                # Records without a mesh2 equivalent (header, groups, smoothing...) are dropped.
+                def fw(_text):
+                    pass
+            else:
+                fw = f.write
 
             # Write Header
             fw('# Blender v%s OBJ File: %r\n' % (bpy.app.version_string, os.path.basename(bpy.data.filepath)))
@@ -339,7 +425,7 @@ def write_file(filepath, objects, depsgraph, scene,
                         uv_unique_count = no_unique_count = 0
 
                         # Nurbs curve support
-                        if EXPORT_CURVE_AS_NURBS and test_nurbs_compat(ob):
+                        if EXPORT_CURVE_AS_NURBS and not to_mesh2 and test_nurbs_compat(ob):
                             ob_mat = EXPORT_GLOBAL_MATRIX @ ob_mat
                             totverts += write_nurb(fw, ob, ob_mat)
                             continue
@@ -347,6 +433,21 @@ def write_file(filepath, objects, depsgraph, scene,
 
                         ob_for_convert = ob.evaluated_get(depsgraph) if EXPORT_APPLY_MODIFIERS else ob.original
 
+                        if instancing:
+                            instance_matrix = np.array(EXPORT_GLOBAL_MATRIX @ ob_mat, dtype=np.float64)
+                            # Modifiers may make the geometry of objects with the same data differ,
+                            # and slots linked to the object may give the same data other materials.
+                            if ob.data is None or (EXPORT_APPLY_MODIFIERS and ob.modifiers):
+                                data_key = None
+                            else:
+                                data_key = ('data', ob.data.name_full,
+                                            tuple(slot.material.name_full if slot.material else None
+                                                  for slot in ob_for_convert.material_slots))
+                            shared = instanced.get(data_key)
+                            if shared is not None:
+                                EXPORT_MESH2.instances.append((shared.name, instance_matrix))
+                                continue
+
                         try:
                             me = ob_for_convert.to_mesh()
                         except RuntimeError:
@@ -360,45 +461,50 @@ def write_file(filepath, objects, depsgraph, scene,
                             # _must_ do this first since it re-allocs arrays
                             mesh_triangulate(me)
 
-                        me.transform(EXPORT_GLOBAL_MATRIX @ ob_mat)
-                        # If negative scaling, we have to invert the normals...
-                        if ob_mat.determinant() < 0.0:
-                            me.flip_normals()
+                        # Instances stay in local space, POV-Ray applies their matrix (mirroring included).
+                        if not instancing:
+                            me.transform(EXPORT_GLOBAL_MATRIX @ ob_mat)
+                            # If negative scaling, we have to invert the normals...
+                            if ob_mat.determinant() < 0.0:
+                                me.flip_normals()
 
                         if EXPORT_UV:
                             faceuv = len(me.uv_layers) > 0
-                            if faceuv:
-                                uv_layer = me.uv_layers.active.data[:]
                         else:
                             faceuv = False
 
-                        me_verts = me.vertices[:]
-
-                        # Make our own list so it can be sorted to reduce context switching
-                        face_index_pairs = [(face, index) for index, face in enumerate(me.polygons)]
+                        # Read everything the later steps need from RNA in bulk.
+                        vert_co = foreach_array(me.vertices, 'co', np.float32, 3)
+                        loop_vert = foreach_array(me.loops, 'vertex_index', np.int32).astype(np.int64)
+                        poly_start = foreach_array(me.polygons, 'loop_start', np.int32).astype(np.int64)
+                        poly_total = foreach_array(me.polygons, 'loop_total', np.int32).astype(np.int64)
+                        poly_mat = foreach_array(me.polygons, 'material_index', np.int32)
+                        poly_smooth = foreach_array(me.polygons, 'use_smooth', np.bool_)
+                        if faceuv:
+                            loop_uv = foreach_array(me.uv_layers.active.data, 'uv', np.float32, 2)
 
                         if EXPORT_EDGES:
                             edges = me.edges
                         else:
                             edges = []
 
-                        if not (len(face_index_pairs) + len(edges) + len(me.vertices)):  # Make sure there is something to write
+                        if not (len(poly_start) + len(edges) + len(vert_co)):  # Make sure there is something to write
                             # clean up
                             ob_for_convert.to_mesh_clear()
                             continue  # dont bother with this mesh.
 
-                        if EXPORT_NORMALS and face_index_pairs:
+                        if EXPORT_NORMALS and len(poly_start):
                             me.corner_normals
                             # No need to call me.free_normals_split later, as this mesh is deleted anyway!
+                            loop_normal = foreach_array(me.loops, 'normal', np.float32, 3)
 
-                        loops = me.loops
-
-                        if (EXPORT_SMOOTH_GROUPS or EXPORT_SMOOTH_GROUPS_BITFLAGS) and face_index_pairs:
+                        if (EXPORT_SMOOTH_GROUPS or EXPORT_SMOOTH_GROUPS_BITFLAGS) and len(poly_start):
                             smooth_groups, smooth_groups_tot = me.calc_smooth_groups(use_bitflags=EXPORT_SMOOTH_GROUPS_BITFLAGS)
                             if smooth_groups_tot <= 1:
                                 smooth_groups, smooth_groups_tot = (), 0
                         else:
                             smooth_groups, smooth_groups_tot = (), 0
+                        poly_group = np.asarray(smooth_groups, dtype=np.int64)
 
                         materials = me.materials[:]
                         material_names = [m.name if m else None for m in materials]
@@ -410,32 +516,37 @@ def write_file(filepath, objects, depsgraph, scene,
 
                         # Sort by Material, then images
                         # so we dont over context switch in the obj file.
+                        # The sorts are stable, faces with equal keys keep their order.
+                        face_order = np.arange(len(poly_start))
                         if EXPORT_KEEP_VERT_ORDER:
                             pass
                         else:
                             if len(materials) > 1:
                                 if smooth_groups:
-                                    sort_func = lambda a: (a[0].material_index,
-                                                           smooth_groups[a[1]] if a[0].use_smooth else False)
+                                    second = np.where(poly_smooth, poly_group, 0)
                                 else:
-                                    sort_func = lambda a: (a[0].material_index,
-                                                           a[0].use_smooth)
+                                    second = poly_smooth
+                                face_order = np.lexsort((second, poly_mat))
                             else:
                                 # no materials
                                 if smooth_groups:
-                                    sort_func = lambda a: smooth_groups[a[1] if a[0].use_smooth else False]
+                                    # the group of face 0 for flat faces, as it always was
+                                    sort_key = poly_group[np.where(poly_smooth, face_order, 0)]
                                 else:
-                                    sort_func = lambda a: a[0].use_smooth
+                                    sort_key = poly_smooth
+                                face_order = np.argsort(sort_key, kind='stable')
 
-                            face_index_pairs.sort(key=sort_func)
-
-                            del sort_func
+                        # Corners are the loops of the faces in the order they are written.
+                        face_size = poly_total[face_order]
+                        face_first = np.cumsum(face_size) - face_size
+                        corner_loop = (np.repeat(poly_start[face_order] - face_first, face_size) +
+                                       np.arange(face_size.sum()))
 
                         # Set the default mat to no material and no image.
                         contextMat = 0, 0  # Can never be this, so we will label a new material the first chance we get.
                         contextSmooth = None  # Will either be true or false,  set bad to force initialization switch.
 
-                        if EXPORT_BLEN_OBS or EXPORT_GROUP_BY_OB:
+                        if to_mesh2 or EXPORT_BLEN_OBS or EXPORT_GROUP_BY_OB:
                             name1 = ob.name
                             name2 = ob.data.name
                             if name1 == name2:
@@ -443,7 +554,11 @@ def write_file(filepath, objects, depsgraph, scene,
                             else:
                                 obnamestring = '%s_%s' % (name_compat(name1), name_compat(name2))
 
-                            if EXPORT_BLEN_OBS:
+                            if to_mesh2:
+                                mesh2 = convert_obj_to_mesh2.Mesh(obnamestring)
+                                mesh2_material = -1
+                                EXPORT_MESH2.objects.append(mesh2)
+                            elif EXPORT_BLEN_OBS:
                                 fw('o %s\n' % obnamestring)  # Write Object name
                             else:  # if EXPORT_GROUP_BY_OB:
                                 fw('g %s\n' % obnamestring)
@@ -451,61 +566,51 @@ def write_file(filepath, objects, depsgraph, scene,
                         subprogress2.step()
 
                         # Vert
-                        for v in me_verts:
-                            fw('v %.6f %.6f %.6f\n' % v.co[:])
+                        if to_mesh2:
+                            mesh2.setGeometry(vertex=vert_co)
+                        else:
+                            write_rows(fw, 'v %.6f %.6f %.6f\n', vert_co)
 
                         subprogress2.step()
 
                         # UV
                         if faceuv:
-                            # in case removing some of these dont get defined.
-                            uv = f_index = uv_index = uv_key = uv_val = uv_ls = None
-
-                            uv_face_mapping = [None] * len(face_index_pairs)
-
-                            uv_dict = {}
-                            uv_get = uv_dict.get
-                            for f, f_index in face_index_pairs:
-                                uv_ls = uv_face_mapping[f_index] = []
-                                for uv_index, l_index in enumerate(f.loop_indices):
-                                    uv = uv_layer[l_index].uv
-                                    # include the vertex index in the key so we don't share UV's between vertices,
-                                    # allowed by the OBJ spec but can cause issues for other importers, see: T47010.
-
-                                    # this works too, shared UV's for all verts
-                                    #~ uv_key = veckey2d(uv)
-                                    uv_key = loops[l_index].vertex_index, veckey2d(uv)
-
-                                    uv_val = uv_get(uv_key)
-                                    if uv_val is None:
-                                        uv_val = uv_dict[uv_key] = uv_unique_count
-                                        fw('vt %.6f %.6f\n' % uv[:])
-                                        uv_unique_count += 1
-                                    uv_ls.append(uv_val)
-
-                            del uv_dict, uv, f_index, uv_index, uv_ls, uv_get, uv_key, uv_val
-                            # Only need uv_unique_count and uv_face_mapping
+                            # include the vertex index in the key so we don't share UV's between vertices,
+                            # allowed by the OBJ spec but can cause issues for other importers, see: T47010.
+                            corner_uv = loop_uv[corner_loop]
+                            uv_first, uv_index = unique_rows(np.column_stack((loop_vert[corner_loop],
+                                                                              round4(corner_uv))))
+                            loops_to_uv = np.zeros(len(loop_vert), dtype=np.int64)
+                            loops_to_uv[corner_loop] = uv_index
+                            uv_unique_count = len(uv_first)
+
+                            if to_mesh2:
+                                mesh2_uv = corner_uv[uv_first]
+                            else:
+                                write_rows(fw, 'vt %.6f %.6f\n', corner_uv[uv_first])
+                        else:
+                            mesh2_uv = []
 
                         subprogress2.step()
 
                         # NORMAL, Smooth/Non smoothed.
                         if EXPORT_NORMALS:
-                            no_key = no_val = None
-                            normals_to_idx = {}
-                            no_get = normals_to_idx.get
-                            loops_to_normals = [0] * len(loops)
-                            for f, f_index in face_index_pairs:
-                                for l_idx in f.loop_indices:
-                                    no_key = veckey3d(loops[l_idx].normal)
-                                    no_val = no_get(no_key)
-                                    if no_val is None:
-                                        no_val = normals_to_idx[no_key] = no_unique_count
-                                        fw('vn %.4f %.4f %.4f\n' % no_key)
-                                        no_unique_count += 1
-                                    loops_to_normals[l_idx] = no_val
-                            del normals_to_idx, no_get, no_key, no_val
+                            if len(poly_start):
+                                corner_no = loop_normal[corner_loop]
+                            else:
+                                corner_no = np.empty((0, 3), dtype=np.float32)
+                            no_key = round4(corner_no)
+                            no_first, no_index = unique_rows(no_key)
+                            loops_to_normals = np.zeros(len(loop_vert), dtype=np.int64)
+                            loops_to_normals[corner_loop] = no_index
+                            no_unique_count = len(no_first)
+
+                            # The rounded normals themselves, as round(x, 4) gives them.
+                            mesh2_normal = np.copysign(no_key[no_first] / 1e4, corner_no[no_first])
+                            if not to_mesh2:
+                                write_rows(fw, 'vn %.4f %.4f %.4f\n', mesh2_normal)
                         else:
-                            loops_to_normals = []
+                            mesh2_normal = []
 
                         subprogress2.step()
 
@@ -516,15 +621,50 @@ def write_file(filepath, objects, depsgraph, scene,
                             if vertGroupNames:
                                 currentVGroup = ''
                                 # Create a dictionary keyed by face id and listing, for each vertex, the vertex groups it belongs to
-                                vgroupsMap = [[] for _i in range(len(me_verts))]
-                                for v_idx, v_ls in enumerate(vgroupsMap):
-                                    v_ls[:] = [(vertGroupNames[g.group], g.weight) for g in me_verts[v_idx].groups]
+                                vgroupsMap = [[(vertGroupNames[g.group], g.weight) for g in v.groups]
+                                              for v in me.vertices]
+                                polygons = me.polygons
+                                face_vgroup = [findVertexGroupName(polygons[f_index], vgroupsMap)
+                                               for f_index in face_order.tolist()]
+
+                        # Per face material (the name decides a context switch) and smoothing.
+                        name_index = np.array([material_names.index(n) for n in material_names])
+                        face_mat = np.minimum(poly_mat, len(materials) - 1)[face_order]
+                        if smooth_groups:
+                            face_smooth = np.where(poly_smooth, poly_group, 0)[face_order]
+                        else:
+                            face_smooth = poly_smooth[face_order].astype(np.int64)
+
+                        # The faces where a g, usemtl or s record may be due.
+                        switch = np.ones(len(face_order), dtype=np.bool_)
+                        if len(face_order):
+                            switch[1:] = ((name_index[face_mat[1:]] != name_index[face_mat[:-1]]) |
+                                          (face_smooth[1:] != face_smooth[:-1]))
+                            if EXPORT_POLYGROUPS and vertGroupNames:
+                                switch[1:] |= np.array(face_vgroup[1:]) != np.array(face_vgroup[:-1])
+                        runs = np.append(np.flatnonzero(switch), len(face_order)).tolist()
+
+                        if faceuv and EXPORT_NORMALS:
+                            token = " %d/%d/%d"  # vert, uv, normal
+                        elif faceuv:
+                            token = " %d/%d"  # vert, uv
+                        elif EXPORT_NORMALS:
+                            token = " %d//%d"  # vert, normal
+                        else:
+                            token = " %d"
+                        if not to_mesh2:
+                            corner_cols = [loop_vert[corner_loop] + totverts]
+                            if faceuv:
+                                corner_cols.append(loops_to_uv[corner_loop] + totuvco)
+                            if EXPORT_NORMALS:
+                                corner_cols.append(loops_to_normals[corner_loop] + totno)
+                            corner_cols = np.column_stack(corner_cols)
+                        face_material = np.empty(len(face_order), dtype=np.int64)
 
-                        for f, f_index in face_index_pairs:
-                            f_smooth = f.use_smooth
-                            if f_smooth and smooth_groups:
-                                f_smooth = smooth_groups[f_index]
-                            f_mat = min(f.material_index, len(materials) - 1)
+                        for run_lo, run_hi in zip(runs[:-1], runs[1:]):
+                            f_index = int(face_order[run_lo])
+                            f_smooth = int(face_smooth[run_lo])
+                            f_mat = int(face_mat[run_lo])
 
                             # MAKE KEY
                             key = material_names[f_mat], None  # No image, use None instead.
@@ -533,7 +673,7 @@ def write_file(filepath, objects, depsgraph, scene,
                             if EXPORT_POLYGROUPS:
                                 if vertGroupNames:
                                     # find what vertext group the face belongs to
-                                    vgroup_of_face = findVertexGroupName(f, vgroupsMap)
+                                    vgroup_of_face = face_vgroup[run_lo]
                                     if vgroup_of_face != currentVGroup:
                                         currentVGroup = vgroup_of_face
                                         fw('g %s\n' % vgroup_of_face)
@@ -549,6 +689,8 @@ def write_file(filepath, objects, depsgraph, scene,
                                         fw("g %s_%s\n" % (name_compat(ob.name), name_compat(ob.data.name)))
                                     if EXPORT_MTL:
                                         fw("usemtl (null)\n")  # mat, image
+                                        if to_mesh2:
+                                            mesh2_material = mesh2.addMaterial("(null)")
 
                                 else:
                                     mat_data = mtl_dict.get(key)
@@ -581,6 +723,8 @@ def write_file(filepath, objects, depsgraph, scene,
                                         fw("g %s_%s_%s\n" % (name_compat(ob.name), name_compat(ob.data.name), mat_data[0]))
                                     if EXPORT_MTL:
                                         fw("usemtl %s\n" % mat_data[0])  # can be mat_image or (null)
+                                        if to_mesh2:
+                                            mesh2_material = mesh2.addMaterial(mat_data[0])
 
                             contextMat = key
                             if f_smooth != contextSmooth:
@@ -593,46 +737,56 @@ def write_file(filepath, objects, depsgraph, scene,
                                 else:  # was off now on
                                     fw('s off\n')
                                 contextSmooth = f_smooth
+                                if to_mesh2:
+                                    mesh2.smooth = bool(f_smooth)
 
-                            f_v = [(vi, me_verts[v_idx], l_idx)
-                                   for vi, (v_idx, l_idx) in enumerate(zip(f.vertices, f.loop_indices))]
+                            if to_mesh2:
+                                face_material[run_lo:run_hi] = mesh2_material
+                                continue
+
+                            corner_lo = int(face_first[run_lo])
+                            corner_hi = corner_lo + int(face_size[run_lo:run_hi].sum())
+                            write_faces(fw, token, face_size[run_lo:run_hi], corner_cols[corner_lo:corner_hi])
 
-                            fw('f')
                             if faceuv:
-                                if EXPORT_NORMALS:
-                                    for vi, v, li in f_v:
-                                        fw(" %d/%d/%d" % (totverts + v.index,
-                                                          totuvco + uv_face_mapping[f_index][vi],
-                                                          totno + loops_to_normals[li],
-                                                          ))  # vert, uv, normal
-                                else:  # No Normals
-                                    for vi, v, li in f_v:
-                                        fw(" %d/%d" % (totverts + v.index,
-                                                       totuvco + uv_face_mapping[f_index][vi],
-                                                       ))  # vert, uv
-
-                                face_vert_index += len(f_v)
-
-                            else:  # No UV's
-                                if EXPORT_NORMALS:
-                                    for vi, v, li in f_v:
-                                        fw(" %d//%d" % (totverts + v.index, totno + loops_to_normals[li]))
-                                else:  # No Normals
-                                    for vi, v, li in f_v:
-                                        fw(" %d" % (totverts + v.index))
-
-                            fw('\n')
+                                face_vert_index += corner_hi - corner_lo
 
                         subprogress2.step()
 
+                        if to_mesh2:
+                            # mesh2 only knows triangles, fan out anything larger.
+                            fan = np.maximum(face_size - 2, 0)
+                            tri_face = np.repeat(np.arange(len(face_order)), fan)
+                            tri_a = face_first[tri_face]
+                            tri_b = tri_a + np.arange(len(tri_face)) - np.repeat(np.cumsum(fan) - fan, fan) + 1
+                            tri_c = tri_b + 1
+                            corners = np.column_stack((tri_a, tri_b, tri_c))
+
+                            f_vi = loop_vert[corner_loop]
+                            f_ti = loops_to_uv[corner_loop] if faceuv else np.zeros_like(corner_loop)
+                            f_ni = loops_to_normals[corner_loop] if EXPORT_NORMALS else np.zeros_like(corner_loop)
+                            mesh2.setGeometry(uv=mesh2_uv, normal=mesh2_normal,
+                                              face_vertex=f_vi[corners],
+                                              face_uv=f_ti[corners],
+                                              face_normal=f_ni[corners],
+                                              face_material=face_material[tri_face])
+
+                            if instancing:
+                                shared = instanced.setdefault(('geometry', mesh2.key()), mesh2)
+                                if shared is not mesh2:
+                                    EXPORT_MESH2.objects.pop()
+                                if data_key is not None:
+                                    instanced[data_key] = shared
+                                EXPORT_MESH2.instances.append((shared.name, instance_matrix))
+
                         # Write edges.
-                        if EXPORT_EDGES:
-                            for ed in edges:
-                                if ed.is_loose:
-                                    fw('l %d %d\n' % (totverts + ed.vertices[0], totverts + ed.vertices[1]))
+                        if EXPORT_EDGES and not to_mesh2:
+                            loose = foreach_array(edges, 'is_loose', np.bool_)
+                            edge_vert = foreach_array(edges, 'vertices', np.int32, 2).astype(np.int64)
+                            write_rows(fw, 'l %d %d\n', edge_vert[loose] + totverts)
 
                         # Make the indices global rather then per mesh
-                        totverts += len(me_verts)
+                        totverts += len(vert_co)
                         totuvco += uv_unique_count
                         totno += no_unique_count
 
@@ -646,7 +800,14 @@ def write_file(filepath, objects, depsgraph, scene,
 
         # Now we have all our materials, save them
         if EXPORT_MTL:
-            write_mtl(scene, mtlfilepath, EXPORT_PATH_MODE, copy_set, mtl_dict)
+            with logger.span('mtl'):
+                if to_mesh2:
+                    mtl_text = io.StringIO()
+                    write_mtl(scene, filepath, EXPORT_PATH_MODE, copy_set, mtl_dict, fp=mtl_text)
+                    mtl_text.seek(0)
+                    convert_obj_to_mesh2.ParseMaterialLines(mtl_text, EXPORT_MESH2.materials)
+                else:
+                    write_mtl(scene, mtlfilepath, EXPORT_PATH_MODE, copy_set, mtl_dict)
 
         # copy all collected files.
         io_utils.path_reference_copy(copy_set)
@@ -672,7 +833,12 @@ def _write(context, filepath,
            EXPORT_ANIMATION,
            EXPORT_GLOBAL_MATRIX,
            EXPORT_PATH_MODE,  # Not used
+           EXPORT_MESH2_WRITER=None,
+           EXPORT_INSTANCES=False,
            ):
+    # EXPORT_MESH2_WRITER(filepath, collection) is called once per frame with the
+    # in-memory meshes instead of writing an OBJ file. EXPORT_INSTANCES gives it
+    # shared meshes in local space and one instance per object.
 
     with ProgressReport(context.window_manager) as progress:
         base_name, ext = os.path.splitext(filepath)
@@ -707,29 +873,42 @@ def _write(context, filepath,
 
             full_path = ''.join(context_name)
 
+            if EXPORT_MESH2_WRITER is not None:
+                from . import convert_obj_to_mesh2
+                mesh2_data = convert_obj_to_mesh2.MeshCollection(instancing=EXPORT_INSTANCES)
+            else:
+                mesh2_data = None
+
             # erm... bit of a problem here, this can overwrite files when exporting frames. not too bad.
             # EXPORT THE FILE.
             progress.enter_substeps(1)
-            write_file(full_path, objects, depsgraph, scene,
-                       EXPORT_TRI,
-                       EXPORT_EDGES,
-                       EXPORT_SMOOTH_GROUPS,
-                       EXPORT_SMOOTH_GROUPS_BITFLAGS,
-                       EXPORT_NORMALS,
-                       EXPORT_UV,
-                       EXPORT_MTL,
-                       EXPORT_APPLY_MODIFIERS,
-                       EXPORT_APPLY_MODIFIERS_RENDER,
-                       EXPORT_BLEN_OBS,
-                       EXPORT_GROUP_BY_OB,
-                       EXPORT_GROUP_BY_MAT,
-                       EXPORT_KEEP_VERT_ORDER,
-                       EXPORT_POLYGROUPS,
-                       EXPORT_CURVE_AS_NURBS,
-                       EXPORT_GLOBAL_MATRIX,
-                       EXPORT_PATH_MODE,
-                       progress,
-                       )
+            with logger.span('write_file'):
+                write_file(full_path, objects, depsgraph, scene,
+                           EXPORT_TRI,
+                           EXPORT_EDGES,
+                           EXPORT_SMOOTH_GROUPS,
+                           EXPORT_SMOOTH_GROUPS_BITFLAGS,
+                           EXPORT_NORMALS,
+                           EXPORT_UV,
+                           EXPORT_MTL,
+                           EXPORT_APPLY_MODIFIERS,
+                           EXPORT_APPLY_MODIFIERS_RENDER,
+                           EXPORT_BLEN_OBS,
+                           EXPORT_GROUP_BY_OB,
+                           EXPORT_GROUP_BY_MAT,
+                           EXPORT_KEEP_VERT_ORDER,
+                           EXPORT_POLYGROUPS,
+                           EXPORT_CURVE_AS_NURBS,
+                           EXPORT_GLOBAL_MATRIX,
+                           EXPORT_PATH_MODE,
+                           progress,
+                           EXPORT_MESH2=mesh2_data,
+                           )
+            if mesh2_data is not None:
+                with logger.span('mesh2'):
+                    EXPORT_MESH2_WRITER(full_path, mesh2_data)
+            else:
+                logger.count('bytes_written', os.path.getsize(full_path))
             progress.leave_substeps()
 
         scene.frame_set(orig_frame, subframe=0.0)
@@ -764,7 +943,9 @@ def save(context,
          use_selection=True,
          use_animation=False,
          global_matrix=None,
-         path_mode='AUTO'
+         path_mode='AUTO',
+         mesh2_writer=None,
+         use_instances=False,
          ):
 
     _write(context, filepath,
@@ -787,6 +968,8 @@ def save(context,
            EXPORT_ANIMATION=use_animation,
            EXPORT_GLOBAL_MATRIX=global_matrix,
            EXPORT_PATH_MODE=path_mode,
+           EXPORT_MESH2_WRITER=mesh2_writer,
+           EXPORT_INSTANCES=use_instances,
            )
 
     return {'FINISHED'}
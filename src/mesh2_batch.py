@@ -0,0 +1,435 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                M E S H 2 _ B A T C H                              **
+#/ =======================================================================================
+#/ **                                                                                   **
+#/ **  Copyright (c) 2021, Stephen W. Soliday                                           **
+#/ **                      stephen.soliday@trncmp.org                                   **
+#/ **                      http://research.trncmp.org                                   **
+#/ **                                                                                   **
+#/ **  -------------------------------------------------------------------------------  **
+#/ **                                                                                   **
+#/ **  This program is free software: you can redistribute it and/or modify it under    **
+#/ **  the terms of the GNU General Public License as published by the Free Software    **
+#/ **  Foundation, either version 3 of the License, or (at your option)                 **
+#/ **  any later version.                                                               **
+#/ **                                                                                   **
+#/ **  This program is distributed in the hope that it will be useful, but WITHOUT      **
+#/ **  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS    **
+#/ **  FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.   **
+#/ **                                                                                   **
+#/ **  You should have received a copy of the GNU General Public License along with     **
+#/ **  this program. If not, see <http://www.gnu.org/licenses/>.                        **
+#/ **                                                                                   **
+#/ ----- Modification History ------------------------------------------------------------
+#/
+#/ @brief   Batch conversion of directory trees of OBJ files.
+#/
+#/ @details Every OBJ under the given directories is converted with ConvertObj2Mesh2
+#/          in a pool of worker processes, largest file first so the long
+#/          conversions do not end up last. Like make, an include that is newer
+#/          than its OBJ and every MTL the OBJ names is left alone.
+#/
+#/ @author  Stephen W. Soliday
+#/ @date    2021-Feb-07
+#/
+#/ =======================================================================================
+
+import sys, os, mmap, json, time, getopt
+import concurrent.futures
+
+try:
+    from . import TLogger, convert_obj_to_mesh2, mesh2_cache, mesh2_library
+except ImportError:
+    import TLogger, convert_obj_to_mesh2, mesh2_cache, mesh2_library
+logger = TLogger.getInstance()
+
+OBJ_SUFFIX = '.obj'
+INC_SUFFIX = '.inc'
+
+#/ ----- conversion options shared by the batch and watch tools --------------------------
+
+CONVERT_SHORT = 'cw:rp:e:ut:'
+CONVERT_LONG  = [ 'comments', 'cache=', 'cache-size=', 'weld=', 'reorder', 'precision=',
+                  'max-error=', 'dedup', 'textures=' ]
+CONVERT_USAGE = """   -c, --comments      append a '// index' comment to every vector
+       --cache DIR     reuse conversions stored in the cache directory DIR
+       --cache-size MB evict least recently used entries beyond MB (default 1024)
+   -w, --weld EPS      merge vertices, normals and UVs closer than EPS (0 = exact)
+   -r, --reorder       sort faces in Morton order, renumber vectors by first use
+   -p, --precision N   write vectors with N decimals, without trailing zeros
+   -e, --max-error E   pick the decimals so the error stays below E times the
+                       bounding box diagonal of each vector section
+   -u, --dedup         declare materials that render the same texture only once
+   -t, --textures FILE merge the textures into the shared library include FILE
+"""
+
+LIBRARIES = mesh2_cache.MaterialCache()   #/ parsed MTL files, one per process
+
+
+#/ =======================================================================================
+def MtlLibs( obj_filename ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Paths of the MTL files named by the mtllib records of an OBJ file, resolved the
+    way ObjParser resolves them.
+    """
+    #/ -----------------------------------------------------------------------------------
+    obj_root = os.sep.join(obj_filename.split(os.sep)[:-1])
+
+    with open( obj_filename, 'rb' ) as fp:
+        if ( 0 == os.fstat( fp.fileno() ).st_size ):
+            return []
+        with mmap.mmap( fp.fileno(), 0, access=mmap.ACCESS_READ ) as data:
+            names = [ m.group(1).decode( 'utf-8', 'replace' )
+                      for m in mesh2_cache.MTLLIB.finditer( data ) ]
+
+    return [ '%s%s%s' % ( obj_root, os.sep, name, ) for name in names ]
+
+
+#/ =======================================================================================
+class BatchJob:
+    #/ -----------------------------------------------------------------------------------
+    """
+    One OBJ file to convert and the include it goes to.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, obj_filename, inc_filename ):
+        #/ -------------------------------------------------------------------------------
+        self.obj_filename = obj_filename
+        self.inc_filename = inc_filename
+        self.size         = os.path.getsize( obj_filename )
+
+    #/ ===================================================================================
+    def inputs( self ):
+        #/ -------------------------------------------------------------------------------
+        return [ self.obj_filename ] + MtlLibs( self.obj_filename )
+
+    #/ ===================================================================================
+    def upToDate( self ):
+        #/ -------------------------------------------------------------------------------
+        """
+        True if the include exists and no input is newer. A missing MTL does not
+        count; converting again would not bring it back.
+        """
+        #/ -------------------------------------------------------------------------------
+        try:
+            made = os.stat( self.inc_filename ).st_mtime
+        except OSError:
+            return False
+
+        for filename in self.inputs():
+            try:
+                if ( made < os.stat( filename ).st_mtime ):
+                    return False
+            except OSError:
+                pass
+
+        return True
+
+
+#/ =======================================================================================
+def ConvertOptions( opts ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    The conversion options (CONVERT_SHORT, CONVERT_LONG) among the getopt pairs opts,
+    as keywords for ConvertObj2Mesh2 plus cache_dir, cache_size and textures (the
+    file name of a mesh2_library.TextureLibrary). Raise getopt.GetoptError for a
+    value out of range.
+    """
+    #/ -----------------------------------------------------------------------------------
+    options = { 'comments'   : False,
+                'cache_dir'  : None,
+                'cache_size' : mesh2_cache.CACHE_SIZE,
+                'weld'       : None,
+                'reorder'    : False,
+                'decimals'   : None,
+                'max_error'  : None,
+                'dedup'      : False,
+                'textures'   : None }
+
+    for key, val in opts:
+        if ( key in ( '-c', '--comments' ) ):
+            options['comments'] = True
+        elif ( '--cache' == key ):
+            options['cache_dir'] = val
+        elif ( '--cache-size' == key ):
+            options['cache_size'] = int( float( val ) * 1024 * 1024 )
+        elif ( key in ( '-w', '--weld' ) ):
+            options['weld'] = float( val )
+        elif ( key in ( '-r', '--reorder' ) ):
+            options['reorder'] = True
+        elif ( key in ( '-p', '--precision' ) ):
+            options['decimals'] = convert_obj_to_mesh2.PrecisionOption( key, val )
+        elif ( key in ( '-e', '--max-error' ) ):
+            options['max_error'] = convert_obj_to_mesh2.PrecisionOption( key, val )
+        elif ( key in ( '-u', '--dedup' ) ):
+            options['dedup'] = True
+        elif ( key in ( '-t', '--textures' ) ):
+            options['textures'] = val
+
+    return options
+
+
+#/ =======================================================================================
+def FindJobs( roots, out_dir=None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Walk roots (directories or OBJ files) and return a BatchJob for every OBJ file,
+    largest first. The include goes next to its OBJ or, with out_dir, to the same
+    path relative to its root under out_dir.
+    """
+    #/ -----------------------------------------------------------------------------------
+    jobs = []
+    for root in roots:
+        if ( os.path.isfile( root ) ):
+            found = [ ( os.path.dirname( root ), root ) ]
+        else:
+            found = []
+            for path, dirs, files in os.walk( root ):
+                dirs.sort()
+                for name in sorted( files ):
+                    if ( name.lower().endswith( OBJ_SUFFIX ) ):
+                        found.append( ( root, os.path.join( path, name ) ) )
+
+        for base, obj_filename in found:
+            if ( None == out_dir ):
+                target = obj_filename
+            else:
+                target = os.path.join( out_dir, os.path.relpath( obj_filename, base ) )
+            jobs.append( BatchJob( obj_filename, os.path.splitext( target )[0] + INC_SUFFIX ) )
+
+    jobs.sort( key=lambda job: -job.size )
+    return jobs
+
+
+#/ =======================================================================================
+def ConvertJob( args ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Convert one file, in a worker process or in this one. args is ( obj_filename,
+    inc_filename, options, quiet ); options go to ConvertObj2Mesh2, except
+    cache_dir and cache_size, which open a mesh2_cache.ConversionCache, and
+    textures, which opens a mesh2_library.TextureLibrary. quiet holds
+    the converter's own messages below WARNING back. The MTL files are loaded through
+    the LIBRARIES of the process, so a worker parses a shared library once. Return
+    a dict of the result.
+    """
+    #/ -----------------------------------------------------------------------------------
+    obj_filename, inc_filename, options, quiet = args
+
+    options = dict( options )
+    cache   = None
+    if ( None != options.get( 'cache_dir' ) ):
+        cache = mesh2_cache.ConversionCache( options['cache_dir'], options['cache_size'] )
+    options.pop( 'cache_dir',  None )
+    options.pop( 'cache_size', None )
+
+    library = None
+    if ( None != options.get( 'textures' ) ):
+        library = mesh2_library.TextureLibrary( options['textures'] )
+    options.pop( 'textures', None )
+
+    level = logger.console_level
+    if ( quiet ):
+        logger.console_level = min( level, TLogger.WARNING )
+    logger.resetMetrics()
+
+    start = time.perf_counter()
+    error = None
+    try:
+        inc_root = os.path.dirname( inc_filename )
+        if ( inc_root ):
+            os.makedirs( inc_root, exist_ok=True )
+        convert_obj_to_mesh2.ConvertObj2Mesh2( obj_filename, inc_filename, cache=cache,
+                                               libraries=LIBRARIES, library=library,
+                                               **options )
+    except Exception as e:
+        error = '%s: %s' % ( type(e).__name__, e, )
+    finally:
+        logger.console_level = level
+
+    counters = logger.summary()['counters']
+    return { 'obj'           : obj_filename,
+             'inc'           : inc_filename,
+             'seconds'       : time.perf_counter() - start,
+             'bytes'         : os.path.getsize( obj_filename ),
+             'faces'         : counters.get( 'faces', 0 ),
+             'bytes_written' : counters.get( 'bytes_written', 0 ),
+             'mtl_hits'      : counters.get( 'mtl_hits', 0 ),
+             'mtl_misses'    : counters.get( 'mtl_misses', 0 ),
+             'cached'        : ( None != cache ) and ( 0 < cache.hits ),
+             'error'         : error }
+
+
+#/ =======================================================================================
+def RunBatch( jobs, workers=1, options={}, quiet=True ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Convert the BatchJobs in their order with up to workers processes. Return the
+    ConvertJob results in the order they finished.
+    """
+    #/ -----------------------------------------------------------------------------------
+    todo    = [ ( job.obj_filename, job.inc_filename, options, quiet ) for job in jobs ]
+    results = []
+
+    def done( r ):
+        results.append( r )
+        if ( None == r['error'] ):
+            logger.info( '    [%d/%d] %s  %.1f MB  %.2f s%s', len(results), len(todo),
+                         r['inc'], r['bytes'] / 1048576.0, r['seconds'],
+                         ' (cached)' if ( r['cached'] ) else '' )
+        else:
+            logger.error( '    [%d/%d] %s  %s', len(results), len(todo),
+                          r['obj'], r['error'] )
+
+    if (( 1 >= workers ) or ( 2 > len(todo) )):
+        for args in todo:
+            done( ConvertJob( args ) )
+        return results
+
+    console = min( logger.console_level, TLogger.WARNING ) if ( quiet ) else None
+
+    #/ ----- submitted largest first; idle workers take the next one in that order ------
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers = min( workers, len(todo) ),
+            initializer = TLogger.WorkerInit,
+            initargs    = logger.workerArgs( console ) ) as pool:
+        for future in concurrent.futures.as_completed( [ pool.submit( ConvertJob, args )
+                                                         for args in todo ] ):
+            done( future.result() )
+
+    return results
+
+
+#/ =======================================================================================
+def Report( results, skipped, workers, seconds ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Log the aggregate throughput of a batch. Return the totals as a dict.
+    """
+    #/ -----------------------------------------------------------------------------------
+    ok     = [ r for r in results if ( None == r['error'] ) ]
+    total  = { 'converted'     : len(ok),
+               'cached'        : len( [ r for r in ok if ( r['cached'] ) ] ),
+               'up_to_date'    : skipped,
+               'failed'        : len(results) - len(ok),
+               'bytes'         : sum( r['bytes'] for r in ok ),
+               'bytes_written' : sum( r['bytes_written'] for r in ok ),
+               'faces'         : sum( r['faces'] for r in ok ),
+               'mtl_hits'      : sum( r['mtl_hits'] for r in results ),
+               'mtl_misses'    : sum( r['mtl_misses'] for r in results ),
+               'seconds'       : seconds,
+               'busy'          : sum( r['seconds'] for r in results ),
+               'workers'       : workers }
+
+    wall = max( seconds, 1.0e-9 )
+
+    logger.info( '    Batch:        %d converted (%d cached), %d up to date, %d failed',
+                 total['converted'], total['cached'], total['up_to_date'], total['failed'] )
+    logger.info( '      read        %.1f MB, %d faces', total['bytes'] / 1048576.0,
+                 total['faces'] )
+    logger.info( '      written     %.1f MB', total['bytes_written'] / 1048576.0 )
+    logger.info( '      MTL loads   %d hits, %d misses (%.1f%%)', total['mtl_hits'],
+                 total['mtl_misses'], 100.0 * total['mtl_hits'] /
+                 max( total['mtl_hits'] + total['mtl_misses'], 1 ) )
+    logger.info( '      wall        %.2f s, %.1f MB/s, %.0f faces/s', seconds,
+                 total['bytes'] / 1048576.0 / wall, total['faces'] / wall )
+    logger.info( '      busy        %.2f s in %d workers (%.0f%%)', total['busy'], workers,
+                 100.0 * total['busy'] / ( wall * max( workers, 1 ) ) )
+
+    return total
+
+
+#/ =======================================================================================
+def Usage( pn, msg=None ):
+    #/ -----------------------------------------------------------------------------------
+    if ( None != msg ):
+        sys.stderr.write( '\n%s\n' % (msg,) )
+
+    sys.stderr.write("""
+OBJ 2 Mesh2 batch * ver 1 * 2021.02
+
+USAGE: %s [options] dir|file.obj ...
+   Converts every OBJ file under the directories into a Mesh2 include next to it.
+
+   -j, --jobs N        convert N files at a time in worker processes
+   -o, --output DIR    write the includes under DIR, mirroring the input trees
+   -f, --force         convert even if the include is newer than its OBJ and MTL
+   -n, --dry-run       list the conversions that would run, largest first
+   -v, --verbose       show the converter messages of every file
+   -m, --metrics FILE  write the result of every file and the totals as JSON
+%s
+Example: %s -j 8 assets/
+
+""" % (pn, CONVERT_USAGE, pn,) )
+    return 1
+
+
+#/ =======================================================================================
+def main( argc, argv ):
+    #/ -----------------------------------------------------------------------------------
+    try:
+        opts, args = getopt.getopt( argv[1:], 'j:o:fnvm:' + CONVERT_SHORT,
+                                    [ 'jobs=', 'output=', 'force', 'dry-run', 'verbose',
+                                      'metrics=' ] + CONVERT_LONG )
+        options    = ConvertOptions( opts )
+    except getopt.GetoptError as e:
+        return Usage( argv[0], str(e) )
+
+    if ( 0 == len(args) ):
+        return Usage( argv[0] )
+
+    workers = 1
+    out_dir = None
+    force   = False
+    dry_run = False
+    quiet   = True
+    metrics = None
+
+    for key, val in opts:
+        if ( key in ( '-j', '--jobs' ) ):
+            workers = int( val )
+        elif ( key in ( '-o', '--output' ) ):
+            out_dir = val
+        elif ( key in ( '-f', '--force' ) ):
+            force = True
+        elif ( key in ( '-n', '--dry-run' ) ):
+            dry_run = True
+        elif ( key in ( '-v', '--verbose' ) ):
+            quiet = False
+        elif ( key in ( '-m', '--metrics' ) ):
+            metrics = val
+
+    #/ -----------------------------------------------------------------------------------
+
+    start = time.perf_counter()
+
+    jobs  = FindJobs( args, out_dir )
+    todo  = jobs if ( force ) else [ job for job in jobs if ( not job.upToDate() ) ]
+
+    logger.info( '    Found:        %d OBJ files, %d to convert', len(jobs), len(todo) )
+
+    if ( dry_run ):
+        for job in todo:
+            sys.stdout.write( '%12d %s -> %s\n' % ( job.size, job.obj_filename,
+                                                    job.inc_filename, ) )
+        return 0
+
+    results = RunBatch( todo, workers, options, quiet )
+    total   = Report( results, len(jobs) - len(todo), max( 1, min( workers, len(todo) ) ),
+                      time.perf_counter() - start )
+
+    if ( None != metrics ):
+        with open( metrics, 'w' ) as fp:
+            json.dump( { 'total' : total, 'files' : results }, fp, indent=2, sort_keys=True )
+            fp.write( '\n' )
+
+    return 1 if ( 0 < total['failed'] ) else 0
+
+
+#/ =======================================================================================
+if ( '__main__' == __name__ ): sys.exit( main( len( sys.argv ), sys.argv ) )
+#/ =======================================================================================
+#/ **                                M E S H 2 _ B A T C H                              **
+#/ =========================================================================== END FILE ==
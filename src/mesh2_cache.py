@@ -0,0 +1,323 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                M E S H 2 _ C A C H E                              **
+#/ =======================================================================================
+#/ **                                                                                   **
+#/ **  Copyright (c) 2021, Stephen W. Soliday                                           **
+#/ **                      stephen.soliday@trncmp.org                                   **
+#/ **                      http://research.trncmp.org                                   **
+#/ **                                                                                   **
+#/ **  -------------------------------------------------------------------------------  **
+#/ **                                                                                   **
+#/ **  This program is free software: you can redistribute it and/or modify it under    **
+#/ **  the terms of the GNU General Public License as published by the Free Software    **
+#/ **  Foundation, either version 3 of the License, or (at your option)                 **
+#/ **  any later version.                                                               **
+#/ **                                                                                   **
+#/ **  This program is distributed in the hope that it will be useful, but WITHOUT      **
+#/ **  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS    **
+#/ **  FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.   **
+#/ **                                                                                   **
+#/ **  You should have received a copy of the GNU General Public License along with     **
+#/ **  this program. If not, see <http://www.gnu.org/licenses/>.                        **
+#/ **                                                                                   **
+#/ ----- Modification History ------------------------------------------------------------
+#/
+#/ @brief   Content addressed cache of OBJ to mesh2 conversions.
+#/
+#/ @details An entry is keyed by the SHA-256 of the OBJ bytes, the bytes of every
+#/          mtllib it references and the conversion options. It holds the include
+#/          file and, if one was made, the texture include. Entries are evicted in
+#/          least recently used order once the cache grows past its size limit.
+#/
+#/ @author  Stephen W. Soliday
+#/ @date    2021-Feb-07
+#/
+#/ =======================================================================================
+
+import os, re, mmap, json, shutil, hashlib, tempfile
+
+try:
+    from . import TLogger
+except ImportError:
+    import TLogger
+logger = TLogger.getInstance()
+
+CACHE_VERSION = b'mesh2-cache 1'
+CACHE_SIZE    = 1024 * 1024 * 1024   #/ default size limit in bytes
+HASH_BLOCK    = 16 * 1024 * 1024
+
+INC_NAME      = 'mesh2.inc'
+TEXTURE_NAME  = 'texture.inc'
+STATS_NAME    = 'stats.json'
+
+MTLLIB = re.compile( rb'^[ \t]*mtllib[ \t]+(\S+)', re.MULTILINE )
+
+
+#/ =======================================================================================
+def _hashFile( h, filename ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Feed the bytes of a file to hash h. Return the mtllib names found in it.
+    """
+    #/ -----------------------------------------------------------------------------------
+    with open( filename, 'rb' ) as fp:
+        size = os.fstat( fp.fileno() ).st_size
+        h.update( b'%d\n' % ( size, ) )
+        if ( 0 == size ):
+            return []
+        with mmap.mmap( fp.fileno(), 0, access=mmap.ACCESS_READ ) as data:
+            for lo in range( 0, size, HASH_BLOCK ):
+                h.update( data[lo:lo+HASH_BLOCK] )
+            return [ m.group(1).decode( 'utf-8', 'replace' ) for m in MTLLIB.finditer( data ) ]
+
+
+#/ =======================================================================================
+class ConversionCache:
+    #/ -----------------------------------------------------------------------------------
+    """
+    On disk cache of converted include files, one directory per key under cache_dir.
+    New entries are written to a temporary directory and renamed into place, so
+    several converters may share one cache. The modification time of an entry is
+    its last use; store() evicts the oldest entries down to max_bytes.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, cache_dir, max_bytes=CACHE_SIZE ):
+        #/ -------------------------------------------------------------------------------
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+        os.makedirs( cache_dir, exist_ok=True )
+
+    #/ ===================================================================================
+    def _entry( self, key ):
+        #/ -------------------------------------------------------------------------------
+        return os.path.join( self.cache_dir, key )
+
+    #/ ===================================================================================
+    def key( self, obj_filename, inc_filename, options ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Hash of the OBJ file, every mtllib it names, the options that change the
+        output and the include name (it is written into the union and #include).
+        """
+        #/ -------------------------------------------------------------------------------
+        h = hashlib.sha256( CACHE_VERSION )
+
+        h.update( repr( sorted( options.items() ) ).encode( 'utf-8' ) )
+        h.update( os.path.basename( inc_filename ).encode( 'utf-8' ) )
+
+        obj_root = os.sep.join(obj_filename.split(os.sep)[:-1])
+
+        for name in _hashFile( h, obj_filename ):
+            h.update( b'\nmtllib %s\n' % ( name.encode( 'utf-8' ), ) )
+            try:
+                _hashFile( h, '%s%s%s' % ( obj_root, os.sep, name, ) )
+            except IOError:
+                h.update( b'missing' )
+
+        return h.hexdigest()
+
+    #/ ===================================================================================
+    def fetch( self, key, inc_filename, texture_filename=None ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Copy a cached conversion to inc_filename (and texture_filename). Return True
+        on a hit, False on a miss.
+        """
+        #/ -------------------------------------------------------------------------------
+        entry = self._entry( key )
+        try:
+            shutil.copyfile( os.path.join( entry, INC_NAME ), inc_filename )
+            if ( None != texture_filename ):
+                shutil.copyfile( os.path.join( entry, TEXTURE_NAME ), texture_filename )
+            os.utime( entry )
+        except IOError:
+            self.misses += 1
+            self._count( 'misses' )
+            return False
+
+        self.hits += 1
+        self._count( 'hits' )
+        return True
+
+    #/ ===================================================================================
+    def store( self, key, inc_filename, texture_filename=None ):
+        #/ -------------------------------------------------------------------------------
+        entry = self._entry( key )
+        if ( os.path.isdir( entry ) ):
+            return
+
+        temp = tempfile.mkdtemp( prefix='.tmp-', dir=self.cache_dir )
+        try:
+            os.chmod( temp, 0o755 )
+            shutil.copyfile( inc_filename, os.path.join( temp, INC_NAME ) )
+            if ( None != texture_filename ):
+                shutil.copyfile( texture_filename, os.path.join( temp, TEXTURE_NAME ) )
+            os.rename( temp, entry )
+        except OSError:
+            shutil.rmtree( temp, ignore_errors=True )   #/ another writer got there first
+
+        self.evict()
+
+    #/ ===================================================================================
+    def entries( self ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Return [ ( last use, size in bytes, key ) ] of the cache, oldest first.
+        """
+        #/ -------------------------------------------------------------------------------
+        table = []
+        for d in os.scandir( self.cache_dir ):
+            if ( d.name.startswith( '.' ) or not d.is_dir() ):
+                continue
+            try:
+                size = sum( f.stat().st_size for f in os.scandir( d.path ) )
+                table.append( ( d.stat().st_mtime, size, d.name ) )
+            except OSError:
+                pass   #/ evicted by someone else
+        table.sort()
+        return table
+
+    #/ ===================================================================================
+    def evict( self ):
+        #/ -------------------------------------------------------------------------------
+        table   = self.entries()
+        total   = sum( size for _, size, _ in table )
+        evicted = 0
+        for _, size, key in table:
+            if ( total <= self.max_bytes ):
+                break
+            shutil.rmtree( self._entry( key ), ignore_errors=True )
+            total   -= size
+            evicted += 1
+        if ( 0 < evicted ):
+            self.evictions += evicted
+            self._count( 'evictions', evicted )
+
+    #/ ===================================================================================
+    def _count( self, name, n=1 ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Add to the running totals kept in the cache directory. Concurrent writers may
+        lose an update; the totals are a report, not an account.
+        """
+        #/ -------------------------------------------------------------------------------
+        path  = os.path.join( self.cache_dir, STATS_NAME )
+        stats = self.totals()
+        stats[name] = stats.get( name, 0 ) + n
+        try:
+            fd, temp = tempfile.mkstemp( prefix='.tmp-', dir=self.cache_dir )
+            with os.fdopen( fd, 'w' ) as fp:
+                json.dump( stats, fp )
+            os.chmod( temp, 0o644 )
+            os.replace( temp, path )
+        except OSError:
+            pass
+
+    #/ ===================================================================================
+    def totals( self ):
+        #/ -------------------------------------------------------------------------------
+        try:
+            with open( os.path.join( self.cache_dir, STATS_NAME ) ) as fp:
+                return json.load( fp )
+        except ( IOError, ValueError ):
+            return {}
+
+    #/ ===================================================================================
+    def report( self ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Log the hits and misses of this run and of the cache over its lifetime.
+        """
+        #/ -------------------------------------------------------------------------------
+        table = self.entries()
+        total = self.totals()
+
+        def rate( hits, misses ):
+            n = hits + misses
+            return ( 100.0 * hits / n ) if ( 0 < n ) else 0.0
+
+        logger.info( '    Cache:        %s', self.cache_dir )
+        logger.info( '      entries     %d, %.1f of %.1f MB',
+                     len(table), sum( size for _, size, _ in table ) / 1048576.0,
+                     self.max_bytes / 1048576.0 )
+        logger.info( '      this run    %d hits, %d misses (%.1f%%), %d evicted',
+                     self.hits, self.misses, rate( self.hits, self.misses ),
+                     self.evictions )
+        logger.info( '      total       %d hits, %d misses (%.1f%%), %d evicted',
+                     total.get( 'hits', 0 ), total.get( 'misses', 0 ),
+                     rate( total.get( 'hits', 0 ), total.get( 'misses', 0 ) ),
+                     total.get( 'evictions', 0 ) )
+
+
+#/ =======================================================================================
+class MaterialCache:
+    #/ -----------------------------------------------------------------------------------
+    """
+    Parsed MTL files in memory, keyed by real path, mtime and size, for the callers
+    that convert many OBJ files in one process (batch workers, watch mode). A file
+    that changed on disk is parsed again. The Material objects are shared between
+    conversions and must not be modified.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self ):
+        #/ -------------------------------------------------------------------------------
+        self.entries = {}   #/ real path: ( ( mtime_ns, size ), { name: Material } )
+        self.hits    = 0
+        self.misses  = 0
+
+    #/ ===================================================================================
+    def load( self, mtr_filename, parse ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Return the materials of an MTL file as a dict. On a miss parse(
+        mtr_filename, mat_dict ) fills a new one.
+        """
+        #/ -------------------------------------------------------------------------------
+        path  = os.path.realpath( mtr_filename )
+        st    = os.stat( path )
+        stamp = ( st.st_mtime_ns, st.st_size )
+
+        entry = self.entries.get( path )
+        if (( None != entry ) and ( stamp == entry[0] )):
+            self.hits += 1
+            logger.count( 'mtl_hits' )
+            return entry[1]
+
+        self.misses += 1
+        logger.count( 'mtl_misses' )
+
+        parsed = {}
+        parse( mtr_filename, parsed )
+        self.entries[ path ] = ( stamp, parsed )
+        return parsed
+
+    #/ ===================================================================================
+    def clear( self ):
+        #/ -------------------------------------------------------------------------------
+        self.entries.clear()
+
+    #/ ===================================================================================
+    def rate( self ):
+        #/ -------------------------------------------------------------------------------
+        """ Percent of the loads that were hits. """
+        #/ -------------------------------------------------------------------------------
+        n = self.hits + self.misses
+        return ( 100.0 * self.hits / n ) if ( 0 < n ) else 0.0
+
+    #/ ===================================================================================
+    def report( self ):
+        #/ -------------------------------------------------------------------------------
+        logger.info( '    MTL cache:    %d files, %d materials', len(self.entries),
+                     sum( len(entry[1]) for entry in self.entries.values() ) )
+        logger.info( '      loads       %d hits, %d misses (%.1f%%)',
+                     self.hits, self.misses, self.rate() )
+
+
+#/ =======================================================================================
+#/ **                                M E S H 2 _ C A C H E                              **
+#/ ======================================================================== END FILE =====
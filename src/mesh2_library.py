@@ -0,0 +1,222 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                              M E S H 2 _ L I B R A R Y                            **
+#/ =======================================================================================
+#/ **                                                                                   **
+#/ **  Copyright (c) 2021, Stephen W. Soliday                                           **
+#/ **                      stephen.soliday@trncmp.org                                   **
+#/ **                      http://research.trncmp.org                                   **
+#/ **                                                                                   **
+#/ **  -------------------------------------------------------------------------------  **
+#/ **                                                                                   **
+#/ **  This program is free software: you can redistribute it and/or modify it under    **
+#/ **  the terms of the GNU General Public License as published by the Free Software    **
+#/ **  Foundation, either version 3 of the License, or (at your option)                 **
+#/ **  any later version.                                                               **
+#/ **                                                                                   **
+#/ **  This program is distributed in the hope that it will be useful, but WITHOUT      **
+#/ **  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS    **
+#/ **  FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.   **
+#/ **                                                                                   **
+#/ **  You should have received a copy of the GNU General Public License along with     **
+#/ **  this program. If not, see <http://www.gnu.org/licenses/>.                        **
+#/ **                                                                                   **
+#/ ----- Modification History ------------------------------------------------------------
+#/
+#/ @brief   Texture include shared by all exports of a project.
+#/
+#/ @details The textures of every export are merged into one library include instead
+#/          of a texture file per export. A JSON index next to the library maps the
+#/          content hash of each texture (Material.key) to its name and declaration;
+#/          an export appends only the textures the library does not have yet.
+#/
+#/ @author  Stephen W. Soliday
+#/ @date    2021-Feb-07
+#/
+#/ =======================================================================================
+
+import os, re, io, copy, json, time, tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    from . import TLogger
+except ImportError:
+    import TLogger
+logger = TLogger.getInstance()
+
+INDEX_VERSION = 1
+
+
+#/ =======================================================================================
+def IndexFileName( library_filename ):
+    #/ -----------------------------------------------------------------------------------
+    basename = os.path.splitext( library_filename )[0]
+    return '%s-index.json' % (basename,)
+
+
+#/ =======================================================================================
+class TextureLibrary:
+    #/ -----------------------------------------------------------------------------------
+    """
+    A texture include shared by many exports, with its index (IndexFileName). A
+    texture keeps the name of the first material that brought it; a different
+    texture under a name already taken is declared as name_<hash>. Exports that run
+    at the same time take turns on a lock file (on systems with fcntl). The index
+    records the size of the library, and a library that no longer matches it is
+    written again from the declarations held in the index.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, library_filename ):
+        #/ -------------------------------------------------------------------------------
+        self.library_filename = library_filename
+        self.index_filename   = IndexFileName( library_filename )
+        self.lock_filename    = '%s.lock' % ( library_filename, )
+
+        self.appended = 0
+        self.reused   = 0
+
+    #/ ===================================================================================
+    def _load( self ):
+        #/ -------------------------------------------------------------------------------
+        try:
+            with open( self.index_filename, 'r' ) as fp:
+                index = json.load( fp )
+            if ( INDEX_VERSION == index.get( 'version' ) ):
+                return index
+        except ( IOError, ValueError ):
+            pass
+        return { 'version' : INDEX_VERSION, 'bytes' : 0, 'textures' : {} }
+
+    #/ ===================================================================================
+    def _save( self, index ):
+        #/ -------------------------------------------------------------------------------
+        fd, tmp = tempfile.mkstemp( prefix='.index-',
+                                    dir=os.path.dirname( os.path.abspath( self.index_filename ) ) )
+        with os.fdopen( fd, 'w' ) as fp:
+            json.dump( index, fp, indent=1 )
+        os.replace( tmp, self.index_filename )
+
+    #/ ===================================================================================
+    def _header( self, fp ):
+        #/ -------------------------------------------------------------------------------
+        fp.write( '// ====================================================================== BEGIN FILE =====\n' )
+        fp.write( '//\n// Texture library of io_mesh_povray exports, appended to by each export\n' )
+        fp.write( '// Created:    %s\n//\n' % ( time.asctime( time.gmtime() ), ) )
+        fp.write( '// =======================================================================================\n\n' )
+
+    #/ ===================================================================================
+    def _size( self ):
+        #/ -------------------------------------------------------------------------------
+        try:
+            return os.path.getsize( self.library_filename )
+        except OSError:
+            return -1
+
+    #/ ===================================================================================
+    def guard( self ):
+        #/ -------------------------------------------------------------------------------
+        """ Identifier that keeps the library from being parsed twice in one scene. """
+        #/ -------------------------------------------------------------------------------
+        name = os.path.basename( self.library_filename )
+        return 'TEXTURE_LIBRARY_%s' % ( re.sub( r'[^A-Za-z0-9_]', '_', name ), )
+
+    #/ ===================================================================================
+    def include( self, fp, inc_filename ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Write the guarded #include of the library, relative to inc_filename.
+        """
+        #/ -------------------------------------------------------------------------------
+        rel = os.path.relpath( os.path.abspath( self.library_filename ),
+                               os.path.dirname( os.path.abspath( inc_filename ) ) )
+        fp.write( '\n#ifndef ( %s )\n' % ( self.guard(), ) )
+        fp.write( '#declare %s = 1;\n' % ( self.guard(), ) )
+        fp.write( '#include "%s"\n' % ( rel, ) )
+        fp.write( '#end\n\n' )
+
+    #/ ===================================================================================
+    def merge( self, materials ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Declare the textures of materials that the library lacks. Return a dict with
+        the keys of materials, each mapped to a copy of its material that carries the
+        library name. The materials themselves are not changed.
+        """
+        #/ -------------------------------------------------------------------------------
+        lib_root = os.path.dirname( self.library_filename )
+        if ( lib_root ):
+            os.makedirs( lib_root, exist_ok=True )
+
+        lock = open( self.lock_filename, 'a' )
+        try:
+            if ( None != fcntl ):
+                fcntl.flock( lock.fileno(), fcntl.LOCK_EX )
+
+            index    = self._load()
+            textures = index['textures']
+
+            if ( index['bytes'] != self._size() ):
+                if ( 0 < len(textures) ):
+                    logger.warning( '    Library:      %s changed outside the index, '
+                                    'writing it again', self.library_filename )
+                with open( self.library_filename, 'w' ) as fp:
+                    self._header( fp )
+                    for entry in textures.values():
+                        fp.write( entry['text'] )
+
+            names   = set( entry['name'] for entry in textures.values() )
+            merged  = {}
+            renamed = {}
+            added   = []
+            for name, mat in materials.items():
+                key = mat.key()
+                if ( key not in renamed ):
+                    entry = textures.get( key )
+                    if ( None == entry ):
+                        lib_name = mat.name
+                        if ( lib_name in names ):
+                            lib_name = '%s_%s' % ( mat.name, key[:8], )
+                        names.add( lib_name )
+
+                        lib_mat      = copy.copy( mat )
+                        lib_mat.name = lib_name
+                        text         = io.StringIO()
+                        lib_mat.write( text )
+
+                        entry = { 'name' : lib_name, 'text' : text.getvalue() }
+                        textures[ key ] = entry
+                        added.append( entry )
+                    else:
+                        lib_mat      = copy.copy( mat )
+                        lib_mat.name = entry['name']
+                    renamed[ key ] = lib_mat
+                merged[ name ] = renamed[ key ]
+
+            if ( 0 < len(added) ):
+                with open( self.library_filename, 'a' ) as fp:
+                    for entry in added:
+                        fp.write( entry['text'] )
+                    fp.flush()
+                    os.fsync( fp.fileno() )
+
+            index['bytes'] = self._size()
+            self._save( index )
+        finally:
+            lock.close()
+
+        self.appended += len(added)
+        self.reused   += len(renamed) - len(added)
+        logger.count( 'textures_appended', len(added) )
+        logger.count( 'textures_reused',   len(renamed) - len(added) )
+        logger.info( '    Library:      %s (%d new, %d known)', self.library_filename,
+                     len(added), len(renamed) - len(added) )
+
+        return merged
+
+
+#/ =======================================================================================
+#/ **                              M E S H 2 _ L I B R A R Y                            **
+#/ =========================================================================== END FILE ==
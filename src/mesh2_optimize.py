@@ -0,0 +1,364 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                             M E S H 2 _ O P T I M I Z E                           **
+#/ =======================================================================================
+#/ **                                                                                   **
+#/ **  Copyright (c) 2021, Stephen W. Soliday                                           **
+#/ **                      stephen.soliday@trncmp.org                                   **
+#/ **                      http://research.trncmp.org                                   **
+#/ **                                                                                   **
+#/ **  -------------------------------------------------------------------------------  **
+#/ **                                                                                   **
+#/ **  This program is free software: you can redistribute it and/or modify it under    **
+#/ **  the terms of the GNU General Public License as published by the Free Software    **
+#/ **  Foundation, either version 3 of the License, or (at your option)                 **
+#/ **  any later version.                                                               **
+#/ **                                                                                   **
+#/ **  This program is distributed in the hope that it will be useful, but WITHOUT      **
+#/ **  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS    **
+#/ **  FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.   **
+#/ **                                                                                   **
+#/ **  You should have received a copy of the GNU General Public License along with     **
+#/ **  this program. If not, see <http://www.gnu.org/licenses/>.                        **
+#/ **                                                                                   **
+#/ ----- Modification History ------------------------------------------------------------
+#/
+#/ @brief   Optional mesh2 optimization stages.
+#/
+#/ @details Every stage works on the columns of a convert_obj_to_mesh2.Mesh with
+#/          whole array numpy operations and hands the result back with setGeometry.
+#/
+#/ @author  Stephen W. Soliday
+#/ @date    2021-Feb-07
+#/
+#/ =======================================================================================
+
+import numpy as np
+
+
+#/ =======================================================================================
+def _Group( key, values, index ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Merge the rows of values whose key rows are equal. The key rows are packed into
+    one void scalar each and grouped with a single numpy.unique. Each group keeps the
+    row of its first occurrence, in first occurrence order.
+    """
+    #/ -----------------------------------------------------------------------------------
+    key = np.ascontiguousarray( key )
+    key = key.view( np.dtype( ( np.void, key.dtype.itemsize * key.shape[1] ) ) ).ravel()
+
+    _, first, inverse = np.unique( key, return_index=True, return_inverse=True )
+
+    #/ ----- number the groups by first occurrence --------------------------------------
+
+    order = np.argsort( first, kind='stable' )
+    rank  = np.empty( len(first), dtype=np.int64 )
+    rank[order] = np.arange( len(first) )
+
+    remap = rank[ inverse.ravel() ].astype( index.dtype )
+
+    return values[ first[order] ], remap[ index ]
+
+
+#/ =======================================================================================
+def _Grid( values, epsilon ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Bin the rows on a grid of cell size epsilon. Return the cell key of every row
+    and the key steps to the neighbouring cells (the cell itself included). The
+    cells are numbered row major, wrapping around in uint64 for huge grids (which
+    only adds candidates), so that a neighbour is a fixed step away and lookups of
+    sorted keys stay sorted.
+    """
+    #/ -----------------------------------------------------------------------------------
+    width  = values.shape[1]
+    cell   = np.floor( values / epsilon ).astype( np.int64 )
+    cell  -= cell.min( axis=0 )
+
+    stride = np.ones( width, dtype=np.uint64 )
+    offset = np.array( np.meshgrid( *( [ ( -1, 0, 1 ) ] * width ) ) ).reshape( width, -1 ).T
+    with np.errstate( over='ignore' ):
+        for k in range( width - 2, -1, -1 ):
+            stride[k] = stride[k + 1] * np.uint64( cell[:, k + 1].max() + 3 )
+        key   = ( cell.astype( np.uint64 ) * stride ).sum( axis=1, dtype=np.uint64 )
+        steps = ( offset.astype( np.uint64 ) * stride ).sum( axis=1, dtype=np.uint64 )
+
+    return key, steps
+
+
+#/ =======================================================================================
+def _Pairs( values, epsilon, key, steps, rows, cand, block=65536 ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Return ( i, j ), sorted, the pairs of i in rows and j < i in cand that are
+    closer than epsilon. Only the rows in the same and in the neighbouring cells
+    (key and steps from _Grid) are compared.
+    """
+    #/ -----------------------------------------------------------------------------------
+    rows  = rows[ np.argsort( key[rows], kind='stable' ) ]
+    cand  = cand[ np.argsort( key[cand], kind='stable' ) ]
+    ckey  = key[cand]
+    rkey  = key[rows]
+
+    found = [ ( rows[:0], rows[:0] ) ]
+    for step in steps:
+        with np.errstate( over='ignore' ):
+            near = rkey + step
+        lo    = np.searchsorted( ckey, near, side='left' )
+        count = np.searchsorted( ckey, near, side='right' ) - lo
+
+        for b in range( 0, len(rows), block ):   #/ bounds the candidate arrays
+            blo, bcount = lo[b:b + block], count[b:b + block]
+            i = np.repeat( rows[b:b + block], bcount )
+            j = cand[ np.repeat( blo - np.cumsum( bcount ) + bcount, bcount ) +
+                      np.arange( bcount.sum() ) ]
+
+            keep = ( j < i )
+            i, j = i[keep], j[keep]
+            keep = ( ( ( values[i] - values[j] ) ** 2 ).sum( axis=1 ) < epsilon * epsilon )
+            found.append( ( i[keep], j[keep] ) )
+
+    i = np.concatenate( [ f[0] for f in found ] )
+    j = np.concatenate( [ f[1] for f in found ] )
+    order = np.lexsort( ( j, i ) )
+    return i[order], j[order]
+
+
+#/ =======================================================================================
+def _First( i, j ):
+    #/ -----------------------------------------------------------------------------------
+    """ For sorted pairs, the distinct i and the first j paired with each. """
+    #/ -----------------------------------------------------------------------------------
+    first = np.flatnonzero( np.diff( i, prepend=-1 ) )
+    return i[first], j[first]
+
+
+#/ =======================================================================================
+def _Resolve( target, i, j ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Walk the rows of the pairs ( i, j ) from _Pairs in order: a row joins the
+    first earlier kept row it is paired with, or is kept itself. target holds for
+    each row the row it became and is updated. All rows whose earlier partners are
+    settled are settled together in one pass; once the passes stall (chains of
+    close rows) the rest is walked one pair at a time.
+    """
+    #/ -----------------------------------------------------------------------------------
+    OPEN, KEPT, MERGED = 0, 1, 2
+
+    state    = np.full( len(target), KEPT, dtype=np.int8 )
+    state[i] = OPEN
+
+    while ( 0 < len(i) ):
+        pending = np.count_nonzero( np.diff( i, prepend=-1 ) )
+
+        live    = ( MERGED != state[j] )
+        fi, fj  = _First( i[live], j[live] )
+
+        alone   = np.ones( len(target), dtype=bool )
+        alone[fi] = False
+        state[ i[ alone[i] ] ] = KEPT             #/ every partner merged elsewhere
+
+        join    = ( KEPT == state[fj] )
+        state[ fi[join] ]  = MERGED
+        target[ fi[join] ] = fj[join]
+
+        keep = ( OPEN == state[i] )
+        i, j = i[keep], j[keep]
+        if ( np.count_nonzero( np.diff( i, prepend=-1 ) ) > 0.9 * pending ):
+            break
+
+    state = state.tolist()
+    last  = -1
+    for a, b in zip( i.tolist(), j.tolist() ):
+        if ( a != last ):
+            if (( 0 <= last ) and ( OPEN == state[last] )):
+                state[last] = KEPT
+            last = a
+        if (( OPEN == state[a] ) and ( KEPT == state[b] )):
+            state[a]  = MERGED
+            target[a] = b
+    if (( 0 <= last ) and ( OPEN == state[last] )):
+        state[last] = KEPT
+
+
+#/ =======================================================================================
+def Weld( values, index, epsilon=0.0 ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Merge equal rows of values and, with epsilon > 0, the rows closer than epsilon,
+    and return ( values, index ) with index remapped to the welded rows. Rows are
+    taken in order: a row joins the first earlier kept row closer than epsilon, or
+    is kept itself. Every welded row is thus within epsilon of the row it became,
+    and no two kept rows are closer than epsilon.
+    """
+    #/ -----------------------------------------------------------------------------------
+    values = np.asarray( values )
+    index  = np.asarray( index )
+    if ( 0 == len(values) ):
+        return values, index
+
+    values, index = _Group( values + 0.0, values, index )   #/ -0.0 and 0.0 weld
+    if ( not ( 0.0 < epsilon ) ):
+        return values, index
+
+    #/ ----- rows in blocks of growing size: first against the rows kept so far
+    #/       (at most a few per cell, as they are epsilon apart), then the rest
+    #/       of the block among itself --------------------------------------------------
+
+    key, steps = _Grid( values, epsilon )
+    target     = np.arange( len(values) )
+    kept       = target[:0]
+
+    lo, size = 0, 4096
+    while ( lo < len(values) ):
+        rows = np.arange( lo, min( lo + size, len(values) ) )
+
+        fi, fj = _First( *_Pairs( values, epsilon, key, steps, rows, kept ) )
+        target[fi] = fj
+
+        rest = rows[ target[rows] == rows ]
+        _Resolve( target, *_Pairs( values, epsilon, key, steps, rest, rest ) )
+        kept = np.concatenate( ( kept, rest[ target[rest] == rest ] ) )
+
+        lo, size = lo + size, 2 * size
+
+    return _Group( target.reshape( -1, 1 ), values, index )
+
+
+#/ =======================================================================================
+def WeldMesh( mesh, epsilon=0.0, normal_epsilon=None, uv_epsilon=None ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Weld the vertices, normals and UVs of a Mesh and remap its index arrays.
+    normal_epsilon and uv_epsilon default to epsilon. Return the row counts before
+    and after as ( ( vertex, normal, uv ), ( vertex, normal, uv ) ).
+    """
+    #/ -----------------------------------------------------------------------------------
+    if ( None == normal_epsilon ):
+        normal_epsilon = epsilon
+    if ( None == uv_epsilon ):
+        uv_epsilon = epsilon
+
+    before = ( len(mesh.vertex), len(mesh.normal), len(mesh.uv) )
+
+    vertex, face_vertex = Weld( mesh.vertex, mesh.face_vertex, epsilon )
+    normal, face_normal = Weld( mesh.normal, mesh.face_normal, normal_epsilon )
+    uv,     face_uv     = Weld( mesh.uv,     mesh.face_uv,     uv_epsilon )
+
+    mesh.setGeometry( vertex      = vertex,
+                      normal      = normal,
+                      uv          = uv,
+                      face_vertex = face_vertex,
+                      face_normal = face_normal,
+                      face_uv     = face_uv )
+
+    return before, ( len(vertex), len(normal), len(uv) )
+
+
+#/ =======================================================================================
+def _Spread( x ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Spread the low 21 bits of x so that two zero bits follow each one.
+    """
+    #/ -----------------------------------------------------------------------------------
+    x = x.astype( np.uint64 ) & np.uint64( 0x1fffff )
+    for shift, mask in ( ( 32, 0x1f00000000ffff ),   ( 16, 0x1f0000ff0000ff ),
+                         (  8, 0x100f00f00f00f00f ), (  4, 0x10c30c30c30c30c3 ),
+                         (  2, 0x1249249249249249 ) ):
+        x = ( x | ( x << np.uint64( shift ) ) ) & np.uint64( mask )
+    return x
+
+
+#/ =======================================================================================
+def MortonOrder( points ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Return the permutation that sorts points (n, 3) along a 63 bit Morton (Z order)
+    curve through their bounding box.
+    """
+    #/ -----------------------------------------------------------------------------------
+    lo   = points.min( axis=0 )
+    span = np.maximum( points.max( axis=0 ) - lo, 1.0e-30 )
+    q    = ( ( points - lo ) / span * 2097151.0 ).astype( np.uint64 )
+
+    code = _Spread( q[:,0] ) | ( _Spread( q[:,1] ) << np.uint64(1) ) | \
+           ( _Spread( q[:,2] ) << np.uint64(2) )
+
+    return np.argsort( code, kind='stable' )
+
+
+#/ =======================================================================================
+def FirstUse( values, index ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Renumber the rows of values in the order index first uses them; rows that are
+    never used follow in their old order. Return ( values, index ).
+    """
+    #/ -----------------------------------------------------------------------------------
+    values = np.asarray( values )
+    index  = np.asarray( index )
+    n      = len(values)
+    if ( 0 == n or 0 == index.size ):
+        return values, index
+
+    used, first = np.unique( index.ravel(), return_index=True )
+    used = used[ np.argsort( first, kind='stable' ) ]
+
+    unused = np.ones( n, dtype=bool )
+    unused[used] = False
+
+    perm = np.concatenate( ( used, np.flatnonzero( unused ) ) )
+    new  = np.empty( n, dtype=np.int64 )
+    new[perm] = np.arange( n )
+
+    return values[perm], new[index].astype( index.dtype )
+
+
+#/ =======================================================================================
+def ReorderMesh( mesh ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Sort the triangles of a Mesh by the Morton code of their centroids, so faces
+    that are close in space are close in face_indices, then renumber vertices,
+    normals and UVs by first use. All face columns move together. Return the number
+    of faces.
+    """
+    #/ -----------------------------------------------------------------------------------
+    face_vertex = np.asarray( mesh.face_vertex )
+    if ( 2 > len(face_vertex) or 0 == len(mesh.vertex) ):
+        return len(face_vertex)
+
+    vertex = np.asarray( mesh.vertex )
+    order  = MortonOrder( vertex[ face_vertex ].mean( axis=1 ) )
+
+    face_vertex   = face_vertex[order]
+    face_normal   = np.asarray( mesh.face_normal )
+    face_uv       = np.asarray( mesh.face_uv )
+    face_material = np.asarray( mesh.face_material )
+    if ( len(face_normal) == len(order) ):
+        face_normal = face_normal[order]
+    if ( len(face_uv) == len(order) ):
+        face_uv = face_uv[order]
+    if ( len(face_material) == len(order) ):
+        face_material = face_material[order]
+
+    vertex, face_vertex = FirstUse( vertex,      face_vertex )
+    normal, face_normal = FirstUse( mesh.normal, face_normal )
+    uv,     face_uv     = FirstUse( mesh.uv,     face_uv )
+
+    mesh.setGeometry( vertex        = vertex,
+                      normal        = normal,
+                      uv            = uv,
+                      face_vertex   = face_vertex,
+                      face_normal   = face_normal,
+                      face_uv       = face_uv,
+                      face_material = face_material )
+
+    return len(face_vertex)
+
+
+#/ =======================================================================================
+#/ **                             M E S H 2 _ O P T I M I Z E                           **
+#/ ======================================================================== END FILE =====
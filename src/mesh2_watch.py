@@ -0,0 +1,296 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                M E S H 2 _ W A T C H                              **
+#/ =======================================================================================
+#/ **                                                                                   **
+#/ **  Copyright (c) 2021, Stephen W. Soliday                                           **
+#/ **                      stephen.soliday@trncmp.org                                   **
+#/ **                      http://research.trncmp.org                                   **
+#/ **                                                                                   **
+#/ **  -------------------------------------------------------------------------------  **
+#/ **                                                                                   **
+#/ **  This program is free software: you can redistribute it and/or modify it under    **
+#/ **  the terms of the GNU General Public License as published by the Free Software    **
+#/ **  Foundation, either version 3 of the License, or (at your option)                 **
+#/ **  any later version.                                                               **
+#/ **                                                                                   **
+#/ **  This program is distributed in the hope that it will be useful, but WITHOUT      **
+#/ **  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS    **
+#/ **  FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.   **
+#/ **                                                                                   **
+#/ **  You should have received a copy of the GNU General Public License along with     **
+#/ **  this program. If not, see <http://www.gnu.org/licenses/>.                        **
+#/ **                                                                                   **
+#/ ----- Modification History ------------------------------------------------------------
+#/
+#/ @brief   Watch directory trees and convert OBJ files again when they change.
+#/
+#/ @details The trees are polled for the mtime and size of every OBJ file and of the
+#/          MTL files it names. A file is converted once its inputs have stayed the
+#/          same for the debounce time, so an export that is still being written is
+#/          converted once, when it is done. The process stays up between changes,
+#/          so the parsed MTL files, the conversion cache and the loaded modules are
+#/          warm for the next conversion.
+#/
+#/ @author  Stephen W. Soliday
+#/ @date    2021-Feb-07
+#/
+#/ =======================================================================================
+
+import sys, os, time, getopt
+
+try:
+    from . import TLogger, convert_obj_to_mesh2, mesh2_cache, mesh2_batch, mesh2_library
+except ImportError:
+    import TLogger, convert_obj_to_mesh2, mesh2_cache, mesh2_batch, mesh2_library
+logger = TLogger.getInstance()
+
+INTERVAL = 0.5   #/ seconds between polls
+DEBOUNCE = 1.0   #/ seconds the inputs must stay the same before converting
+
+
+#/ =======================================================================================
+def Stamp( filename ):
+    #/ -----------------------------------------------------------------------------------
+    """ ( mtime_ns, size ) of a file, or None if it does not exist. """
+    #/ -----------------------------------------------------------------------------------
+    try:
+        st = os.stat( filename )
+    except OSError:
+        return None
+    return ( st.st_mtime_ns, st.st_size )
+
+
+#/ =======================================================================================
+class Watcher:
+    #/ -----------------------------------------------------------------------------------
+    """
+    Convert the OBJ files under roots whenever they or their MTL files change.
+    options are the keywords of mesh2_batch.ConvertOptions. The state kept between
+    polls and conversions:
+      stamps    - per OBJ, the stamps of its inputs at the last conversion
+      pending   - per OBJ, the changed stamps and the time they were first seen
+      mtllibs   - per OBJ, the MTL paths it names, scanned again only if it changes
+      libraries - the parsed MTL files (mesh2_cache.MaterialCache)
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, roots, out_dir=None, options={}, jobs=1, debounce=DEBOUNCE ):
+        #/ -------------------------------------------------------------------------------
+        self.roots     = roots
+        self.out_dir   = out_dir
+        self.jobs      = jobs
+        self.debounce  = debounce
+
+        self.options   = dict( options )
+        self.cache     = None
+        if ( None != self.options.get( 'cache_dir' ) ):
+            self.cache = mesh2_cache.ConversionCache( self.options['cache_dir'],
+                                                      self.options['cache_size'] )
+        self.options.pop( 'cache_dir',  None )
+        self.options.pop( 'cache_size', None )
+
+        self.library   = None
+        if ( None != self.options.get( 'textures' ) ):
+            self.library = mesh2_library.TextureLibrary( self.options['textures'] )
+        self.options.pop( 'textures', None )
+
+        self.stamps    = {}
+        self.pending   = {}
+        self.mtllibs   = {}
+        self.libraries = mesh2_cache.MaterialCache()
+
+        self.converted = 0
+        self.failed    = 0
+
+    #/ ===================================================================================
+    def inputs( self, job ):
+        #/ -------------------------------------------------------------------------------
+        """ Stamps of the OBJ file of a BatchJob and of the MTL files it names. """
+        #/ -------------------------------------------------------------------------------
+        obj_stamp = Stamp( job.obj_filename )
+        known     = self.mtllibs.get( job.obj_filename )
+        if (( None == known ) or ( obj_stamp != known[0] )):
+            try:
+                known = ( obj_stamp, mesh2_batch.MtlLibs( job.obj_filename ) )
+            except OSError:
+                known = ( obj_stamp, [] )
+            self.mtllibs[ job.obj_filename ] = known
+
+        return ( obj_stamp, ) + tuple( Stamp( filename ) for filename in known[1] )
+
+    #/ ===================================================================================
+    def prime( self, force=False ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Take the current state of the trees as converted, except for the OBJ files
+        whose include is out of date (all of them with force); those are converted
+        on the first poll.
+        """
+        #/ -------------------------------------------------------------------------------
+        jobs = mesh2_batch.FindJobs( self.roots, self.out_dir )
+        for job in jobs:
+            stamps = self.inputs( job )
+            if (( not force ) and job.upToDate() ):
+                self.stamps[ job.obj_filename ] = stamps
+            else:
+                self.pending[ job.obj_filename ] = ( job, stamps, -self.debounce )
+
+        logger.info( '    Watching:     %d OBJ files, %d to convert', len(jobs),
+                     len(self.pending) )
+
+    #/ ===================================================================================
+    def poll( self ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Scan the trees once and convert the OBJ files whose inputs changed and then
+        stayed the same for the debounce time. Return the number converted.
+        """
+        #/ -------------------------------------------------------------------------------
+        now  = time.monotonic()
+        seen = set()
+
+        for job in mesh2_batch.FindJobs( self.roots, self.out_dir ):
+            seen.add( job.obj_filename )
+            stamps = self.inputs( job )
+            if ( stamps == self.stamps.get( job.obj_filename ) ):
+                self.pending.pop( job.obj_filename, None )
+                continue
+
+            waiting = self.pending.get( job.obj_filename )
+            if (( None == waiting ) or ( stamps != waiting[1] )):
+                self.pending[ job.obj_filename ] = ( job, stamps, now )
+
+        for obj_filename in list( self.stamps ):
+            if ( obj_filename not in seen ):
+                del self.stamps[ obj_filename ]
+                self.mtllibs.pop( obj_filename, None )
+        for obj_filename in list( self.pending ):
+            if ( obj_filename not in seen ):
+                del self.pending[ obj_filename ]
+
+        ready = [ entry for entry in self.pending.values()
+                  if ( self.debounce <= now - entry[2] ) ]
+        ready.sort( key=lambda entry: -entry[0].size )
+
+        for job, stamps, since in ready:
+            del self.pending[ job.obj_filename ]
+            self.convert( job )
+            self.stamps[ job.obj_filename ] = stamps
+
+        return len(ready)
+
+    #/ ===================================================================================
+    def convert( self, job ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Convert one BatchJob in this process. A failure is logged; the file is tried
+        again once it changes.
+        """
+        #/ -------------------------------------------------------------------------------
+        start = time.perf_counter()
+        try:
+            inc_root = os.path.dirname( job.inc_filename )
+            if ( inc_root ):
+                os.makedirs( inc_root, exist_ok=True )
+            convert_obj_to_mesh2.ConvertObj2Mesh2( job.obj_filename, job.inc_filename,
+                                                   jobs      = self.jobs,
+                                                   cache     = self.cache,
+                                                   libraries = self.libraries,
+                                                   library   = self.library,
+                                                   **self.options )
+        except Exception as e:
+            self.failed += 1
+            logger.error( '    Failed:       %s  %s: %s', job.obj_filename,
+                          type(e).__name__, e )
+            return False
+
+        self.converted += 1
+        logger.info( '    Converted:    %s  %.3f s', job.inc_filename,
+                     time.perf_counter() - start )
+        return True
+
+    #/ ===================================================================================
+    def run( self, interval=INTERVAL, force=False ):
+        #/ -------------------------------------------------------------------------------
+        """ Poll every interval seconds until interrupted. """
+        #/ -------------------------------------------------------------------------------
+        self.prime( force )
+        try:
+            while ( True ):
+                self.poll()
+                time.sleep( interval )
+        except KeyboardInterrupt:
+            pass
+
+        logger.info( '    Watch:        %d converted, %d failed', self.converted, self.failed )
+        self.libraries.report()
+
+
+#/ =======================================================================================
+def Usage( pn, msg=None ):
+    #/ -----------------------------------------------------------------------------------
+    if ( None != msg ):
+        sys.stderr.write( '\n%s\n' % (msg,) )
+
+    sys.stderr.write("""
+OBJ 2 Mesh2 watch * ver 1 * 2021.02
+
+USAGE: %s [options] dir|file.obj ...
+   Converts the OBJ files under the directories into Mesh2 includes whenever they
+   or their MTL files change, until interrupted.
+
+   -o, --output DIR     write the includes under DIR, mirroring the input trees
+   -f, --force          convert every file at start, even if its include is newer
+   -i, --interval SEC   seconds between polls (default %g)
+   -d, --debounce SEC   seconds a file must stay the same before it is converted
+                        (default %g)
+   -j, --jobs N         format the mesh2 objects of a file in N worker processes
+%s
+Example: %s -d 2 assets/
+
+""" % (pn, INTERVAL, DEBOUNCE, mesh2_batch.CONVERT_USAGE, pn,) )
+    return 1
+
+
+#/ =======================================================================================
+def main( argc, argv ):
+    #/ -----------------------------------------------------------------------------------
+    try:
+        opts, args = getopt.getopt( argv[1:], 'o:fi:d:j:' + mesh2_batch.CONVERT_SHORT,
+                                    [ 'output=', 'force', 'interval=', 'debounce=',
+                                      'jobs=' ] + mesh2_batch.CONVERT_LONG )
+        options    = mesh2_batch.ConvertOptions( opts )
+    except getopt.GetoptError as e:
+        return Usage( argv[0], str(e) )
+
+    if ( 0 == len(args) ):
+        return Usage( argv[0] )
+
+    out_dir  = None
+    force    = False
+    interval = INTERVAL
+    debounce = DEBOUNCE
+    jobs     = 1
+
+    for key, val in opts:
+        if ( key in ( '-o', '--output' ) ):
+            out_dir = val
+        elif ( key in ( '-f', '--force' ) ):
+            force = True
+        elif ( key in ( '-i', '--interval' ) ):
+            interval = float( val )
+        elif ( key in ( '-d', '--debounce' ) ):
+            debounce = float( val )
+        elif ( key in ( '-j', '--jobs' ) ):
+            jobs = int( val )
+
+    watcher = Watcher( args, out_dir, options, jobs, debounce )
+    watcher.run( interval, force )
+
+    return 0
+
+
+#/ =======================================================================================
+if ( '__main__' == __name__ ): sys.exit( main( len( sys.argv ), sys.argv ) )
+#/ =======================================================================================
+#/ **                                M E S H 2 _ W A T C H                              **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,341 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                  O B J _ I N D E X                                **
+#/ =======================================================================================
+#/ **                                                                                   **
+#/ **  Copyright (c) 2021, Stephen W. Soliday                                           **
+#/ **                      stephen.soliday@trncmp.org                                   **
+#/ **                      http://research.trncmp.org                                   **
+#/ **                                                                                   **
+#/ **  -------------------------------------------------------------------------------  **
+#/ **                                                                                   **
+#/ **  This program is free software: you can redistribute it and/or modify it under    **
+#/ **  the terms of the GNU General Public License as published by the Free Software    **
+#/ **  Foundation, either version 3 of the License, or (at your option)                 **
+#/ **  any later version.                                                               **
+#/ **                                                                                   **
+#/ **  This program is distributed in the hope that it will be useful, but WITHOUT      **
+#/ **  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS    **
+#/ **  FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.   **
+#/ **                                                                                   **
+#/ **  You should have received a copy of the GNU General Public License along with     **
+#/ **  this program. If not, see <http://www.gnu.org/licenses/>.                        **
+#/ **                                                                                   **
+#/ ----- Modification History ------------------------------------------------------------
+#/
+#/ @brief   Memory mapped Wavefront OBJ reader.
+#/
+#/ @details The OBJ file is mapped into memory and scanned once, block by block, as
+#/          raw bytes. The scan classifies every line on its leading bytes and records
+#/          the byte range of each 'o' record together with the number of v, vt, vn
+#/          and f records it holds and the global counts that precede it. With that
+#/          index any object can be parsed on its own, in any order, straight from
+#/          the mapped buffer.
+#/
+#/ @author  Stephen W. Soliday
+#/ @date    2021-Feb-07
+#/
+#/ =======================================================================================
+
+import os, mmap, warnings
+import numpy as np
+
+READ_BLOCK = 64 * 1024 * 1024   #/ bytes of OBJ text classified at a time
+
+KIND_OTHER  = 0
+KIND_V      = 1    #/ 'v '
+KIND_VT     = 2    #/ 'vt'
+KIND_VN     = 3    #/ 'vn'
+KIND_F      = 4    #/ 'f '
+KIND_O      = 5    #/ 'o '
+KIND_USEMTL = 6    #/ 'usemtl'
+KIND_MTLLIB = 7    #/ 'mtllib'
+KIND_S      = 8    #/ 's '
+KIND_G      = 9    #/ 'g '
+KIND_L      = 10   #/ 'l '
+KIND_P      = 11   #/ 'p '
+NKIND       = 12
+
+CONTROL = ( KIND_O, KIND_USEMTL, KIND_MTLLIB, KIND_S )
+
+
+#/ =======================================================================================
+def _ws( b ):
+    #/ -----------------------------------------------------------------------------------
+    return ( 32 == b ) | ( 9 == b )
+
+
+#/ =======================================================================================
+def _keyword( buf, starts, ends, lines, word ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Subset of lines whose record key is the whole of word (bytes).
+    """
+    #/ -----------------------------------------------------------------------------------
+    n = len(buf)
+    for k in range( len(word) + 1 ):
+        pos = starts[lines] + k
+        b   = buf[ np.minimum( pos, n - 1 ) ]
+        if ( k < len(word) ):
+            hit = ( word[k] == b ) & ( pos < ends[lines] )
+        else:
+            hit = _ws( b ) | ( 13 == b ) | ( pos >= ends[lines] )
+        lines = lines[hit]
+    return lines
+
+
+#/ =======================================================================================
+def LineTable( buf ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Split a uint8 buffer into lines. Return ( starts, ends, kind ): the offset of the
+    record key (the first byte past any leading spaces and tabs) and of the
+    terminating newline of every line, and its KIND_ code.
+    """
+    #/ -----------------------------------------------------------------------------------
+    n = len(buf)
+    if ( 0 == n ):
+        empty = np.zeros( 0, dtype=np.int64 )
+        return empty, empty, np.zeros( 0, dtype=np.int8 )
+
+    nl     = np.flatnonzero( 10 == buf )
+    starts = np.concatenate( ( [0], nl + 1 ) )
+    ends   = np.append( nl, n )
+    if ( starts[-1] == n ):
+        starts = starts[:-1]
+        ends   = ends[:-1]
+
+    #/ ----- skip the blanks in front of the record key ----------------------------------
+
+    lead = np.flatnonzero( _ws( buf[starts] ) )
+    while ( 0 < len(lead) ):
+        starts[lead] += 1
+        lead = lead[ ( starts[lead] < ends[lead] ) &
+                     _ws( buf[ np.minimum( starts[lead], n - 1 ) ] ) ]
+
+    b0 = buf[np.minimum( starts, n - 1 )]
+    b0[ starts >= ends ] = 10
+    b1 = buf[np.minimum( starts + 1, n - 1 )]
+    b1[ starts + 1 >= ends ] = 10
+
+    ws   = _ws( b1 )
+    kind = np.zeros( len(starts), dtype=np.int8 )
+
+    kind[ ( 118 == b0 ) & ws          ] = KIND_V
+    kind[ ( 118 == b0 ) & ( 116 == b1 ) ] = KIND_VT
+    kind[ ( 118 == b0 ) & ( 110 == b1 ) ] = KIND_VN
+    kind[ ( 102 == b0 ) & ws          ] = KIND_F
+    kind[ ( 111 == b0 ) & ws          ] = KIND_O
+    kind[ _keyword( buf, starts, ends, np.flatnonzero( 117 == b0 ), b'usemtl' ) ] = KIND_USEMTL
+    kind[ _keyword( buf, starts, ends, np.flatnonzero( 109 == b0 ), b'mtllib' ) ] = KIND_MTLLIB
+    kind[ ( 115 == b0 ) & ws          ] = KIND_S
+    kind[ ( 103 == b0 ) & ws          ] = KIND_G
+    kind[ ( 108 == b0 ) & ws          ] = KIND_L
+    kind[ ( 112 == b0 ) & ws          ] = KIND_P
+
+    return starts, ends, kind
+
+
+#/ =======================================================================================
+def ParseNumbers( data, starts, ends, lines, skip, width, dtype, slashes=False ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Convert the payload of the selected lines into a (count, width) array in one
+    numpy call. The first skip bytes of each line (the record key) are ignored and
+    with slashes=True every '/' counts as a separator. Return None when the lines do
+    not hold exactly width numbers each; the caller falls back to a per line parse.
+    """
+    #/ -----------------------------------------------------------------------------------
+    count = len(lines)
+    if ( 0 == count ):
+        return np.zeros( (0, width), dtype=dtype )
+
+    s = starts[lines]
+    e = ends[lines]
+
+    #/ ----- copy each run of consecutive records in one slice, blank the keys -----------
+
+    first = np.concatenate( ( [0], np.flatnonzero( 1 != np.diff( lines ) ) + 1 ) )
+    last  = np.append( first[1:], count ) - 1
+
+    run_lo = s[first]
+    run_hi = e[last]
+    text = bytearray( b'\n'.join( [ data[lo:hi] for lo, hi in zip( run_lo.tolist(),
+                                                                    run_hi.tolist() ) ] ) )
+    text = np.frombuffer( text, dtype=np.uint8 )
+
+    run_base = np.concatenate( ( [0], np.cumsum( run_hi - run_lo + 1 )[:-1] ) )
+    key_pos  = s + np.repeat( run_base - run_lo, last - first + 1 )
+    for k in range(skip):
+        text[ key_pos + k ] = 32
+
+    if ( slashes ):
+        text[ 47 == text ] = 32   #/ '/' -> ' '
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter( 'ignore' )
+            values = np.fromstring( text.tobytes(), dtype=dtype, sep=' ' )
+    except ValueError:
+        return None
+
+    if ( count * width == len(values) ):
+        return values.reshape( count, width )
+
+    return None
+
+
+#/ =======================================================================================
+class ObjRange:
+    #/ -----------------------------------------------------------------------------------
+    """
+    One entry of the ObjIndex: the bytes [start, end) of the file that belong to an
+    object. count[KIND_x] is the number of records of each kind in the range and
+    base[KIND_x] the number of the same records that precede it in the file, so
+    base[KIND_V] is the global offset of the first vertex of the object. line is the
+    line number of the first line of the range and material the material index
+    carried into the object by the last usemtl record before it.
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, name, start, line, base, material ):
+        #/ -------------------------------------------------------------------------------
+        self.name     = name
+        self.start    = start
+        self.end      = start
+        self.line     = line
+        self.base     = list( base )
+        self.count    = NKIND * [0]
+        self.material = material
+
+
+#/ =======================================================================================
+class ObjIndex:
+    #/ -----------------------------------------------------------------------------------
+    """
+    Memory mapped Wavefront OBJ file with an index of its objects. The records in
+    front of the first object (mtllib) make up the preamble. Ranges are read with
+    view() and split into blocks of whole lines with blocks().
+    """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self, obj_filename ):
+        #/ -------------------------------------------------------------------------------
+        self.filename = obj_filename
+        self.fp       = open( obj_filename, 'rb' )
+        self.size     = os.fstat( self.fp.fileno() ).st_size
+
+        if ( 0 < self.size ):
+            self.data = mmap.mmap( self.fp.fileno(), 0, access=mmap.ACCESS_READ )
+        else:
+            self.data = b''
+
+        self.objects  = []
+        self.preamble = ObjRange( None, 0, 1, NKIND * [0], -1 )
+        self.total    = NKIND * [0]
+
+        self._scan()
+
+    #/ ===================================================================================
+    def close( self ):
+        #/ -------------------------------------------------------------------------------
+        if ( isinstance( self.data, mmap.mmap ) ):
+            try:
+                self.data.close()
+            except BufferError:
+                pass   #/ a view is still alive, the map goes with it
+        self.data = b''
+        self.fp.close()
+
+    #/ ===================================================================================
+    def view( self, lo, hi ):
+        #/ -------------------------------------------------------------------------------
+        return memoryview( self.data )[lo:hi]
+
+    #/ ===================================================================================
+    def blocks( self, lo, hi ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Yield ( lo, hi ) sub ranges of about READ_BLOCK bytes that end on a line
+        boundary. A single line longer than READ_BLOCK stays in one piece.
+        """
+        #/ -------------------------------------------------------------------------------
+        while ( lo < hi ):
+            cut = min( lo + READ_BLOCK, hi )
+            if ( cut < hi ):
+                nl = self.data.rfind( b'\n', lo, cut )
+                if ( 0 > nl ):
+                    nl = self.data.find( b'\n', cut, hi )
+                cut = hi if ( 0 > nl ) else nl + 1
+            yield lo, cut
+            lo = cut
+
+    #/ ===================================================================================
+    def lineNumber( self, offset ):
+        #/ -------------------------------------------------------------------------------
+        buf = np.frombuffer( self.data, dtype=np.uint8, count=offset )
+        return int( np.count_nonzero( 10 == buf ) ) + 1
+
+    #/ ===================================================================================
+    def _scan( self ):
+        #/ -------------------------------------------------------------------------------
+        """
+        Index the file block by block. Memory per block is a few arrays of one entry
+        per line: the records are counted per kind with np.bincount between the o
+        records, and the usemtl number in force is carried with np.maximum.accumulate
+        over the o and usemtl records.
+        """
+        #/ -------------------------------------------------------------------------------
+        total    = NKIND * [0]
+        line     = 1
+        material = -1   #/ material carried into the next object
+        usemtl   = 0    #/ usemtl records of the current object so far
+        current  = self.preamble
+
+        def add( entry, kind ):
+            count = np.bincount( kind, minlength=NKIND ).tolist()
+            for k in range(NKIND):
+                entry.count[k] += count[k]
+                total[k]       += count[k]
+
+        for lo, hi in self.blocks( 0, self.size ):
+            buf = np.frombuffer( self.data, dtype=np.uint8, count=hi-lo, offset=lo )
+            starts, ends, kind = LineTable( buf )
+
+            #/ ----- material in force at every o record ---------------------------------
+            #/ Mesh.addMaterial numbers the usemtl records of an object from 0
+
+            ctrl  = np.flatnonzero( ( KIND_O == kind ) | ( KIND_USEMTL == kind ) )
+            is_o  = ( KIND_O == kind[ctrl] )
+            n_use = np.cumsum( ~is_o )
+            o_use = np.maximum.accumulate( np.where( is_o, n_use, -usemtl ) )
+            last  = np.maximum.accumulate( np.where( is_o, -1, np.arange( len(ctrl) ) ) )
+            order = n_use - 1 - o_use
+            carry = np.where( 0 > last, material, order[ np.maximum( last, 0 ) ] )
+
+            if ( 0 < len(ctrl) ):
+                usemtl = int( n_use[-1] - o_use[-1] )
+                if ( 0 <= last[-1] ):
+                    material = int( order[ last[-1] ] )
+
+            #/ ----- one range per o record ----------------------------------------------
+
+            done = 0
+            for i, m in zip( ctrl[is_o].tolist(), carry[is_o].tolist() ):
+                add( current, kind[done:i] )
+                current.end = lo + int( starts[i] )
+                done = i
+
+                name    = bytes( buf[starts[i]:ends[i]] ).decode( 'utf-8', 'replace' ).split()
+                current = ObjRange( name[1].strip(), lo + int( starts[i] ),
+                                    line + i, total, int(m) )
+                self.objects.append( current )
+
+            add( current, kind[done:] )
+
+            line += len(kind)
+
+        current.end = self.size
+        self.total  = total
+
+
+#/ =======================================================================================
+#/ **                                  O B J _ I N D E X                                **
+#/ ======================================================================== END FILE =====
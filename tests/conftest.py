@@ -0,0 +1,58 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                  C O N F T E S T                                  **
+#/ =======================================================================================
+#/
+#/ @brief   Shared setup of the regression tests.
+#/
+#/ @details The modules under src are imported the way the command line tools import
+#/          them, as top level modules. The gold files in tests/gold were written by
+#/          the baseline converter (comments on, default options) and are compared
+#/          without the lines that carry the date.
+#/
+#/ =======================================================================================
+
+import os, re, sys
+
+import pytest
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+sys.path.insert( 0, os.path.join( ROOT, 'src' ) )
+
+DATA = os.path.join( ROOT, 'tests', 'data' )
+GOLD = os.path.join( ROOT, 'tests', 'gold' )
+
+VOLATILE = re.compile( r'^// (Date|Copyright)' )
+COMMENT  = re.compile( r' // \d+$' )
+
+
+#/ =======================================================================================
+def IncLines( filename, comments=True ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Lines of an include file without the date lines; without comments the
+    '// index' comments of the vectors are dropped as well.
+    """
+    #/ -----------------------------------------------------------------------------------
+    with open( filename, 'r' ) as fp:
+        lines = [ line.rstrip( '\n' ) for line in fp if ( not VOLATILE.match( line ) ) ]
+    if ( not comments ):
+        lines = [ COMMENT.sub( '', line ) for line in lines ]
+    return lines
+
+
+#/ =======================================================================================
+@pytest.fixture( autouse=True )
+def quiet_logger():
+    #/ -----------------------------------------------------------------------------------
+    import TLogger
+    logger = TLogger.getInstance()
+    level  = logger.console_level
+    logger.setConsoleLevel( TLogger.WARNING )
+    logger.resetMetrics()
+    yield logger
+    logger.console_level = level
+
+
+#/ =======================================================================================
+#/ **                                  C O N F T E S T                                  **
+#/ =========================================================================== END FILE ==
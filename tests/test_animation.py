@@ -0,0 +1,139 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                 A N I M A T I O N                                 **
+#/ =======================================================================================
+#/
+#/ @brief   Frames that share their topology through a common file (AnimationWriter).
+#/
+#/ @details A shared frame is checked by putting its arrays back into the #for loops of
+#/          the common file: the mesh2 objects must then read as the ones a full
+#/          include of the same frame declares.
+#/
+#/ =======================================================================================
+
+import io, os, re
+
+import numpy as np
+
+import conftest
+import convert_obj_to_mesh2
+
+SCENE = os.path.join( conftest.DATA, 'scene.obj' )
+
+ARRAY = re.compile( r'#declare (\w+) = array\[\d+\] \{\n(.*?)\n\}\n', re.S )
+LOOP  = re.compile( r'    #for \( I, 0, \d+ \)\n      (\w+)\[I\],\n    #end\n' )
+MESH2 = re.compile( r'#declare \w+ = mesh2 \{.*?\} // end mesh2 \w+\n', re.S )
+
+
+#/ =======================================================================================
+def Frame( move=0.0 ):
+    #/ -----------------------------------------------------------------------------------
+    """ The scene fixture as a collection, the tetrahedron moved by move. """
+    #/ -----------------------------------------------------------------------------------
+    collection         = convert_obj_to_mesh2.MeshCollection()
+    collection.objects = convert_obj_to_mesh2.ParseObjFile( SCENE, collection.materials )
+    tetra              = collection.objects[1]
+    tetra.setGeometry( vertex=tetra.vertex + move )
+    return collection
+
+
+#/ =======================================================================================
+def Read( filename ):
+    #/ -----------------------------------------------------------------------------------
+    with open( filename, 'r' ) as fp:
+        return fp.read()
+
+
+#/ =======================================================================================
+def Resolved( frame_filename, common_filename ):
+    #/ -----------------------------------------------------------------------------------
+    """ The mesh2 objects of the common file with the arrays of the frame filled in. """
+    #/ -----------------------------------------------------------------------------------
+    arrays = { name : ''.join( '%s,\n' % ( row.rstrip( ',' ), )
+                               for row in rows.split( '\n' ) )
+               for name, rows in ARRAY.findall( Read( frame_filename ) ) }
+    common = LOOP.sub( lambda m: arrays[ m.group(1) ], Read( common_filename ) )
+    return MESH2.findall( common )
+
+
+#/ =======================================================================================
+def Full( tmp_path, collection ):
+    #/ -----------------------------------------------------------------------------------
+    inc_filename = str( tmp_path / 'full.inc' )
+    convert_obj_to_mesh2.WriteMesh2File( inc_filename, collection.objects,
+                                         collection.materials )
+    return MESH2.findall( Read( inc_filename ) )
+
+
+#/ =======================================================================================
+def test_shared_frames_read_as_full_frames( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    writer = convert_obj_to_mesh2.AnimationWriter( str( tmp_path / 'scene.inc' ) )
+    frames = [ Frame( move ) for move in ( 0.0, 0.5, 1.25 ) ]
+
+    for k, collection in enumerate( frames ):
+        frame_filename = str( tmp_path / ( 'scene_%04d.inc' % ( k, ) ) )
+        writer( frame_filename, collection )
+
+        text = Read( frame_filename )
+        assert [] == MESH2.findall( text )
+        assert '#include "scene-common.inc"' in text
+        assert Resolved( frame_filename, writer.common_filename ) == \
+               Full( tmp_path, collection )
+
+    assert ( writer.shared, writer.full ) == ( 3, 0 )
+    assert '#declare scene = union {' in Read( writer.common_filename )
+
+
+#/ =======================================================================================
+def test_normals_are_kept_in_the_order_of_the_first_frame( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    writer = convert_obj_to_mesh2.AnimationWriter( str( tmp_path / 'scene.inc' ) )
+    writer( str( tmp_path / 'scene_0000.inc' ), Frame() )
+
+    #/ ----- same corners, the normal rows of the tetrahedron numbered backwards -------
+    collection = Frame()
+    tetra      = collection.objects[1]
+    tetra.setGeometry( normal      = tetra.normal[::-1],
+                       face_normal = len(tetra.normal) - 1 - tetra.face_normal )
+    writer( str( tmp_path / 'scene_0001.inc' ), collection )
+
+    assert ( writer.shared, writer.full ) == ( 2, 0 )
+    assert conftest.IncLines( str( tmp_path / 'scene_0001.inc' ) ) == \
+           conftest.IncLines( str( tmp_path / 'scene_0000.inc' ) )
+
+
+#/ =======================================================================================
+def test_a_new_topology_writes_a_full_frame( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    writer = convert_obj_to_mesh2.AnimationWriter( str( tmp_path / 'scene.inc' ) )
+    writer( str( tmp_path / 'scene_0000.inc' ), Frame() )
+
+    collection = Frame()
+    tetra      = collection.objects[1]
+    tetra.setGeometry( face_vertex=tetra.face_vertex[:, ::-1] )
+    writer( str( tmp_path / 'scene_0001.inc' ), collection )
+
+    assert ( writer.shared, writer.full ) == ( 1, 1 )
+    text = Read( str( tmp_path / 'scene_0001.inc' ) )
+    assert 'scene-common.inc' not in text
+    assert MESH2.findall( text ) == Full( tmp_path, collection )
+    assert '#declare scene = union {' in text
+
+
+#/ =======================================================================================
+def test_array_has_no_comma_after_the_last_row( monkeypatch ):
+    #/ -----------------------------------------------------------------------------------
+    monkeypatch.setattr( convert_obj_to_mesh2, 'WRITE_BLOCK', 4 )
+    rows = np.arange( 30, dtype=np.float64 ).reshape( 10, 3 ) / 4.0
+
+    for count in ( 4, 10 ):
+        fp = io.StringIO()
+        convert_obj_to_mesh2.WriteArray( fp, 'A', '<%g,%g,%g>', rows[:count] )
+
+        assert fp.getvalue() == '#declare A = array[%d] {\n%s\n}\n\n' % (
+            count, ',\n'.join( '    <%g,%g,%g>' % tuple( row ) for row in rows[:count] ), )
+
+
+#/ =======================================================================================
+#/ **                                 A N I M A T I O N                                 **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,131 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                     B A T C H                                     **
+#/ =======================================================================================
+#/
+#/ @brief   Directory conversion with up-to-date checks and worker processes
+#/          (mesh2_batch).
+#/
+#/ =======================================================================================
+
+import os, json, shutil
+
+import pytest
+
+import conftest
+import mesh2_batch
+
+TREE = { 'cube'  : 'a',
+         'scene' : 'b',
+         'messy' : '' }
+
+
+#/ =======================================================================================
+@pytest.fixture
+def assets( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    """ The hand written OBJ files (and their MTL) in a small directory tree. """
+    #/ -----------------------------------------------------------------------------------
+    root = tmp_path / 'assets'
+    for name, sub in TREE.items():
+        path = root / sub
+        path.mkdir( parents=True, exist_ok=True )
+        for ext in ( 'obj', 'mtl' ):
+            shutil.copy( os.path.join( conftest.DATA, '%s.%s' % ( name, ext, ) ), str( path ) )
+    return str( root )
+
+
+#/ =======================================================================================
+def Batch( *args ):
+    #/ -----------------------------------------------------------------------------------
+    argv = [ 'mesh2_batch' ] + list( args )
+    return mesh2_batch.main( len(argv), argv )
+
+
+#/ =======================================================================================
+def Target( out_dir, name ):
+    #/ -----------------------------------------------------------------------------------
+    return os.path.join( out_dir, TREE[name], '%s.inc' % ( name, ) )
+
+
+#/ =======================================================================================
+def test_jobs_mirror_the_tree_largest_first( assets, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    out  = str( tmp_path / 'out' )
+    jobs = mesh2_batch.FindJobs( [ assets ], out )
+
+    assert sorted( job.inc_filename for job in jobs ) == \
+           sorted( Target( out, name ) for name in TREE )
+    assert [ job.size for job in jobs ] == sorted( ( job.size for job in jobs ), reverse=True )
+    assert mesh2_batch.FindJobs( [ os.path.join( assets, 'a', 'cube.obj' ) ] )[0].inc_filename \
+           == os.path.join( assets, 'a', 'cube.inc' )
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'workers', [ '1', '2' ] )
+def test_batch_matches_gold( workers, assets, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    out     = str( tmp_path / 'out' )
+    metrics = str( tmp_path / 'batch.json' )
+
+    assert 0 == Batch( '-j', workers, '-c', '-o', out, '-m', metrics, assets )
+
+    for name in TREE:
+        assert conftest.IncLines( Target( out, name ) ) == \
+               conftest.IncLines( os.path.join( conftest.GOLD, '%s.inc' % ( name, ) ) )
+    with open( metrics ) as fp:
+        total = json.load( fp )['total']
+    assert ( total['converted'], total['up_to_date'], total['faces'] ) == ( 3, 0, 24 )
+
+
+#/ =======================================================================================
+def test_only_changed_files_are_converted_again( assets, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    out = str( tmp_path / 'out' )
+    assert 0 == Batch( '-o', out, assets )
+
+    jobs = mesh2_batch.FindJobs( [ assets ], out )
+    assert all( job.upToDate() for job in jobs )
+
+    #/ ----- an edited MTL makes its OBJ out of date ------------------------------------
+
+    made = os.stat( Target( out, 'scene' ) ).st_mtime
+    mtl  = os.path.join( assets, 'b', 'scene.mtl' )
+    os.utime( mtl, ( made + 10, made + 10 ) )
+
+    assert [ job.obj_filename for job in jobs if ( not job.upToDate() ) ] == \
+           [ os.path.join( assets, 'b', 'scene.obj' ) ]
+
+    metrics = str( tmp_path / 'batch.json' )
+    assert 0 == Batch( '-o', out, '-m', metrics, assets )
+    with open( metrics ) as fp:
+        report = json.load( fp )
+    assert ( report['total']['converted'], report['total']['up_to_date'] ) == ( 1, 2 )
+    assert [ r['inc'] for r in report['files'] ] == [ Target( out, 'scene' ) ]
+
+
+#/ =======================================================================================
+def test_dry_run_writes_nothing( assets, tmp_path, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    out = str( tmp_path / 'out' )
+    assert 0 == Batch( '-n', '-o', out, assets )
+
+    listed = [ line.split()[-1] for line in capsys.readouterr().out.splitlines() ]
+    assert sorted( listed ) == sorted( Target( out, name ) for name in TREE )
+    assert not os.path.exists( out )
+
+
+#/ =======================================================================================
+def test_a_broken_file_fails_the_batch( assets, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    with open( os.path.join( assets, 'broken.obj' ), 'w' ) as fp:
+        fp.write( 'o A\nv 0 0 0\nv 1 0 0\nv 0 1 0\nvn 0 0 1\nf 1//1 2//1 x//1\n' )
+    out = str( tmp_path / 'out' )
+
+    assert 1 == Batch( '-j', '2', '-o', out, assets )
+    for name in TREE:
+        assert os.path.exists( Target( out, name ) )
+
+
+#/ =======================================================================================
+#/ **                                     B A T C H                                     **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,56 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                     B E N C H                                     **
+#/ =======================================================================================
+#/
+#/ @brief   The synthetic inputs of the benchmark suite and the cases it runs.
+#/
+#/ =======================================================================================
+
+import os, sys, json
+
+import pytest
+
+import conftest
+
+sys.path.insert( 0, os.path.join( conftest.ROOT, 'bench' ) )
+
+import make_obj, run_bench
+
+CASES = [ ( converter, variant ) for converter in run_bench.CONVERTERS
+          for variant in run_bench.SUPPORTED[ converter ] ]
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'shape', make_obj.SHAPES )
+def test_inputs_are_byte_identical_between_runs( shape, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    data = []
+    for run in ( 'a', 'b' ):
+        ( tmp_path / run ).mkdir()
+        obj = str( tmp_path / run / 'bench.obj' )
+        assert 0 < make_obj.MakeObj( obj, shape, 5000 )
+        with open( obj, 'rb' ) as fp:
+            data.append( fp.read() )
+    assert data[0] == data[1]
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'converter, variant', CASES )
+def test_every_supported_case_converts( converter, variant, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    obj       = str( tmp_path / 'bench.obj' )
+    triangles = make_obj.MakeObj( obj, 'scene', 5000, variant )
+    result    = str( tmp_path / 'result.json' )
+
+    assert 0 == run_bench.RunCase( converter, obj, str( tmp_path ), result, 1, False )
+    with open( result ) as fp:
+        report = json.load( fp )
+
+    assert 0 < report['out_bytes']
+    if ( 'mesh2' == converter ):
+        assert report['counters']['faces'] == triangles
+
+
+#/ =======================================================================================
+#/ **                                     B E N C H                                     **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,111 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                    C A C H E                                      **
+#/ =======================================================================================
+#/
+#/ @brief   Keys, hits and eviction of the ConversionCache (mesh2_cache).
+#/
+#/ =======================================================================================
+
+import os
+
+import pytest
+
+import conftest
+import convert_obj_to_mesh2, mesh2_cache
+
+
+#/ =======================================================================================
+def Scene( tmp_path, name='scene', kd='1 0 0' ):
+    #/ -----------------------------------------------------------------------------------
+    obj = tmp_path / ( '%s.obj' % ( name, ) )
+    obj.write_text( 'mtllib %s.mtl\no Tri\nv 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvn 0 0 1\n'
+                    'usemtl Red\nf 1/1/1 2/1/1 3/1/1\n' % ( name, ) )
+    ( tmp_path / ( '%s.mtl' % ( name, ) ) ).write_text( 'newmtl Red\nKd %s\n' % ( kd, ) )
+    return str( obj )
+
+
+#/ =======================================================================================
+def test_key_follows_inputs_and_options( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    cache = mesh2_cache.ConversionCache( str( tmp_path / 'cache' ) )
+    obj   = Scene( tmp_path )
+    key   = cache.key( obj, 'scene.inc', { 'comments' : False } )
+
+    assert key == cache.key( obj, str( tmp_path / 'scene.inc' ), { 'comments' : False } )
+    assert key != cache.key( obj, 'other.inc',  { 'comments' : False } )
+    assert key != cache.key( obj, 'scene.inc',  { 'comments' : True } )
+
+    ( tmp_path / 'scene.mtl' ).write_text( 'newmtl Red\nKd 0 1 0\n' )
+    assert key != cache.key( obj, 'scene.inc', { 'comments' : False } )
+
+    os.remove( str( tmp_path / 'scene.mtl' ) )
+    assert key != cache.key( obj, 'scene.inc', { 'comments' : False } )
+
+
+#/ =======================================================================================
+def test_store_fetch_and_evict_oldest( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    inc = tmp_path / 'x.inc'
+    inc.write_text( 'x' * 1000 )
+
+    cache = mesh2_cache.ConversionCache( str( tmp_path / 'cache' ), max_bytes=3500 )
+    for n, key in enumerate( [ 'a', 'b', 'c' ] ):
+        cache.store( key, str( inc ) )
+        entry = os.path.join( cache.cache_dir, key )
+        os.utime( entry, ( 1000 + n, 1000 + n ) )
+
+    assert [ key for _, _, key in cache.entries() ] == [ 'a', 'b', 'c' ]
+
+    #/ ----- a fetch is a use: 'a' becomes the newest -----------------------------------
+    out = tmp_path / 'out.inc'
+    assert cache.fetch( 'a', str( out ) )
+    assert out.read_text() == 'x' * 1000
+    assert not cache.fetch( 'missing', str( out ) )
+
+    cache.store( 'd', str( inc ) )
+    assert sorted( key for _, _, key in cache.entries() ) == [ 'a', 'c', 'd' ]
+    assert 1 == cache.evictions
+    assert { 'hits' : 1, 'misses' : 1, 'evictions' : 1 } == cache.totals()
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'name', [ 'cube', 'scene' ] )
+def test_hit_matches_gold_without_parsing( name, tmp_path, monkeypatch ):
+    #/ -----------------------------------------------------------------------------------
+    cache = mesh2_cache.ConversionCache( str( tmp_path / 'cache' ) )
+    obj   = os.path.join( conftest.DATA, '%s.obj' % ( name, ) )
+    inc   = str( tmp_path / ( '%s.inc' % ( name, ) ) )
+    gold  = conftest.IncLines( os.path.join( conftest.GOLD, '%s.inc' % ( name, ) ) )
+
+    convert_obj_to_mesh2.ConvertObj2Mesh2( obj, inc, comments=True, cache=cache )
+    assert conftest.IncLines( inc ) == gold
+    os.remove( inc )
+
+    def parse( *args, **kwargs ):
+        raise AssertionError( 'a cache hit parsed the OBJ file' )
+    monkeypatch.setattr( convert_obj_to_mesh2, 'ParseObjFile', parse )
+
+    convert_obj_to_mesh2.ConvertObj2Mesh2( obj, inc, comments=True, cache=cache )
+    assert ( cache.misses, cache.hits ) == ( 1, 1 )
+    assert conftest.IncLines( inc ) == gold
+
+
+#/ =======================================================================================
+def test_hit_restores_the_texture_file( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    cache    = mesh2_cache.ConversionCache( str( tmp_path / 'cache' ) )
+    obj      = Scene( tmp_path )
+    inc      = str( tmp_path / 'scene.inc' )
+    textures = convert_obj_to_mesh2.TextureFileName( inc )
+
+    for n in range( 2 ):
+        convert_obj_to_mesh2.ConvertObj2Mesh2( obj, inc, make_texture_file=True, cache=cache )
+        with open( textures ) as fp:
+            assert '#declare  Red = texture' in fp.read()
+        os.remove( textures )
+    assert ( cache.misses, cache.hits ) == ( 1, 1 )
+
+
+#/ =======================================================================================
+#/ **                                    C A C H E                                      **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,90 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                     D E D U P                                     **
+#/ =======================================================================================
+#/
+#/ @brief   Materials that render the same texture, declared once (DedupMaterials).
+#/
+#/ =======================================================================================
+
+import re
+
+import convert_obj_to_mesh2
+
+DECLARED = re.compile( r'^#declare  (\S+) = texture', re.M )
+
+
+#/ =======================================================================================
+def Color( name, difuse, specular=( 1.0, 1.0, 1.0 ) ):
+    #/ -----------------------------------------------------------------------------------
+    mat          = convert_obj_to_mesh2.Material( name )
+    mat.difuse   = list( difuse )
+    mat.specular = list( specular )
+    return mat
+
+
+#/ =======================================================================================
+def Image( name, uvimage ):
+    #/ -----------------------------------------------------------------------------------
+    mat         = convert_obj_to_mesh2.Material( name )
+    mat.uvimage = uvimage
+    return mat
+
+
+#/ =======================================================================================
+def test_same_texture_maps_to_the_first_material( quiet_logger ):
+    #/ -----------------------------------------------------------------------------------
+    materials = { 'Red'     : Color( 'Red',     ( 1, 0, 0 ) ),
+                  'Blue'    : Color( 'Blue',    ( 0, 0, 1 ) ),
+                  'Crimson' : Color( 'Crimson', ( 1, 0, 0 ), specular=( 0, 0, 0 ) ),
+                  'Wood'    : Image( 'Wood',    'wood.png' ),
+                  'Oak'     : Image( 'Oak',     'wood.png' ),
+                  'Pine'    : Image( 'Pine',    'pine.png' ) }
+
+    merged = convert_obj_to_mesh2.DedupMaterials( materials )
+
+    assert list( merged ) == list( materials )
+    assert { name : mat.name for name, mat in merged.items() } == \
+           { 'Red' : 'Red', 'Blue' : 'Blue', 'Crimson' : 'Red',
+             'Wood' : 'Wood', 'Oak' : 'Wood', 'Pine' : 'Pine' }
+    assert merged['Crimson'] is materials['Red']
+    assert 'Crimson' == materials['Crimson'].name
+    assert 2 == quiet_logger.summary()['counters']['materials_merged']
+
+    assert [ mat.name for mat in convert_obj_to_mesh2.UniqueMaterials( merged ) ] == \
+           [ 'Red', 'Blue', 'Wood', 'Pine' ]
+    assert convert_obj_to_mesh2.UniqueMaterials( materials ) == list( materials.values() )
+
+
+#/ =======================================================================================
+def test_converter_declares_a_shared_texture_once( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    ( tmp_path / 'strip.mtl' ).write_text( 'newmtl Red\nKd 1 0 0\n'
+                                           'newmtl Crimson\nKs 0 0 0\nKd 1 0 0\n'
+                                           'newmtl Blue\nKd 0 0 1\n' )
+    obj = tmp_path / 'strip.obj'
+    obj.write_text( 'mtllib strip.mtl\no Strip\nv 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\n'
+                    'vt 0 0\nvn 0 0 1\n'
+                    'usemtl Red\nf 1/1/1 2/1/1 3/1/1\n'
+                    'usemtl Crimson\nf 2/1/1 4/1/1 3/1/1\n'
+                    'usemtl Blue\nf 1/1/1 3/1/1 4/1/1\n' )
+
+    texts = []
+    for dedup in ( False, True ):
+        inc = tmp_path / ( 'dedup.inc' if ( dedup ) else 'plain.inc' )
+        convert_obj_to_mesh2.ConvertObj2Mesh2( str( obj ), str( inc ), dedup=dedup )
+        texts.append( inc.read_text() )
+    plain, dedup = texts
+
+    assert DECLARED.findall( plain ) == [ 'Red', 'Crimson', 'Blue' ]
+    assert DECLARED.findall( dedup ) == [ 'Red', 'Blue' ]
+
+    #/ ----- the faces keep their slots; only the name in the list changes --------------
+    assert 'texture { Crimson }\n' in plain
+    assert 'texture { Red }\n    texture { Red }\n    texture { Blue }\n' in dedup
+    assert plain[ plain.index( 'face_indices' ): plain.index( '#declare plain' ) ] == \
+           dedup[ dedup.index( 'face_indices' ): dedup.index( '#declare dedup' ) ]
+
+
+#/ =======================================================================================
+#/ **                                     D E D U P                                     **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,57 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                   G O L D E N                                     **
+#/ =======================================================================================
+#/
+#/ @brief   Converter output against the gold files of the baseline converter.
+#/
+#/ @details Every write path (serial, worker processes, out of core) must give the
+#/          same include as the baseline for Dice and the hand written files in
+#/          tests/data: one cube, two objects with several materials and an image map,
+#/          and a file with CRLF line ends, indents, blank lines and comments. Without
+#/          comments the output is the gold without its '// index' comments.
+#/
+#/ =======================================================================================
+
+import os
+
+import pytest
+
+import conftest
+import convert_obj_to_mesh2
+
+CASES = { 'Dice'  : os.path.join( conftest.ROOT, 'Output', 'ascii', 'Dice.obj' ),
+          'cube'  : os.path.join( conftest.DATA, 'cube.obj' ),
+          'scene' : os.path.join( conftest.DATA, 'scene.obj' ),
+          'messy' : os.path.join( conftest.DATA, 'messy.obj' ) }
+
+RUNS = { 'serial'           : {},
+         'out-of-core'      : { 'out_of_core' : True },
+         'jobs'             : { 'jobs' : 2 },
+         'jobs-out-of-core' : { 'jobs' : 2, 'out_of_core' : True } }
+
+
+#/ =======================================================================================
+def Convert( name, tmp_path, **options ):
+    #/ -----------------------------------------------------------------------------------
+    inc_filename = str( tmp_path / ( '%s.inc' % ( name, ) ) )
+    if ( options.get( 'out_of_core' ) ):
+        options['scratch_dir'] = str( tmp_path )
+    convert_obj_to_mesh2.ConvertObj2Mesh2( CASES[name], inc_filename, **options )
+    return inc_filename
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'run', sorted( RUNS ) )
+@pytest.mark.parametrize( 'name', sorted( CASES ) )
+@pytest.mark.parametrize( 'comments', [ True, False ] )
+def test_matches_gold( name, run, comments, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    inc_filename = Convert( name, tmp_path, comments=comments, **RUNS[run] )
+    gold         = os.path.join( conftest.GOLD, '%s.inc' % ( name, ) )
+
+    assert conftest.IncLines( inc_filename ) == conftest.IncLines( gold, comments )
+
+
+#/ =======================================================================================
+#/ **                                   G O L D E N                                     **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,162 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                 I N S T A N C E S                                 **
+#/ =======================================================================================
+#/
+#/ @brief   Meshes declared once in local space and placed by a matrix per instance
+#/          (Mesh.key, InstanceMatrix, WriteUnion).
+#/
+#/ =======================================================================================
+
+import io, os, re
+
+import numpy as np
+
+import conftest
+import convert_obj_to_mesh2
+
+CUBE  = os.path.join( conftest.DATA, 'cube.obj' )
+MESH2 = re.compile( r'^#declare (\w+) = mesh2 \{', re.M )
+
+
+#/ =======================================================================================
+def Cube():
+    #/ -----------------------------------------------------------------------------------
+    collection         = convert_obj_to_mesh2.MeshCollection( instancing=True )
+    collection.objects = convert_obj_to_mesh2.ParseObjFile( CUBE, collection.materials )
+    return collection
+
+
+#/ =======================================================================================
+def Translation( x, y, z ):
+    #/ -----------------------------------------------------------------------------------
+    m = np.identity( 4 )
+    m[:3,3] = ( x, y, z )
+    return m
+
+
+#/ =======================================================================================
+def Place( matrix, points ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    Where POV-Ray puts the local points of a mesh2: the scale <-1,1,1> of
+    Mesh.write, then the matrix <...> of InstanceMatrix on row vectors.
+    """
+    #/ -----------------------------------------------------------------------------------
+    values = re.match( r'matrix <(.*)>$', matrix ).group(1).split( ',' )
+    rows   = np.array( [ float( x ) for x in values ] ).reshape( 4, 3 )
+    return ( points * [ -1.0, 1.0, 1.0 ] ) @ rows[:3] + rows[3]
+
+
+#/ =======================================================================================
+def test_key_is_equal_for_the_same_geometry():
+    #/ -----------------------------------------------------------------------------------
+    a, = convert_obj_to_mesh2.ParseObjFile( CUBE, {} )
+    b, = convert_obj_to_mesh2.ParseObjFile( CUBE, {} )
+    b.name = 'Other'
+    assert a.key() == b.key()
+
+    b.setGeometry( vertex=b.vertex + 1.0 )
+    assert a.key() != b.key()
+
+    c, = convert_obj_to_mesh2.ParseObjFile( CUBE, {} )
+    c.materials = [ 'Red' ]
+    assert a.key() != c.key()
+
+
+#/ =======================================================================================
+def test_instance_matrix():
+    #/ -----------------------------------------------------------------------------------
+    assert convert_obj_to_mesh2.InstanceMatrix( np.identity( 4 ) ) == \
+           'matrix <1,0,0,0,1,0,0,0,1,0,0,0>'
+    assert convert_obj_to_mesh2.InstanceMatrix( Translation( 2, 3, 4 ) ) == \
+           'matrix <1,0,0,0,1,0,0,0,1,-2,3,4>'
+
+    #/ ----- an instance lands where the mesh baked with m and then mirrored did -------
+    angle    = np.radians( 30.0 )
+    m        = Translation( 1.5, -2.0, 0.25 )
+    m[:3,:3] = np.array( [ [ np.cos( angle ), -np.sin( angle ), 0.0 ],
+                           [ np.sin( angle ),  np.cos( angle ), 0.0 ],
+                           [ 0.0,              0.0,             1.0 ] ] ) @ \
+               np.diag( [ 2.0, 1.0, -0.5 ] )
+    points   = np.random.default_rng( 7 ).uniform( -1.0, 1.0, ( 20, 3 ) )
+    baked    = ( points @ m[:3,:3].T + m[:3,3] ) * [ -1.0, 1.0, 1.0 ]
+
+    placed   = Place( convert_obj_to_mesh2.InstanceMatrix( m ), points )
+    assert np.allclose( placed, baked, atol=1.0e-7 )
+
+
+#/ =======================================================================================
+def test_union_places_every_instance():
+    #/ -----------------------------------------------------------------------------------
+    obj       = Cube().objects
+    instances = [ ( 'Cube', np.identity( 4 ) ), ( 'Cube', Translation( 2, 0, 0 ) ) ]
+
+    fp = io.StringIO()
+    convert_obj_to_mesh2.WriteUnion( fp, 'cubes', obj )
+    assert fp.getvalue() == '\n#declare cubes = union {\n  object { Cube }\n' \
+                            '} // end union cubes\n'
+
+    fp = io.StringIO()
+    convert_obj_to_mesh2.WriteUnion( fp, 'cubes', obj, instances )
+    assert fp.getvalue().split( '\n' )[2:4] == [
+        '  object { Cube matrix <1,0,0,0,1,0,0,0,1,0,0,0> }',
+        '  object { Cube matrix <1,0,0,0,1,0,0,0,1,-2,0,0> }' ]
+
+    fp = io.StringIO()
+    convert_obj_to_mesh2.WriteUnion( fp, 'cubes', obj, instances, transforms=True )
+    assert fp.getvalue().split( '\n' )[2:4] == [
+        '  object { Cube transform { cubes_0_transform } }',
+        '  object { Cube transform { cubes_1_transform } }' ]
+
+
+#/ =======================================================================================
+def test_include_declares_a_mesh_once_for_all_instances( tmp_path, quiet_logger ):
+    #/ -----------------------------------------------------------------------------------
+    collection           = Cube()
+    collection.instances = [ ( 'Cube', Translation( x, 0, 0 ) ) for x in range( 3 ) ]
+    inc                  = str( tmp_path / 'cubes.inc' )
+
+    convert_obj_to_mesh2.WriteMesh2File( inc, collection.objects, collection.materials,
+                                         instances=collection.instances )
+
+    with open( inc ) as fp:
+        text = fp.read()
+    assert [ 'Cube' ] == MESH2.findall( text )
+    assert 3 == text.count( '  object { Cube matrix <' )
+    assert 3 == quiet_logger.summary()['counters']['instances']
+
+    #/ ----- the mesh itself is the one of the include without instances ---------------
+    lines = conftest.IncLines( inc, False )
+    gold  = conftest.IncLines( os.path.join( conftest.GOLD, 'cube.inc' ), False )
+    assert lines[ :lines.index( '#declare cubes = union {' ) ] == \
+           gold[ :gold.index( '#declare cube = union {' ) ]
+
+
+#/ =======================================================================================
+def test_animation_frames_declare_the_transforms( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    writer = convert_obj_to_mesh2.AnimationWriter( str( tmp_path / 'cubes.inc' ) )
+
+    for k in range( 2 ):
+        collection           = Cube()
+        collection.instances = [ ( 'Cube', np.identity( 4 ) ),
+                                 ( 'Cube', Translation( 2 + k, 0, 0 ) ) ]
+        frame_filename       = str( tmp_path / ( 'cubes_%04d.inc' % ( k, ) ) )
+        writer( frame_filename, collection )
+
+        with open( frame_filename ) as fp:
+            text = fp.read()
+        assert '#declare cubes_0_transform = transform { matrix <1,0,0,0,1,0,0,0,1,0,0,0> }' \
+               in text
+        assert '#declare cubes_1_transform = transform { matrix <1,0,0,0,1,0,0,0,1,%d,0,0> }' \
+               % ( -2 - k, ) in text
+
+    assert ( writer.shared, writer.full ) == ( 2, 0 )
+    with open( writer.common_filename ) as fp:
+        common = fp.read()
+    assert 2 == common.count( '  object { Cube transform { cubes_' )
+
+
+#/ =======================================================================================
+#/ **                                 I N S T A N C E S                                 **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,132 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                  L I B R A R Y                                    **
+#/ =======================================================================================
+#/
+#/ @brief   TextureLibrary merging, renaming and rebuilding (mesh2_library), and the
+#/          converter writing with it.
+#/
+#/ =======================================================================================
+
+import os, re, json
+
+import conftest
+import convert_obj_to_mesh2, mesh2_cache, mesh2_library
+
+DECLARED = re.compile( r'^#declare  (\S+) = texture', re.M )
+
+
+#/ =======================================================================================
+def Red( name='Red', rgb=( 1.0, 0.0, 0.0 ) ):
+    #/ -----------------------------------------------------------------------------------
+    mat        = convert_obj_to_mesh2.Material( name )
+    mat.difuse = list( rgb )
+    return mat
+
+
+#/ =======================================================================================
+def test_merge_appends_new_textures_once( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    library = mesh2_library.TextureLibrary( str( tmp_path / 'lib' / 'textures.inc' ) )
+
+    merged = library.merge( { 'Red' : Red(), 'Crimson' : Red( 'Crimson' ) } )
+    assert merged['Red'].name == merged['Crimson'].name == 'Red'
+    assert ( library.appended, library.reused ) == ( 1, 0 )
+
+    merged = library.merge( { 'Scarlet' : Red( 'Scarlet' ) } )
+    assert merged['Scarlet'].name == 'Red'
+    assert ( library.appended, library.reused ) == ( 1, 1 )
+
+    text = ( tmp_path / 'lib' / 'textures.inc' ).read_text()
+    assert 1 == text.count( '#declare' )
+
+
+#/ =======================================================================================
+def test_merge_renames_a_different_texture_with_a_taken_name( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    library = mesh2_library.TextureLibrary( str( tmp_path / 'textures.inc' ) )
+    library.merge( { 'Red' : Red() } )
+
+    green  = Red( rgb=( 0.0, 1.0, 0.0 ) )
+    merged = library.merge( { 'Red' : green } )
+
+    assert merged['Red'].name == 'Red_%s' % ( green.key()[:8], )
+    assert green.name == 'Red'                     #/ the input is not changed
+    assert 2 == ( tmp_path / 'textures.inc' ).read_text().count( '#declare' )
+
+
+#/ =======================================================================================
+def test_library_edited_outside_the_index_is_rebuilt( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    lib     = tmp_path / 'textures.inc'
+    library = mesh2_library.TextureLibrary( str( lib ) )
+    library.merge( { 'Red' : Red(), 'Green' : Red( 'Green', ( 0.0, 1.0, 0.0 ) ) } )
+    before  = lib.read_text()
+
+    lib.write_text( '// truncated\n' )
+    library.merge( { 'Red' : Red() } )
+
+    after = lib.read_text()
+    assert after.split( '\n', 4 )[4] == before.split( '\n', 4 )[4]   #/ past the date line
+    with open( mesh2_library.IndexFileName( str( lib ) ) ) as fp:
+        assert json.load( fp )['bytes'] == len( after.encode( 'utf-8' ) )
+
+
+#/ =======================================================================================
+def test_include_is_guarded_and_relative( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    library = mesh2_library.TextureLibrary( str( tmp_path / 'shared' / 'my-lib.inc' ) )
+
+    inc = tmp_path / 'scenes' / 'a.inc'
+    inc.parent.mkdir()
+    with open( str( inc ), 'w' ) as fp:
+        library.include( fp, str( inc ) )
+
+    text = inc.read_text()
+    assert '#ifndef ( TEXTURE_LIBRARY_my_lib_inc )' in text
+    assert '#include "../shared/my-lib.inc"' in text
+
+
+#/ =======================================================================================
+def Meshes( lines ):
+    #/ -----------------------------------------------------------------------------------
+    """ The lines of an include from its first mesh2 on. """
+    #/ -----------------------------------------------------------------------------------
+    at = [ n for n, line in enumerate( lines ) if ( line.endswith( '= mesh2 {' ) ) ][0]
+    return lines[ at: ]
+
+
+#/ =======================================================================================
+def test_converter_includes_the_library( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    lib     = tmp_path / 'shared' / 'textures.inc'
+    library = mesh2_library.TextureLibrary( str( lib ) )
+    cache   = mesh2_cache.ConversionCache( str( tmp_path / 'cache' ) )
+    ( tmp_path / 'scenes' ).mkdir()
+
+    for name in ( 'scene', 'cube' ):
+        obj = os.path.join( conftest.DATA, '%s.obj' % ( name, ) )
+        inc = tmp_path / 'scenes' / ( '%s.inc' % ( name, ) )
+        convert_obj_to_mesh2.ConvertObj2Mesh2( obj, str( inc ), library=library, cache=cache )
+        text = inc.read_text()
+        assert [] == DECLARED.findall( text )
+        assert '#include "../shared/textures.inc"' in text
+        assert Meshes( conftest.IncLines( str( inc ), False ) ) == \
+               Meshes( conftest.IncLines( os.path.join( conftest.GOLD, '%s.inc' % ( name, ) ),
+                                          False ) )
+
+    assert DECLARED.findall( lib.read_text() ) == [ 'Wood', 'Red', 'Blue', 'Grey' ]
+    assert ( library.appended, library.reused ) == ( 4, 0 )
+
+    #/ ----- a second conversion reuses every texture and leaves the library alone -----
+    before = lib.read_text()
+    convert_obj_to_mesh2.ConvertObj2Mesh2( os.path.join( conftest.DATA, 'scene.obj' ),
+                                           str( tmp_path / 'scenes' / 'again.inc' ),
+                                           library=library, cache=cache )
+    assert ( library.appended, library.reused ) == ( 4, 3 )
+    assert lib.read_text() == before
+    assert ( cache.hits, cache.misses ) == ( 0, 0 )
+
+
+#/ =======================================================================================
+#/ **                                  L I B R A R Y                                    **
+#/ =========================================================================== END FILE ==
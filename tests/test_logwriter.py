@@ -0,0 +1,127 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                 L O G W R I T E R                                 **
+#/ =======================================================================================
+#/
+#/ @brief   The log file writer thread and the records of worker processes (TLogger).
+#/
+#/ =======================================================================================
+
+import os, queue, multiprocessing, concurrent.futures
+
+import pytest
+
+import TLogger
+
+FORK = pytest.mark.skipif( 'fork' not in multiprocessing.get_all_start_methods(),
+                           reason='needs the fork start method' )
+
+
+#/ =======================================================================================
+@pytest.fixture
+def logfile( quiet_logger, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    """ INFO records written to a log file of the test; the file is closed after it. """
+    #/ -----------------------------------------------------------------------------------
+    filename = str( tmp_path / 'run.log' )
+    level    = quiet_logger.write_level
+    quiet_logger.setLogfile( filename, TLogger.INFO )
+    yield filename
+    quiet_logger.shutdown()
+    quiet_logger.setLogfile( None, level )
+
+
+#/ =======================================================================================
+def Messages( filename ):
+    #/ -----------------------------------------------------------------------------------
+    with open( filename, 'r' ) as fp:
+        return [ line.rstrip( '\n' ).split( '** ', 1 )[1] for line in fp ]
+
+
+#/ =======================================================================================
+def test_records_are_written_in_order( quiet_logger, logfile ):
+    #/ -----------------------------------------------------------------------------------
+    """ More records than one batch of the writer thread. """
+    #/ -----------------------------------------------------------------------------------
+    count = 3 * TLogger.LogWriter.BATCH
+    for i in range( count ):
+        quiet_logger.info( 'record %d', i )
+    quiet_logger.debug( 'below the write level' )
+    quiet_logger.flush()
+
+    assert Messages( logfile ) == [ 'record %d' % ( i, ) for i in range( count ) ]
+
+
+#/ =======================================================================================
+def test_log_file_is_opened_again_after_close( quiet_logger, logfile ):
+    #/ -----------------------------------------------------------------------------------
+    quiet_logger.info( 'first' )
+    quiet_logger.closeLog()
+    quiet_logger.info( 'second' )
+    quiet_logger.flush()
+
+    assert Messages( logfile ) == [ 'first', 'second' ]
+
+
+#/ =======================================================================================
+def Work( k ):
+    #/ -----------------------------------------------------------------------------------
+    TLogger.getInstance().info( 'worker record %d', k )
+    return os.getpid()
+
+
+#/ =======================================================================================
+@FORK
+def test_worker_records_are_written_by_the_parent( quiet_logger, logfile ):
+    #/ -----------------------------------------------------------------------------------
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers = 2,
+            mp_context  = multiprocessing.get_context( 'fork' ),
+            initializer = TLogger.WorkerInit,
+            initargs    = quiet_logger.workerArgs() ) as pool:
+        pids = set( pool.map( Work, range( 20 ) ) )
+
+    quiet_logger.shutdown()   #/ stops the listener after what has arrived
+
+    assert os.getpid() not in pids
+    assert sorted( Messages( logfile ) ) == sorted( 'worker record %d' % ( k, )
+                                                    for k in range( 20 ) )
+
+
+#/ =======================================================================================
+def Aborting( records ):
+    #/ -----------------------------------------------------------------------------------
+    """ Worker that logs a burst of records and aborts without any cleanup. """
+    #/ -----------------------------------------------------------------------------------
+    TLogger.WorkerInit( records, TLogger.INFO, TLogger.WARNING, TLogger.CRITICAL, None )
+    logger = TLogger.getInstance()
+    logger.registerAbortHandler( TLogger.AbortHandler( lambda n: os._exit( 3 ) ) )
+    for i in range( 1000 ):
+        logger.info( 'record %d %s', i, 200 * 'x' )
+    logger.critical( 'giving up' )
+
+
+#/ =======================================================================================
+@FORK
+def test_worker_records_reach_the_parent_before_an_abort():
+    #/ -----------------------------------------------------------------------------------
+    ctx     = multiprocessing.get_context( 'fork' )
+    records = ctx.Queue()
+    worker  = ctx.Process( target=Aborting, args=( records, ) )
+    worker.start()
+
+    got = []
+    try:
+        while (( 0 == len(got) ) or ( not got[-1][1].endswith( 'giving up' ) )):
+            got.append( records.get( timeout=10 ) )
+    except queue.Empty:
+        pass
+    worker.join()
+
+    assert 3 == worker.exitcode
+    assert 1001 == len(got)
+    assert TLogger.CRITICAL == got[-1][0]
+
+
+#/ =======================================================================================
+#/ **                                 L O G W R I T E R                                 **
+#/ =========================================================================== END FILE ==
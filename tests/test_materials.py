@@ -0,0 +1,112 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                 M A T E R I A L S                                 **
+#/ =======================================================================================
+#/
+#/ @brief   Parsed MTL files kept between conversions (mesh2_cache.MaterialCache) by
+#/          the converter, the batch workers and the watch mode.
+#/
+#/ =======================================================================================
+
+import os, json
+
+import conftest
+import convert_obj_to_mesh2, mesh2_batch, mesh2_cache, mesh2_watch
+
+NAMES = ( 'a', 'b', 'c' )
+
+
+#/ =======================================================================================
+def Shared( root, kd='1 0 0' ):
+    #/ -----------------------------------------------------------------------------------
+    """ One OBJ file per name in root, all of them with the same MTL file. """
+    #/ -----------------------------------------------------------------------------------
+    root.mkdir( exist_ok=True )
+    ( root / 'shared.mtl' ).write_text( 'newmtl Red\nKd %s\n' % ( kd, ) )
+    for n, name in enumerate( NAMES ):
+        ( root / ( '%s.obj' % ( name, ) ) ).write_text(
+            'mtllib shared.mtl\no %s\nv 0 0 %d\nv 1 0 0\nv 0 1 0\nvt 0 0\nvn 0 0 1\n'
+            'usemtl Red\nf 1/1/1 2/1/1 3/1/1\n' % ( name.upper(), n, ) )
+    return [ str( root / ( '%s.obj' % ( name, ) ) ) for name in NAMES ]
+
+
+#/ =======================================================================================
+def test_materials_are_shared_between_conversions( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    objs      = Shared( tmp_path / 'assets' )
+    mtl       = str( tmp_path / 'assets' / 'shared.mtl' )
+    libraries = mesh2_cache.MaterialCache()
+
+    ( tmp_path / 'alone' ).mkdir()
+    ( tmp_path / 'kept' ).mkdir()
+    for obj in objs:
+        alone = str( tmp_path / 'alone' / 'scene.inc' )
+        kept  = str( tmp_path / 'kept' / 'scene.inc' )
+        convert_obj_to_mesh2.ConvertObj2Mesh2( obj, alone )
+        convert_obj_to_mesh2.ConvertObj2Mesh2( obj, kept, libraries=libraries )
+        assert conftest.IncLines( kept ) == conftest.IncLines( alone )
+
+    assert ( libraries.hits, libraries.misses ) == ( 2, 1 )
+    assert [ os.path.realpath( mtl ) ] == list( libraries.entries )
+    assert libraries.load( mtl, None ) is libraries.load( mtl, None )
+
+
+#/ =======================================================================================
+def test_material_cache_reparses_changed_files( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    obj       = Shared( tmp_path / 'assets' )[0]
+    mtl       = tmp_path / 'assets' / 'shared.mtl'
+    inc       = tmp_path / 'a.inc'
+    libraries = mesh2_cache.MaterialCache()
+
+    for n in range( 3 ):
+        convert_obj_to_mesh2.ConvertObj2Mesh2( obj, str( inc ), libraries=libraries )
+    assert ( libraries.hits, libraries.misses ) == ( 2, 1 )
+
+    #/ ----- same mtime is possible on coarse file systems: the size tells them apart ---
+    mtl.write_text( 'newmtl Red\nKd 0 0 1\n\n' )
+    convert_obj_to_mesh2.ConvertObj2Mesh2( obj, str( inc ), libraries=libraries )
+    assert ( libraries.hits, libraries.misses ) == ( 2, 2 )
+    assert 'color rgb <0.000000,0.000000,1.000000>' in inc.read_text()
+
+
+#/ =======================================================================================
+def test_batch_parses_a_shared_mtl_once( tmp_path, monkeypatch ):
+    #/ -----------------------------------------------------------------------------------
+    monkeypatch.setattr( mesh2_batch, 'LIBRARIES', mesh2_cache.MaterialCache() )
+    Shared( tmp_path / 'assets' )
+    metrics = str( tmp_path / 'batch.json' )
+    argv    = [ 'mesh2_batch', '-j', '1', '-o', str( tmp_path / 'out' ), '-m', metrics,
+                str( tmp_path / 'assets' ) ]
+
+    assert 0 == mesh2_batch.main( len(argv), argv )
+    with open( metrics ) as fp:
+        total = json.load( fp )['total']
+    assert ( total['converted'], total['mtl_hits'], total['mtl_misses'] ) == ( 3, 2, 1 )
+
+
+#/ =======================================================================================
+def test_watch_parses_a_changed_mtl_again( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    Shared( tmp_path / 'assets' )
+    out     = tmp_path / 'out'
+    watcher = mesh2_watch.Watcher( [ str( tmp_path / 'assets' ) ], str( out ), debounce=0.0 )
+    watcher.prime()
+
+    assert 3 == watcher.poll()
+    assert ( watcher.libraries.hits, watcher.libraries.misses ) == ( 2, 1 )
+
+    mtl = tmp_path / 'assets' / 'shared.mtl'
+    mtl.write_text( 'newmtl Red\nKd 0 0 1\n' )
+    st  = os.stat( str( mtl ) )
+    os.utime( str( mtl ), ns=( st.st_atime_ns, st.st_mtime_ns + 10**9 ) )
+
+    assert 3 == watcher.poll()
+    assert ( watcher.libraries.hits, watcher.libraries.misses ) == ( 4, 2 )
+    for name in NAMES:
+        assert 'color rgb <0.000000,0.000000,1.000000>' in \
+               ( out / ( '%s.inc' % ( name, ) ) ).read_text()
+
+
+#/ =======================================================================================
+#/ **                                 M A T E R I A L S                                 **
+#/ =========================================================================== END FILE ==
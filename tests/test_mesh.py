@@ -0,0 +1,96 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                     M E S H                                       **
+#/ =======================================================================================
+#/
+#/ @brief   The typed columns of a Mesh and the mesh2 written from them.
+#/
+#/ =======================================================================================
+
+import io, os
+
+import numpy as np
+import pytest
+
+import conftest
+import convert_obj_to_mesh2
+
+
+#/ =======================================================================================
+def Triangle( dtype=np.float64 ):
+    #/ -----------------------------------------------------------------------------------
+    mesh = convert_obj_to_mesh2.Mesh( 'Tri', dtype=dtype )
+    mesh.addMaterial( 'Red' )
+    mesh.setGeometry( vertex        = [ [ 0, 0, 0 ], [ 1, 0, 0 ], [ 0, 1, 0 ] ],
+                      normal        = [ 0, 0, 1 ],
+                      uv            = [ [ 0, 0 ], [ 1, 0 ], [ 0, 1 ] ],
+                      face_vertex   = [ 0, 1, 2 ],
+                      face_uv       = [ 0, 1, 2 ],
+                      face_normal   = [ 0, 0, 0 ],
+                      face_material = [ 0 ] )
+    return mesh
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'dtype', [ np.float64, np.float32 ] )
+def test_columns_have_their_type_and_width( dtype ):
+    #/ -----------------------------------------------------------------------------------
+    mesh = Triangle( dtype )
+
+    assert ( mesh.vertex.shape, mesh.normal.shape, mesh.uv.shape ) == ( (3,3), (1,3), (3,2) )
+    assert mesh.vertex.dtype == mesh.normal.dtype == mesh.uv.dtype == np.dtype( dtype )
+    for col in ( mesh.face_vertex, mesh.face_uv, mesh.face_normal ):
+        assert ( col.shape, col.dtype ) == ( (1,3), np.int32 )
+    assert ( mesh.face_material.shape, mesh.face_material.dtype ) == ( (1,), np.int32 )
+    assert mesh.nbytes() == sum( col.nbytes for col in (
+        mesh.vertex, mesh.normal, mesh.uv, mesh.face_vertex, mesh.face_uv,
+        mesh.face_normal, mesh.face_material ) )
+
+
+#/ =======================================================================================
+def test_columns_are_read_only_views():
+    #/ -----------------------------------------------------------------------------------
+    mesh   = Triangle()
+    vertex = np.array( [ [ 2.0, 0.0, 0.0 ] ] )
+    mesh.setGeometry( vertex=vertex )
+
+    assert np.shares_memory( mesh.vertex, vertex )     #/ right type, not copied
+    with pytest.raises( ValueError ):
+        mesh.vertex[0,0] = 3.0
+    with pytest.raises( ValueError ):
+        mesh.face_vertex[0,0] = 1
+
+    mesh.setGeometry( face_vertex=np.array( [ [ 0, 0, 0 ] ], dtype=np.int64 ) )
+    assert mesh.face_vertex.dtype == np.int32
+    assert mesh.vertex.tolist() == [ [ 2.0, 0.0, 0.0 ] ]     #/ other columns kept
+
+
+#/ =======================================================================================
+def test_write_from_columns_matches_the_parsed_cube():
+    #/ -----------------------------------------------------------------------------------
+    materials = {}
+    parsed,   = convert_obj_to_mesh2.ParseObjFile( os.path.join( conftest.DATA, 'cube.obj' ),
+                                                   materials )
+
+    built = convert_obj_to_mesh2.Mesh( 'Cube' )
+    built.addMaterial( 'Grey' )
+    built.setGeometry( vertex        = parsed.vertex.tolist(),
+                       normal        = parsed.normal.tolist(),
+                       uv            = parsed.uv.tolist(),
+                       face_vertex   = parsed.face_vertex.tolist(),
+                       face_uv       = parsed.face_uv.tolist(),
+                       face_normal   = parsed.face_normal.tolist(),
+                       face_material = parsed.face_material.tolist() )
+
+    text = []
+    for mesh in ( parsed, built ):
+        fp = io.StringIO()
+        mesh.write( fp, materials, comments=True )
+        text.append( fp.getvalue() )
+
+    assert text[0] == text[1]
+    assert '    12,\n' in text[0]
+
+
+#/ =======================================================================================
+#/ **                                     M E S H                                       **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,62 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                   M E T R I C S                                   **
+#/ =======================================================================================
+#/
+#/ @brief   Phase spans, counters and profiling of TLogger and of a conversion run.
+#/
+#/ =======================================================================================
+
+import os, json, pstats
+
+import conftest
+import convert_obj_to_mesh2
+
+
+#/ =======================================================================================
+def test_spans_and_counters( quiet_logger ):
+    #/ -----------------------------------------------------------------------------------
+    quiet_logger.count( 'faces', 3 )
+    quiet_logger.count( 'faces', 4 )
+    with quiet_logger.span( 'parse' ):
+        pass
+    with quiet_logger.span( 'parse' ):
+        with quiet_logger.span( 'block' ):
+            pass
+
+    summary = quiet_logger.summary()
+    assert 7 == summary['counters']['faces']
+    assert 2 == summary['spans']['parse']['count']
+    assert 1 == summary['spans']['parse/block']['count']
+    assert summary['spans']['parse']['seconds'] >= summary['spans']['parse/block']['seconds']
+
+
+#/ =======================================================================================
+def test_conversion_metrics_file( quiet_logger, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    inc     = str( tmp_path / 'scene.inc' )
+    metrics = str( tmp_path / 'scene-metrics.json' )
+    profile = str( tmp_path / 'scene.prof' )
+    argv    = [ 'obj2mesh2', '-m', metrics, '--profile', profile,
+                os.path.join( conftest.DATA, 'scene.obj' ), inc ]
+
+    try:
+        assert 0 == convert_obj_to_mesh2.main( len(argv), argv )
+    finally:
+        quiet_logger.setProfile( None )
+
+    with open( metrics ) as fp:
+        summary = json.load( fp )
+
+    assert { 'convert', 'convert/parse', 'convert/write' } <= set( summary['spans'] )
+    counters = summary['counters']
+    assert ( counters['objects'], counters['faces'], counters['vertices'] ) == ( 2, 6, 8 )
+    assert counters['bytes_written'] == os.path.getsize( inc )
+    assert counters['bytes_read'] == os.path.getsize( os.path.join( conftest.DATA,
+                                                                    'scene.obj' ) )
+    assert summary['profile'] == profile
+    assert 0 < pstats.Stats( profile ).total_calls
+
+
+#/ =======================================================================================
+#/ **                                   M E T R I C S                                   **
+#/ =========================================================================== END FILE ==
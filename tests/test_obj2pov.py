@@ -0,0 +1,88 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                   O B J 2 P O V                                   **
+#/ =======================================================================================
+#/
+#/ @brief   Obj2Pov_2019 against the output of the 2019 script it replaces.
+#/
+#/ @details The gold files normals-obj2pov.inc and .raw were written by the original
+#/          Obj2Pov_2019.py, with dict.has_key() read as 'in' so it runs on Python 3.
+#/
+#/ =======================================================================================
+
+import os, sys
+
+import numpy as np
+import pytest
+
+import conftest
+
+sys.path.insert( 0, conftest.ROOT )
+sys.path.insert( 0, os.path.join( conftest.ROOT, 'bench' ) )
+
+import Obj2Pov_2019, make_obj
+
+NORMALS = os.path.join( conftest.DATA, 'normals.obj' )
+DICE    = os.path.join( conftest.ROOT, 'Output', 'ascii', 'Dice.obj' )
+
+
+#/ =======================================================================================
+def Read( filename ):
+    #/ -----------------------------------------------------------------------------------
+    with open( filename, 'r' ) as fp:
+        return fp.read()
+
+
+#/ =======================================================================================
+def test_matches_the_2019_output( tmp_path, monkeypatch ):
+    #/ -----------------------------------------------------------------------------------
+    monkeypatch.chdir( tmp_path )
+    argv = [ 'obj2pov', NORMALS, 'normals.inc' ]
+
+    assert 1 == Obj2Pov_2019.main( len(argv), argv )   #/ as in 2019, 1 on success
+    assert Read( 'normals.inc' ) == Read( os.path.join( conftest.GOLD, 'normals-obj2pov.inc' ) )
+    assert Read( 'test.raw' )    == Read( os.path.join( conftest.GOLD, 'normals-obj2pov.raw' ) )
+
+
+#/ =======================================================================================
+def test_texture_vertices_are_refused_as_in_2019( tmp_path, monkeypatch, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    monkeypatch.chdir( tmp_path )
+    argv = [ 'obj2pov', DICE, 'Dice.inc' ]
+
+    assert 1 == Obj2Pov_2019.main( len(argv), argv )
+    assert '\nUnsupported: Texture vertices found at line 13 of %s\n\n' % ( DICE, ) in \
+           capsys.readouterr().err
+    assert [] == os.listdir( str( tmp_path ) )
+
+
+#/ =======================================================================================
+def WalkMap( face, col ):
+    #/ -----------------------------------------------------------------------------------
+    """ The 2019 buildMap: number the indices of column col by first use. """
+    #/ -----------------------------------------------------------------------------------
+    index = {}
+    for corner in face[:,:,col].reshape( -1 ).tolist():
+        index.setdefault( corner, len(index) )
+    dense = [ index[ corner ] for corner in face[:,:,col].reshape( -1 ).tolist() ]
+    return dense, sorted( index, key=index.get )
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'shape', [ 'scene', 'grid' ] )
+def test_maps_of_all_objects_match_the_walk( shape, tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    obj = str( tmp_path / 'bench.obj' )
+    make_obj.MakeObj( obj, shape, 20000, 'normals' )
+    data, vert, norm = Obj2Pov_2019.parseWavefrontObject( obj )
+
+    assert ( 'scene' != shape ) or ( 1 < len(data) )
+    for col in ( 0, 1 ):
+        for o, ( index, rev ) in zip( data, Obj2Pov_2019.buildMaps( data, col ) ):
+            dense, order = WalkMap( o['face'], col )
+            assert index.reshape( -1 ).tolist() == dense
+            assert np.asarray( rev ).tolist() == order
+
+
+#/ =======================================================================================
+#/ **                                   O B J 2 P O V                                   **
+#/ =========================================================================== END FILE ==
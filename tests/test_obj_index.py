@@ -0,0 +1,146 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                O B J _ I N D E X                                  **
+#/ =======================================================================================
+#/
+#/ @brief   Line classification and the object index of the mapped OBJ reader.
+#/
+#/ =======================================================================================
+
+import os, shutil
+
+import numpy as np
+import pytest
+
+import conftest
+import convert_obj_to_mesh2, mesh2_cache, obj_index
+
+DICE  = os.path.join( conftest.ROOT, 'Output', 'ascii', 'Dice.obj' )
+SCENE = os.path.join( conftest.DATA, 'scene.obj' )
+
+
+#/ =======================================================================================
+def Kinds( text ):
+    #/ -----------------------------------------------------------------------------------
+    starts, ends, kind = obj_index.LineTable( np.frombuffer( text, dtype=np.uint8 ) )
+    return [ ( text[lo:hi], int(k) ) for lo, hi, k in zip( starts, ends, kind ) ]
+
+
+#/ =======================================================================================
+def test_records_are_classified_past_leading_blanks():
+    #/ -----------------------------------------------------------------------------------
+    assert Kinds( b'  v 1 2 3\n\tvn 0 0 1\n \tf 1//1 2//1 3//1\n   \n\t o Cube' ) == [
+        ( b'v 1 2 3',           obj_index.KIND_V  ),
+        ( b'vn 0 0 1',          obj_index.KIND_VN ),
+        ( b'f 1//1 2//1 3//1',  obj_index.KIND_F  ),
+        ( b'',                  obj_index.KIND_OTHER ),
+        ( b'o Cube',            obj_index.KIND_O  ) ]
+
+
+#/ =======================================================================================
+def test_only_whole_keywords_are_control_records():
+    #/ -----------------------------------------------------------------------------------
+    kinds = Kinds( b'usemtl Red\nusemap Map\nmtllib a.mtl\r\nmaplib b.map\nmtllib\tc.mtl\n' )
+    assert [ k for _, k in kinds ] == [ obj_index.KIND_USEMTL, obj_index.KIND_OTHER,
+                                        obj_index.KIND_MTLLIB, obj_index.KIND_OTHER,
+                                        obj_index.KIND_MTLLIB ]
+
+
+#/ =======================================================================================
+def Indented( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    """ Dice.obj with every record indented by spaces or a tab. """
+    #/ -----------------------------------------------------------------------------------
+    with open( DICE, 'r' ) as fp:
+        lines = fp.read().splitlines()
+    obj = tmp_path / 'Dice.obj'
+    obj.write_text( ''.join( '%s%s\n' % ( ( '  ', '\t' )[ i % 2 ], line, )
+                             for i, line in enumerate( lines ) ) )
+    shutil.copy( DICE[:-3] + 'mtl', str( tmp_path ) )
+    return str( obj )
+
+
+#/ =======================================================================================
+def test_index_counts_indented_records( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    plain    = obj_index.ObjIndex( DICE )
+    indented = obj_index.ObjIndex( Indented( tmp_path ) )
+    try:
+        assert indented.total == plain.total
+        assert [ ( o.name, o.count, o.base, o.material ) for o in indented.objects ] == \
+               [ ( o.name, o.count, o.base, o.material ) for o in plain.objects ]
+    finally:
+        plain.close()
+        indented.close()
+
+
+#/ =======================================================================================
+def test_indented_records_are_converted( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    obj_filename = Indented( tmp_path )
+    inc_filename = str( tmp_path / 'Dice.inc' )
+    convert_obj_to_mesh2.ConvertObj2Mesh2( obj_filename, inc_filename, comments=True )
+
+    assert conftest.IncLines( inc_filename ) == \
+           conftest.IncLines( os.path.join( conftest.GOLD, 'Dice.inc' ) )
+    with open( obj_filename, 'rb' ) as fp:
+        assert [ b'Dice.mtl' ] == mesh2_cache.MTLLIB.findall( fp.read() )
+
+
+#/ =======================================================================================
+def Entries( index ):
+    #/ -----------------------------------------------------------------------------------
+    return [ ( o.name, o.start, o.end, o.line, o.base, o.count, o.material )
+             for o in [ index.preamble ] + index.objects ]
+
+
+#/ =======================================================================================
+def test_scene_index():
+    #/ -----------------------------------------------------------------------------------
+    index = obj_index.ObjIndex( SCENE )
+    try:
+        floor, tetra = index.objects
+        assert ( floor.name, floor.line, tetra.name, tetra.line ) == ( 'Floor', 3, 'Tetra', 17 )
+        assert index.preamble.end == floor.start and floor.end == tetra.start
+        assert tetra.end == index.size
+
+        K = ( obj_index.KIND_V, obj_index.KIND_VT, obj_index.KIND_VN, obj_index.KIND_F,
+              obj_index.KIND_USEMTL )
+        assert [ floor.count[k] for k in K ] == [ 4, 4, 1, 2, 1 ]
+        assert [ tetra.count[k] for k in K ] == [ 4, 3, 4, 4, 3 ]
+        assert [ tetra.base[k]  for k in K ] == [ 4, 4, 1, 2, 1 ]
+        assert [ index.total[k] for k in K ] == [ 8, 7, 5, 6, 4 ]
+
+        #/ ----- the usemtl of the floor is in force when the tetrahedron starts -------
+        assert ( floor.material, tetra.material ) == ( -1, 0 )
+    finally:
+        index.close()
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'name', [ 'scene', 'messy' ] )
+def test_small_blocks_give_the_same_index_and_output( name, tmp_path, monkeypatch ):
+    #/ -----------------------------------------------------------------------------------
+    """ Blocks of a few lines: objects and usemtl runs span many blocks. """
+    #/ -----------------------------------------------------------------------------------
+    obj_filename = os.path.join( conftest.DATA, '%s.obj' % ( name, ) )
+    whole        = obj_index.ObjIndex( obj_filename )
+    expected     = Entries( whole )
+    whole.close()
+
+    monkeypatch.setattr( obj_index, 'READ_BLOCK', 64 )
+    index = obj_index.ObjIndex( obj_filename )
+    try:
+        assert 4 < len( list( index.blocks( 0, index.size ) ) )
+        assert Entries( index ) == expected
+    finally:
+        index.close()
+
+    inc_filename = str( tmp_path / ( '%s.inc' % ( name, ) ) )
+    convert_obj_to_mesh2.ConvertObj2Mesh2( obj_filename, inc_filename, comments=True )
+    assert conftest.IncLines( inc_filename ) == \
+           conftest.IncLines( os.path.join( conftest.GOLD, '%s.inc' % ( name, ) ) )
+
+
+#/ =======================================================================================
+#/ **                                O B J _ I N D E X                                  **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,67 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                O U T   O F   C O R E                              **
+#/ =======================================================================================
+#/
+#/ @brief   Geometry spilled to numpy.memmap scratch files (SpillStore, out_of_core).
+#/
+#/ =======================================================================================
+
+import os, pickle
+
+import numpy as np
+
+import conftest
+import convert_obj_to_mesh2
+
+SCENE   = os.path.join( conftest.DATA, 'scene.obj' )
+COLUMNS = ( 'vertex', 'normal', 'uv', 'face_vertex', 'face_uv', 'face_normal',
+            'face_material' )
+
+
+#/ =======================================================================================
+def test_spilled_columns_match_the_parsed_ones( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    memory  = convert_obj_to_mesh2.ParseObjFile( SCENE, {} )
+    spilled = convert_obj_to_mesh2.ParseObjFile( SCENE, {}, scratch=str( tmp_path ) )
+
+    assert [ o.name for o in spilled ] == [ 'Floor', 'Tetra' ]
+    for a, b in zip( memory, spilled ):
+        for name in COLUMNS:
+            col = getattr( b, '_%s' % ( name, ) )
+            assert isinstance( col, np.memmap )
+            assert os.path.dirname( col.filename ) == str( tmp_path )
+            assert np.array_equal( getattr( a, name ), getattr( b, name ) )
+
+
+#/ =======================================================================================
+def test_spilled_mesh_is_pickled_as_file_references( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    """ What WriteMeshes sends to a worker process: the worker maps the files again. """
+    #/ -----------------------------------------------------------------------------------
+    mesh  = convert_obj_to_mesh2.ParseObjFile( SCENE, {}, scratch=str( tmp_path ) )[1]
+    data  = pickle.dumps( mesh )
+    again = pickle.loads( data )
+
+    assert mesh.vertex.tobytes() not in data
+    for name in COLUMNS:
+        col = getattr( again, '_%s' % ( name, ) )
+        assert isinstance( col, np.memmap )
+        assert col.filename == getattr( mesh, '_%s' % ( name, ) ).filename
+        assert np.array_equal( getattr( again, name ), getattr( mesh, name ) )
+
+
+#/ =======================================================================================
+def test_scratch_files_are_removed( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    scratch = tmp_path / 'scratch'
+    scratch.mkdir()
+    convert_obj_to_mesh2.ConvertObj2Mesh2( SCENE, str( tmp_path / 'scene.inc' ),
+                                           out_of_core=True, scratch_dir=str( scratch ) )
+
+    assert [] == os.listdir( str( scratch ) )
+    assert ( tmp_path / 'scene.inc' ).exists()
+
+
+#/ =======================================================================================
+#/ **                                O U T   O F   C O R E                              **
+#/ =========================================================================== END FILE ==
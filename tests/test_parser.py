@@ -0,0 +1,77 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                   P A R S E R                                     **
+#/ =======================================================================================
+#/
+#/ @brief   Records the bulk OBJ parser (ObjParser) converts one line at a time.
+#/
+#/ =======================================================================================
+
+import pytest
+
+import conftest
+import convert_obj_to_mesh2
+
+
+#/ =======================================================================================
+def Write( tmp_path, faces, mtl='newmtl Red\nKd 1 0 0\n' ):
+    #/ -----------------------------------------------------------------------------------
+    obj = tmp_path / 'faces.obj'
+    obj.write_text( 'mtllib faces.mtl\no Quad\nv 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\n'
+                    'vt 0 0\nvt 1 1\nvn 0 0 1\nusemtl Red\n' + faces )
+    ( tmp_path / 'faces.mtl' ).write_text( mtl )
+    return str( obj )
+
+
+#/ =======================================================================================
+def Sections( tmp_path, obj, **options ):
+    #/ -----------------------------------------------------------------------------------
+    inc = str( tmp_path / 'faces.inc' )
+    convert_obj_to_mesh2.ConvertObj2Mesh2( obj, inc, **options )
+    lines = conftest.IncLines( inc )
+    return [ line.split()[0] for line in lines
+             if ( line.endswith( ( '_vectors {', '_indices {' ) ) ) ], lines
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'options', [ {}, { 'out_of_core' : True } ] )
+def test_faces_without_texture_coordinates( tmp_path, options ):
+    #/ -----------------------------------------------------------------------------------
+    obj = Write( tmp_path, 'f 1//1 2//1 3//1\nf 2//1 4//1 3//1\n' )
+    if ( options ):
+        options['scratch_dir'] = str( tmp_path )
+
+    sections, lines = Sections( tmp_path, obj, **options )
+
+    assert sections == [ 'vertex_vectors', 'normal_vectors', 'face_indices', 'normal_indices' ]
+    assert lines[ lines.index( '  face_indices {' ) + 2 ] == '    <0,1,2>,'
+
+
+#/ =======================================================================================
+def test_faces_with_vertices_only( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    sections, _ = Sections( tmp_path, Write( tmp_path, 'f 1 2 3\n' ) )
+    assert sections == [ 'vertex_vectors', 'normal_vectors', 'face_indices' ]
+
+
+#/ =======================================================================================
+def test_faces_with_and_without_texture_coordinates( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    obj = Write( tmp_path, 'f 1/1/1 2/2/1 3/1/1\nf 2//1 4//1 3//1\n' )
+    with pytest.raises( ValueError, match="'Quad' has faces with and without uv" ):
+        Sections( tmp_path, obj )
+
+
+#/ =======================================================================================
+def test_image_texture_is_not_printed( tmp_path, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    obj = Write( tmp_path, 'f 1/1/1 2/2/1 3/1/1\n', 'newmtl Red\nKd 1 0 0\nmap_Kd red.png\n' )
+    sections, lines = Sections( tmp_path, obj )
+
+    assert '' == capsys.readouterr().out
+    assert 'uv_indices' in sections
+    assert '  uv_mapping  texture { Red }' in lines
+
+
+#/ =======================================================================================
+#/ **                                   P A R S E R                                     **
+#/ =========================================================================== END FILE ==
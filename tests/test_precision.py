@@ -0,0 +1,101 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                P R E C I S I O N                                  **
+#/ =======================================================================================
+#/
+#/ @brief   Decimals, CompactFormat and the -p / -e options of the converters.
+#/
+#/ =======================================================================================
+
+import getopt
+
+import numpy as np
+import pytest
+
+import conftest
+import convert_obj_to_mesh2
+
+CUBE = 'o Cube\nv 0.1 -0.25 12.5\nv 1 0 0\nv 0 1 0\nvt 0 0\nvn 0 0 1\nf 1/1/1 2/1/1 3/1/1\n'
+
+
+#/ =======================================================================================
+def Formatted( rows, decimals ):
+    #/ -----------------------------------------------------------------------------------
+    rows = np.asarray( rows, dtype=np.float64 )
+    fmt  = convert_obj_to_mesh2.CompactFormat( '<%f,%f>', rows, decimals )
+    return fmt % tuple( np.round( rows, decimals ).ravel() + 0.0 )
+
+
+#/ =======================================================================================
+def test_compact_format_drops_trailing_zeros():
+    #/ -----------------------------------------------------------------------------------
+    assert Formatted( [ [ 0.5, -0.0 ] ], 4 )          == '<0.5,0>'
+    assert Formatted( [ [ 1234.56789, 0.25 ] ], 2 )   == '<1234.57,0.25>'
+    assert Formatted( [ [ 123456789.0, 1.0 ] ], 0 )   == '<123456789,1>'
+
+
+#/ =======================================================================================
+def test_compact_format_stops_at_the_float_repr():
+    #/ -----------------------------------------------------------------------------------
+    assert Formatted( [ [ 0.1, 0.3 ] ], 20 ) == '<0.1,0.3>'
+    assert convert_obj_to_mesh2.CompactFormat( '%f', np.array( [ 1e6 ] ), 20 ) == \
+           '%%.%dg' % ( convert_obj_to_mesh2.SIGNIFICANT, )
+
+
+#/ =======================================================================================
+def test_decimals_from_the_error_bound():
+    #/ -----------------------------------------------------------------------------------
+    rows = np.array( [ [ 0.0, 0.0, 0.0 ], [ 3.0, 4.0, 0.0 ] ] )   #/ diagonal 5
+    assert convert_obj_to_mesh2.Decimals( rows )                    is None
+    assert convert_obj_to_mesh2.Decimals( rows, decimals=3 )        == 3
+    assert convert_obj_to_mesh2.Decimals( rows, max_error=1e-4 )    == 3
+    assert convert_obj_to_mesh2.Decimals( rows, max_error=1e-30 )   == 12
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'options', [ { 'max_error' : 0.0 },  { 'max_error' : -1e-3 },
+                                       { 'max_error' : np.inf }, { 'decimals' : -1 } ] )
+def test_decimals_out_of_range( options ):
+    #/ -----------------------------------------------------------------------------------
+    with pytest.raises( ValueError ):
+        convert_obj_to_mesh2.Decimals( np.zeros( (2,3) ), **options )
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'key, val', [ ( '-e', '0' ), ( '--max-error', '-1' ), ( '-e', 'nan' ),
+                                        ( '-p', '-2' ), ( '--precision', '1.5' ) ] )
+def test_option_out_of_range( key, val ):
+    #/ -----------------------------------------------------------------------------------
+    with pytest.raises( getopt.GetoptError, match=key ):
+        convert_obj_to_mesh2.PrecisionOption( key, val )
+
+
+#/ =======================================================================================
+def test_main_reports_a_bad_max_error( tmp_path, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    obj = tmp_path / 'cube.obj'
+    obj.write_text( CUBE )
+    inc = tmp_path / 'cube.inc'
+
+    assert 1 == convert_obj_to_mesh2.main( 5, [ 'obj2mesh2', '-e', '0', str( obj ), str( inc ) ] )
+    assert 'option -e needs a positive number' in capsys.readouterr().err
+    assert not inc.exists()
+
+
+#/ =======================================================================================
+def test_precision_in_the_include( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    obj = tmp_path / 'cube.obj'
+    obj.write_text( CUBE )
+    inc = str( tmp_path / 'cube.inc' )
+
+    convert_obj_to_mesh2.ConvertObj2Mesh2( str( obj ), inc, decimals=1 )
+    lines = conftest.IncLines( inc )
+
+    at = lines.index( '  vertex_vectors {' )
+    assert lines[at+1:at+5] == [ '    3,', '    <0.1,-0.2,12.5>,', '    <1,0,0>,',
+                                 '    <0,1,0>,' ]
+
+
+#/ =======================================================================================
+#/ **                                P R E C I S I O N                                  **
+#/ =========================================================================== END FILE ==
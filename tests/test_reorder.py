@@ -0,0 +1,90 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                  R E O R D E R                                    **
+#/ =======================================================================================
+#/
+#/ @brief   Morton order of the faces and first use numbering (mesh2_optimize).
+#/
+#/ =======================================================================================
+
+import os
+
+import numpy as np
+
+import conftest
+import convert_obj_to_mesh2, mesh2_optimize
+
+
+#/ =======================================================================================
+def Parse( name ):
+    #/ -----------------------------------------------------------------------------------
+    return convert_obj_to_mesh2.ParseObjFile( os.path.join( conftest.DATA, name ), {} )
+
+
+#/ =======================================================================================
+def Triangles( mesh ):
+    #/ -----------------------------------------------------------------------------------
+    """
+    The triangles of a Mesh as sorted tuples of their corner vectors and their
+    material.
+    """
+    #/ -----------------------------------------------------------------------------------
+    columns = [ mesh.vertex[ mesh.face_vertex ] ]
+    if ( len(mesh.face_normal) == len(mesh.face_vertex) ):
+        columns.append( mesh.normal[ mesh.face_normal ] )
+    if ( len(mesh.face_uv) == len(mesh.face_vertex) ):
+        columns.append( mesh.uv[ mesh.face_uv ] )
+    corners = np.concatenate( columns, axis=2 ).reshape( len(mesh.face_vertex), -1 )
+    return sorted( zip( map( tuple, corners.tolist() ), mesh.face_material.tolist() ) )
+
+
+#/ =======================================================================================
+def FirstUse( index ):
+    #/ -----------------------------------------------------------------------------------
+    """ True if the rows of index are numbered in the order they are first used. """
+    #/ -----------------------------------------------------------------------------------
+    used  = index.reshape( -1 )
+    _, at = np.unique( used, return_index=True )
+    return np.sort( at ).tolist() == at.tolist() and used.max( initial=-1 ) + 1 == len(at)
+
+
+#/ =======================================================================================
+def test_reorder_keeps_the_triangles():
+    #/ -----------------------------------------------------------------------------------
+    for name in ( 'cube.obj', 'scene.obj' ):
+        for before, after in zip( Parse( name ), Parse( name ) ):
+            assert mesh2_optimize.ReorderMesh( after ) == len( before.face_vertex )
+            assert Triangles( after ) == Triangles( before )
+            assert FirstUse( after.face_vertex )
+            assert FirstUse( after.face_normal )
+            assert FirstUse( after.face_uv )
+
+
+#/ =======================================================================================
+def test_reorder_without_texture_coordinates( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    obj = tmp_path / 'fan.obj'
+    obj.write_text( 'o Fan\nv 3 0 0\nv 2 0 0\nv 1 0 0\nv 0 0 0\nv 0 1 0\nvn 0 0 1\n'
+                    'f 1//1 2//1 5//1\nf 2//1 3//1 5//1\nf 3//1 4//1 5//1\n' )
+    before, = convert_obj_to_mesh2.ParseObjFile( str( obj ), {} )
+    after,  = convert_obj_to_mesh2.ParseObjFile( str( obj ), {} )
+
+    mesh2_optimize.ReorderMesh( after )
+
+    assert ( 0, 3 ) == after.face_uv.shape
+    assert Triangles( after ) == Triangles( before )
+
+    #/ ----- the centroids run from x=1.67 down to x=0.33, so the faces turn around ----
+    assert after.face_vertex.tolist() == [ [ 0, 1, 2 ], [ 3, 0, 2 ], [ 4, 3, 2 ] ]
+    assert after.vertex.tolist()[:2] == [ [ 1, 0, 0 ], [ 0, 0, 0 ] ]
+
+
+#/ =======================================================================================
+def test_reorder_follows_the_morton_curve():
+    #/ -----------------------------------------------------------------------------------
+    points = np.array( [ [ 1.0, 1.0, 1.0 ], [ 0.0, 0.0, 0.0 ], [ 1.0, 0.0, 0.0 ] ] )
+    assert mesh2_optimize.MortonOrder( points ).tolist() == [ 1, 2, 0 ]
+
+
+#/ =======================================================================================
+#/ **                                  R E O R D E R                                    **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,114 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                  T L O G G E R                                    **
+#/ =======================================================================================
+#/
+#/ @brief   Record formatting, level checks and call sites of TLogger.
+#/
+#/ =======================================================================================
+
+import sys
+
+import TLogger
+
+
+#/ =======================================================================================
+def Records( logger, capsys, call ):
+    #/ -----------------------------------------------------------------------------------
+    logger.setConsoleLevel( TLogger.DEBUG )
+    capsys.readouterr()
+    call()
+    logger.flush()
+    return [ line.split( '** ', 1 )[1] for line in capsys.readouterr().err.splitlines() ]
+
+
+#/ =======================================================================================
+def test_message_keeps_the_two_argument_form( quiet_logger, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    def call():
+        quiet_logger.message( TLogger.INFO, 'rate %d%%', 'str2' )
+        quiet_logger.message( TLogger.INFO, '100%d' )
+    assert Records( quiet_logger, capsys, call ) == [ '( rate %d%% ) str2', '100%d' ]
+
+
+#/ =======================================================================================
+def test_level_methods_format_printf_style( quiet_logger, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    def call():
+        quiet_logger.info( 'faces %d in %.1f s', 12, 0.25 )
+        quiet_logger.info( 'plain 100%' )
+        quiet_logger.info( 'faces %d', 'many' )
+    assert Records( quiet_logger, capsys, call ) == [
+        'faces 12 in 0.2 s', 'plain 100%', "faces %d  [bad log arguments: ('many',)]" ]
+
+
+#/ =======================================================================================
+def test_level_methods_keep_the_two_string_form( quiet_logger, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    def call():
+        quiet_logger.info( 'Label', 'value' )
+        quiet_logger.warning( 'PovRay file:', '/tmp/a.inc' )
+        quiet_logger.info( 'rate %s', 'high' )
+    assert Records( quiet_logger, capsys, call ) == [
+        '( Label ) value', '( PovRay file: ) /tmp/a.inc', 'rate high' ]
+
+
+#/ =======================================================================================
+def test_proxy_sees_methods_replaced_later( quiet_logger ):
+    #/ -----------------------------------------------------------------------------------
+    impl  = quiet_logger._getInstance__instance
+    calls = []
+
+    quiet_logger.count( 'before' )
+    impl.count = lambda name, n=1: calls.append( name )
+    try:
+        quiet_logger.count( 'after' )
+        TLogger.getInstance().count( 'other' )
+    finally:
+        del impl.count
+
+    assert calls == [ 'after', 'other' ]
+    assert 'after' not in quiet_logger.summary()['counters']
+
+
+#/ =======================================================================================
+def test_disabled_levels_are_not_formatted( quiet_logger, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    class Loud:
+        def __str__( self ):
+            raise AssertionError( 'formatted a debug record below the console level' )
+
+    quiet_logger.setConsoleLevel( TLogger.INFO )
+    quiet_logger.debug( 'value %s', Loud() )
+    assert '' == capsys.readouterr().err
+
+
+#/ =======================================================================================
+def test_location_is_the_caller( quiet_logger, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    here = []
+    def call():
+        here.append( sys._getframe().f_lineno + 1 )
+        quiet_logger.info( 'faces %d', 3, location=True )
+        here.append( sys._getframe().f_lineno + 1 )
+        quiet_logger.message( TLogger.INFO, 'faces', '3', location=True )
+    assert Records( quiet_logger, capsys, call ) == [
+        '( test_tlogger.py: call: %d ) faces 3'     % ( here[0], ),
+        '( test_tlogger.py: call: %d ) ( faces ) 3' % ( here[1], ) ]
+
+
+#/ =======================================================================================
+def test_logging_turned_off( quiet_logger, capsys ):
+    #/ -----------------------------------------------------------------------------------
+    def call():
+        quiet_logger.off()
+        try:
+            quiet_logger.warning( 'hidden %d', 1 )
+        finally:
+            quiet_logger.on()
+        quiet_logger.warning( 'shown %d', 2 )
+    assert Records( quiet_logger, capsys, call ) == [ 'shown 2' ]
+
+
+#/ =======================================================================================
+#/ **                                  T L O G G E R                                    **
+#/ =========================================================================== END FILE ==
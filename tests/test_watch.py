@@ -0,0 +1,149 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                     W A T C H                                     **
+#/ =======================================================================================
+#/
+#/ @brief   Polls of the watch mode (mesh2_watch.Watcher), with a clock of the test.
+#/
+#/ =======================================================================================
+
+import os, shutil
+
+import pytest
+
+import conftest
+import mesh2_watch
+
+NAMES = ( 'cube', 'scene' )
+
+
+#/ =======================================================================================
+class Clock:
+    #/ -----------------------------------------------------------------------------------
+    """ time.monotonic of mesh2_watch, moved by the test. """
+    #/ -----------------------------------------------------------------------------------
+    def __init__( self ):
+        self.now = 1000.0
+
+    def __call__( self ):
+        return self.now
+
+
+#/ =======================================================================================
+@pytest.fixture
+def clock( monkeypatch ):
+    #/ -----------------------------------------------------------------------------------
+    clock = Clock()
+    monkeypatch.setattr( mesh2_watch.time, 'monotonic', clock )
+    return clock
+
+
+#/ =======================================================================================
+@pytest.fixture
+def assets( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    root = tmp_path / 'assets'
+    root.mkdir()
+    for name in NAMES:
+        for ext in ( 'obj', 'mtl' ):
+            shutil.copy( os.path.join( conftest.DATA, '%s.%s' % ( name, ext, ) ), str( root ) )
+    return root
+
+
+#/ =======================================================================================
+def Touch( filename, text=None ):
+    #/ -----------------------------------------------------------------------------------
+    """ Rewrite a file (with new text) and move its mtime past any earlier stamp. """
+    #/ -----------------------------------------------------------------------------------
+    if ( None != text ):
+        filename.write_text( text )
+    st = os.stat( str( filename ) )
+    os.utime( str( filename ), ns=( st.st_atime_ns, st.st_mtime_ns + 10**9 ) )
+
+
+#/ =======================================================================================
+def test_first_poll_converts_what_is_out_of_date( assets, tmp_path, clock ):
+    #/ -----------------------------------------------------------------------------------
+    out     = tmp_path / 'out'
+    watcher = mesh2_watch.Watcher( [ str( assets ) ], str( out ), debounce=0.0 )
+    watcher.prime()
+
+    assert 2 == watcher.poll()
+    assert 0 == watcher.poll()
+    for name in NAMES:
+        assert conftest.IncLines( str( out / ( '%s.inc' % ( name, ) ) ), False ) == \
+               conftest.IncLines( os.path.join( conftest.GOLD, '%s.inc' % ( name, ) ), False )
+
+    again = mesh2_watch.Watcher( [ str( assets ) ], str( out ), debounce=0.0 )
+    again.prime()
+    assert 0 == again.poll()
+
+    forced = mesh2_watch.Watcher( [ str( assets ) ], str( out ), debounce=0.0 )
+    forced.prime( force=True )
+    assert 2 == forced.poll()
+
+
+#/ =======================================================================================
+def test_a_changed_mtl_converts_its_obj_again( assets, tmp_path, clock ):
+    #/ -----------------------------------------------------------------------------------
+    out     = tmp_path / 'out'
+    watcher = mesh2_watch.Watcher( [ str( assets ) ], str( out ), debounce=0.0 )
+    watcher.prime()
+    watcher.poll()
+
+    mtl = assets / 'cube.mtl'
+    Touch( mtl, mtl.read_text().replace( 'Kd 0.5 0.5 0.5', 'Kd 0 0 1' ) )
+
+    assert 1 == watcher.poll()
+    assert 'color rgb <0.000000,0.000000,1.000000>' in ( out / 'cube.inc' ).read_text()
+    assert ( watcher.converted, watcher.failed ) == ( 3, 0 )
+
+
+#/ =======================================================================================
+def test_changes_wait_for_the_debounce_time( assets, tmp_path, clock ):
+    #/ -----------------------------------------------------------------------------------
+    out     = tmp_path / 'out'
+    watcher = mesh2_watch.Watcher( [ str( assets ) ], str( out ), debounce=1.0 )
+    watcher.prime()
+    assert 2 == watcher.poll()    #/ out of date at start: converted on the first poll
+
+    obj = assets / 'scene.obj'
+    Touch( obj )
+    assert 0 == watcher.poll()
+
+    clock.now += 0.6
+    Touch( obj )                  #/ still being written: the wait starts again
+    assert 0 == watcher.poll()
+
+    clock.now += 0.6
+    assert 0 == watcher.poll()
+
+    clock.now += 0.6
+    assert 1 == watcher.poll()
+    assert 0 == watcher.poll()
+
+
+#/ =======================================================================================
+def test_a_failed_file_is_tried_again_once_it_changes( assets, tmp_path, clock ):
+    #/ -----------------------------------------------------------------------------------
+    out     = tmp_path / 'out'
+    broken  = assets / 'broken.obj'
+    broken.write_text( 'o A\nv 0 0 0\nv 1 0 0\nv 0 1 0\nvn 0 0 1\nf 1//1 2//1 x//1\n' )
+    watcher = mesh2_watch.Watcher( [ str( assets ) ], str( out ), debounce=0.0 )
+    watcher.prime()
+
+    assert 3 == watcher.poll()
+    assert ( watcher.converted, watcher.failed ) == ( 2, 1 )
+    assert 0 == watcher.poll()
+
+    Touch( broken, broken.read_text().replace( 'x//1', '3//1' ) )
+    assert 1 == watcher.poll()
+    assert ( watcher.converted, watcher.failed ) == ( 3, 1 )
+
+    os.remove( str( broken ) )
+    assert 0 == watcher.poll()
+    assert str( broken ) not in watcher.stamps
+
+
+#/ =======================================================================================
+#/ **                                     W A T C H                                     **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,139 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                     W E L D                                       **
+#/ =======================================================================================
+#/
+#/ @brief   Welding of vertices, normals and UVs (mesh2_optimize.Weld, WeldMesh).
+#/
+#/ =======================================================================================
+
+import os
+
+import numpy as np
+
+import conftest
+import convert_obj_to_mesh2, mesh2_optimize
+
+
+#/ =======================================================================================
+def Welded( rows, epsilon ):
+    #/ -----------------------------------------------------------------------------------
+    rows          = np.asarray( rows, dtype=np.float64 )
+    index         = np.arange( len(rows) )
+    values, index = mesh2_optimize.Weld( rows, index, epsilon )
+    return values.tolist(), index.tolist()
+
+
+#/ =======================================================================================
+def test_weld_exact_merges_signed_zero():
+    #/ -----------------------------------------------------------------------------------
+    values, index = Welded( [ [ 0.0, -0.0, 1.0 ], [ -0.0, 0.0, 1.0 ], [ 0.0, 0.0, 2.0 ] ], 0.0 )
+    assert index == [ 0, 0, 1 ]
+    assert len(values) == 2
+
+
+#/ =======================================================================================
+def test_weld_pair_across_cell_boundaries():
+    #/ -----------------------------------------------------------------------------------
+    """ Closer than epsilon, but in different cells of any epsilon grid. """
+    #/ -----------------------------------------------------------------------------------
+    values, index = Welded( [ [ 0.0999, 0.1999 ], [ 0.1001, 0.2001 ] ], 0.01 )
+    assert index == [ 0, 0 ]
+    assert values == [ [ 0.0999, 0.1999 ] ]
+
+
+#/ =======================================================================================
+def test_weld_uses_the_real_distance():
+    #/ -----------------------------------------------------------------------------------
+    """ One cell, but farther apart than epsilon. """
+    #/ -----------------------------------------------------------------------------------
+    values, index = Welded( [ [ 0.1, 0.1, 0.1 ], [ 0.9, 0.9, 0.9 ] ], 1.0 )
+    assert index == [ 0, 1 ]
+
+
+#/ =======================================================================================
+def test_weld_joins_the_first_kept_row():
+    #/ -----------------------------------------------------------------------------------
+    """ A chain does not collapse: each row is within epsilon of the row it became. """
+    #/ -----------------------------------------------------------------------------------
+    rows          = [ [ 0.06 * k, 0.0 ] for k in range( 6 ) ]
+    values, index = Welded( rows, 0.1 )
+    assert index == [ 0, 0, 1, 1, 2, 2 ]
+    assert values == [ rows[0], rows[2], rows[4] ]
+
+
+#/ =======================================================================================
+def test_weld_against_a_sequential_walk():
+    #/ -----------------------------------------------------------------------------------
+    """ More rows than the first block of Weld, checked against a plain row walk. """
+    #/ -----------------------------------------------------------------------------------
+    rng  = np.random.default_rng( 7 )
+    rows = np.round( rng.uniform( 0.0, 1.0, ( 10000, 3 ) ), 3 )
+    eps  = 0.04
+
+    grid = {}
+    kept = []
+    for row in rows.tolist():
+        cell = tuple( int( np.floor( x / eps ) ) for x in row )
+        near = [ k for dx in ( -1, 0, 1 ) for dy in ( -1, 0, 1 ) for dz in ( -1, 0, 1 )
+                 for k in grid.get( ( cell[0] + dx, cell[1] + dy, cell[2] + dz ), () ) ]
+        if ( not any( sum( ( a - b ) ** 2 for a, b in zip( row, k ) ) < eps * eps
+                      for k in near ) ):
+            grid.setdefault( cell, [] ).append( row )
+            kept.append( row )
+
+    values, index = mesh2_optimize.Weld( rows, np.arange( len(rows) ), eps )
+    assert values.tolist() == kept
+    assert ( ( ( rows - values[index] ) ** 2 ).sum( axis=1 ) < eps * eps ).all()
+
+
+#/ =======================================================================================
+def Parse( name ):
+    #/ -----------------------------------------------------------------------------------
+    return convert_obj_to_mesh2.ParseObjFile( os.path.join( conftest.DATA, name ), {} )
+
+
+#/ =======================================================================================
+def Triangles( mesh ):
+    #/ -----------------------------------------------------------------------------------
+    """ The triangles of a Mesh as sorted tuples of their corner vectors. """
+    #/ -----------------------------------------------------------------------------------
+    corners = np.concatenate( ( mesh.vertex[ mesh.face_vertex ],
+                                mesh.normal[ mesh.face_normal ] ), axis=2 )
+    return sorted( map( tuple, corners.reshape( len(corners), -1 ).tolist() ) )
+
+
+#/ =======================================================================================
+def test_weld_mesh_keeps_the_triangles():
+    #/ -----------------------------------------------------------------------------------
+    for before, after in zip( Parse( 'scene.obj' ), Parse( 'scene.obj' ) ):
+        mesh2_optimize.WeldMesh( after, 0.0 )
+        assert Triangles( after ) == Triangles( before )
+
+
+#/ =======================================================================================
+def test_converter_welds_split_vertices( tmp_path ):
+    #/ -----------------------------------------------------------------------------------
+    """ Two triangles of a quad with the shared edge written twice. """
+    #/ -----------------------------------------------------------------------------------
+    obj = tmp_path / 'split.obj'
+    ( tmp_path / 'split.mtl' ).write_text( 'newmtl Grey\nKd 0.5 0.5 0.5\n' )
+    obj.write_text( 'mtllib split.mtl\no Quad\nusemtl Grey\nv 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 0 0\nv 1 1 0\nv 0 1 0\n'
+                    'vt 0 0\nvt 1 1\nvt 0 0\nvn 0 0 1\nvn 0 0 1\n'
+                    'f 1/1/1 2/1/1 3/2/1\nf 4/3/2 5/2/2 6/3/2\n' )
+    inc = str( tmp_path / 'split.inc' )
+
+    convert_obj_to_mesh2.ConvertObj2Mesh2( str( obj ), inc, weld=0.0 )
+    lines = conftest.IncLines( inc )
+
+    counts = { line.split()[0] : lines[k+1].strip() for k, line in enumerate( lines )
+               if ( line.endswith( ( '_vectors {', '_indices {' ) ) ) }
+    assert counts == { 'vertex_vectors' : '4,', 'normal_vectors' : '1,',
+                       'uv_vectors'     : '2,', 'face_indices'   : '2,',
+                       'normal_indices' : '2,', 'uv_indices'     : '2,' }
+    at = lines.index( '  face_indices {' )
+    assert lines[at+2:at+4] == [ '    <0,1,2>,', '    <0,2,3>,' ]
+
+
+#/ =======================================================================================
+#/ **                                     W E L D                                       **
+#/ =========================================================================== END FILE ==
@@ -0,0 +1,69 @@
+#/ ====================================================================== BEGIN FILE =====
+#/ **                                    W R I T E R                                    **
+#/ =======================================================================================
+#/
+#/ @brief   Block formatting of mesh2 sections (WriteSection).
+#/
+#/ =======================================================================================
+
+import io
+
+import numpy as np
+import pytest
+
+import convert_obj_to_mesh2
+
+ROWS = np.arange( 30, dtype=np.float64 ).reshape( 10, 3 ) / 4.0
+
+
+#/ =======================================================================================
+@pytest.fixture( autouse=True )
+def small_blocks( monkeypatch ):
+    #/ -----------------------------------------------------------------------------------
+    """ Blocks of 4 rows, so 10 rows end in a partial block. """
+    #/ -----------------------------------------------------------------------------------
+    monkeypatch.setattr( convert_obj_to_mesh2, 'WRITE_BLOCK', 4 )
+
+
+#/ =======================================================================================
+def Section( rows, fmt='<%f,%f,%f>', **options ):
+    #/ -----------------------------------------------------------------------------------
+    fp = io.StringIO()
+    convert_obj_to_mesh2.WriteSection( fp, 'vertex_vectors', fmt, rows, **options )
+    return fp.getvalue()
+
+
+#/ =======================================================================================
+@pytest.mark.parametrize( 'comments', [ True, False ] )
+def test_section_matches_a_row_at_a_time( comments ):
+    #/ -----------------------------------------------------------------------------------
+    expected = '  vertex_vectors {\n    10,\n'
+    for k, row in enumerate( ROWS.tolist() ):
+        expected += '    <%f,%f,%f>' % tuple( row )
+        expected += ( ' // %d\n' % ( k, ) ) if ( comments ) else '\n'
+    expected += '  }\n\n'
+
+    assert Section( ROWS, comments=comments ) == expected
+
+
+#/ =======================================================================================
+def test_section_of_side_by_side_columns():
+    #/ -----------------------------------------------------------------------------------
+    """ Face rows with their material index, as Mesh.write passes them. """
+    #/ -----------------------------------------------------------------------------------
+    faces    = np.arange( 30, dtype=np.int32 ).reshape( 10, 3 )
+    material = np.arange( 10, dtype=np.int32 ) % 3
+
+    assert Section( ( faces, material ), '<%d,%d,%d>,%d' ) == \
+           Section( np.column_stack( ( faces, material ) ), '<%d,%d,%d>,%d' )
+
+
+#/ =======================================================================================
+def test_empty_section():
+    #/ -----------------------------------------------------------------------------------
+    assert Section( np.zeros( (0,3) ) ) == '  vertex_vectors {\n    0,\n  }\n\n'
+
+
+#/ =======================================================================================
+#/ **                                    W R I T E R                                    **
+#/ =========================================================================== END FILE ==